@@ -1,10 +1,13 @@
 from django.contrib import admin
-from .models import Auction, Category, Bid, CustomUser, Rating, Comment
+from .models import Auction, Category, Bid, CustomUser, Rating, Comment, ProxyBid, ArchivedBid, AuctionArchive
 
 # Register your models here.
 admin.site.register(Auction)
 admin.site.register(Category)
 admin.site.register(Bid)
+admin.site.register(ProxyBid)
+admin.site.register(ArchivedBid)
+admin.site.register(AuctionArchive)
 admin.site.register(CustomUser)
 admin.site.register(Rating)
 admin.site.register(Comment)
\ No newline at end of file
@@ -0,0 +1,127 @@
+from collections import Counter
+from datetime import timedelta
+from heapq import merge
+from itertools import islice
+from operator import attrgetter
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from . import cache as response_cache
+from .models import ArchivedBid, Auction, AuctionArchive, Bid, ProxyBid
+
+# Las que fallaron por saldo (o sin estado) se pueden volver a cobrar y el
+# cobro necesita la puja ganadora en Bid, así que no se archivan
+ARCHIVABLE_STATUSES = (Auction.SETTLED, Auction.NO_BIDS)
+
+
+def archive_horizon():
+    return timedelta(days=getattr(settings, "AUCTION_ARCHIVE_HORIZON_DAYS", 180))
+
+
+def archivable_auctions(cutoff):
+    return Auction.objects.filter(
+        archived_at__isnull=True,
+        settlement_status__in=ARCHIVABLE_STATUSES,
+        closing_date__lte=cutoff,
+    )
+
+
+def archivable_auction_ids(cutoff, limit):
+    return list(
+        archivable_auctions(cutoff).order_by('closing_date', 'id').values_list('id', flat=True)[:limit]
+    )
+
+
+def auction_bids(auction_id):
+    """Pujas de una subasta: en ArchivedBid si está archivada (solo lectura) y si no en Bid."""
+    archived = Auction.objects.filter(pk=auction_id, archived_at__isnull=False).exists()
+    return (ArchivedBid if archived else Bid).objects.filter(auction_id=auction_id)
+
+
+async def aauction_bids(auction_id):
+    archived = await Auction.objects.filter(pk=auction_id, archived_at__isnull=False).aexists()
+    return (ArchivedBid if archived else Bid).objects.filter(auction_id=auction_id)
+
+
+def user_bids(user):
+    """
+    Pujas de un usuario: (Bid, ArchivedBid). Las de subastas archivadas ya no
+    están en Bid, así que el historial tiene que leer las dos tablas.
+    """
+    return Bid.objects.filter(bidder=user), ArchivedBid.objects.filter(bidder=user)
+
+
+def merge_bids(*bids):
+    """Une listas de pujas ya ordenadas por -price (el orden de Bid y ArchivedBid)."""
+    return list(merge(*bids, key=attrgetter('price'), reverse=True))
+
+
+def archive_auctions(auction_ids, chunk_size=1000):
+    """
+    Mueve a ArchivedBid las pujas de las subastas indicadas y guarda su
+    resumen (AuctionArchive), todo en una transacción: si algo falla no queda
+    ninguna a medias. Las que ya estén archivadas se saltan, así que se puede
+    repetir o reanudar sin duplicar nada.
+
+    Devuelve (subastas archivadas, pujas movidas).
+    """
+    with transaction.atomic():
+        auctions = list(
+            Auction.objects.select_for_update()
+            .filter(pk__in=auction_ids, archived_at__isnull=True, settlement_status__in=ARCHIVABLE_STATUSES)
+            .order_by('id')
+        )
+        if not auctions:
+            return 0, 0
+        ids = [auction.pk for auction in auctions]
+
+        counts = Counter()
+        bidders = {}
+        winning_ids = {auction.highest_bid_id for auction in auctions if auction.highest_bid_id}
+        rows = (
+            Bid.objects.filter(auction_id__in=ids).order_by('id')
+            .values_list('id', 'auction_id', 'price', 'creation_date', 'bidder_id')
+            .iterator(chunk_size=chunk_size)
+        )
+        while chunk := list(islice(rows, chunk_size)):
+            ArchivedBid.objects.bulk_create([
+                ArchivedBid(id=pk, auction_id=auction_id, price=price, creation_date=created, bidder_id=bidder_id)
+                for pk, auction_id, price, created, bidder_id in chunk
+            ])
+            for pk, auction_id, _, _, bidder_id in chunk:
+                counts[auction_id] += 1
+                if pk in winning_ids:
+                    bidders[pk] = bidder_id
+
+        AuctionArchive.objects.bulk_create([
+            AuctionArchive(
+                auction=auction,
+                winning_bid_id=auction.highest_bid_id,
+                winner_id=bidders.get(auction.highest_bid_id),
+                final_price=auction.current_price,
+                bid_count=counts[auction.pk],
+                rating_sum=auction.rating_sum,
+                rating_count=auction.rating_count,
+                settlement_status=auction.settlement_status,
+            )
+            for auction in auctions
+        ])
+
+        # current_price y bid_count se quedan en la subasta; la puja ganadora ya no está en Bid
+        Auction.objects.filter(pk__in=ids).update(highest_bid=None, archived_at=timezone.now())
+        ProxyBid.objects.filter(auction_id__in=ids).delete()
+        # DELETE directo, sin el Collector: las señales post_delete de Bid
+        # recalcularían la caché de la subasta con una consulta por puja. Nada
+        # apunta ya a estas pujas (highest_bid se ha vaciado arriba)
+        connection = connections[router.db_for_write(Bid)]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {connection.ops.quote_name(Bid._meta.db_table)} "
+                f"WHERE auction_id IN ({', '.join(['%s'] * len(ids))})",
+                ids,
+            )
+
+        response_cache.invalidate(*(f"auction:{pk}" for pk in ids))
+    return len(ids), sum(counts.values())
@@ -0,0 +1,294 @@
+"""
+Variantes async de las lecturas más frecuentes. Se sirven con asgi.py: la
+vista no pasa por el hilo de sync_to_async para autenticar, paginar y
+serializar, solo las consultas usan el ORM async (aget, acount, aiterator).
+Las respuestas son las mismas que las de la vista DRF equivalente
+(`sync_view`), que sigue atendiendo el resto de métodos (POST, PUT, ...).
+Se activan por ruta con ASYNC_READ_VIEWS (ver `read_view`).
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.http import Http404, HttpResponse
+from django.views import View
+from rest_framework import status
+from rest_framework.exceptions import APIException, AuthenticationFailed, NotAuthenticated, NotFound
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from rest_framework.views import exception_handler
+
+from users.authentication import CachedJWTAuthentication
+from . import cache as response_cache
+from .archive import aauction_bids, merge_bids, user_bids
+from .fieldsets import sparse_queryset
+from .projections import projection_for
+from .models import Auction, Comment, Rating, WalletAccount
+from .pagination import AuctionPagination, BidPagination
+from .serializers import AuctionDetailSerializer, AuctionListCreateSerializer, BidListCreateSerializer, RatingListCreateSerializer, UserBidSerializer
+from .views import (
+    AuctionListCreate, AuctionRetrieveUpdateDestroy, BidListCreate, RatingListCreateView, UserAuctionListView,
+    UserBidListView, UserCommentListView, UserRatingListView, WalletBalanceView, auction_listing_queryset,
+    filter_auctions, next_closing_queryset, timeout_until, user_comment_data, user_rating_data,
+)
+
+
+def read_view(name, async_view):
+    """La vista async si la ruta `name` está en ASYNC_READ_VIEWS (o hay "all"), si no la DRF de siempre."""
+    enabled = getattr(settings, "ASYNC_READ_VIEWS", [])
+    return async_view if "all" in enabled or name in enabled else async_view.sync_view
+
+
+async def aseconds_until_next_closing():
+    return timeout_until(await next_closing_queryset().afirst())
+
+
+class AsyncReadView(View):
+    sync_view = None
+    requires_auth = False
+    # Mismo criterio que CachedResponseMixin; None = sin caché de respuestas
+    cache_namespaces = None
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        # Igual que APIView: se autentica con JWT, no con la cookie de sesión
+        view.csrf_exempt = True
+        return view
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return sync_to_async(self.sync_fallback)(request, *args, **kwargs)
+        return super().dispatch(request, *args, **kwargs)
+
+    async def get(self, request, *args, **kwargs):
+        try:
+            await self.authenticate(request)
+            if self.use_sync_view(request):
+                return await sync_to_async(self.sync_fallback)(request, *args, **kwargs)
+            if self.cache_namespaces is None or request.user.is_authenticated:
+                return self.render(await self.get_data(request, *args, **kwargs))
+            return await self.cached_response(request, *args, **kwargs)
+        except (APIException, Http404) as exc:
+            return self.error(request, exc)
+
+    def sync_fallback(self, request, *args, **kwargs):
+        return self.sync_view.as_view()(request, *args, **kwargs)
+
+    def use_sync_view(self, request):
+        return False
+
+    async def authenticate(self, request):
+        # Sustituye al usuario perezoso de la sesión, que haría una consulta síncrona
+        authenticator = CachedJWTAuthentication()
+        result = await authenticator.aauthenticate(request)
+        request.user = result[0] if result else AnonymousUser()
+        if self.requires_auth and not request.user.is_authenticated:
+            raise NotAuthenticated
+
+    async def get_data(self, request, *args, **kwargs):
+        raise NotImplementedError
+
+    async def get_cache_timeout(self):
+        return response_cache.default_timeout()
+
+    async def cached_response(self, request, *args, **kwargs):
+        # Mismas claves que la vista DRF (con su nombre): las dos comparten las entradas
+        state = await response_cache.anamespace_state(self.cache_namespaces(**kwargs))
+        key = response_cache.response_key(self.sync_view.__name__, request, state)
+        cache = response_cache.get_cache()
+        entry = await cache.aget(key)
+        if entry is None:
+            await response_cache.arecord("miss")
+            with response_cache.fill_context(state):
+                data = await self.get_data(request, *args, **kwargs)
+            entry = response_cache.new_entry(data)
+            await cache.aset(key, entry, timeout=await self.get_cache_timeout())
+            outcome = "MISS"
+        else:
+            await response_cache.arecord("hit")
+            outcome = "HIT"
+
+        if response_cache.not_modified(request, entry):
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = self.render(entry["data"])
+        for header, value in response_cache.entry_headers(entry, outcome).items():
+            response[header] = value
+        return response
+
+    def error(self, request, exc):
+        if isinstance(exc, (NotAuthenticated, AuthenticationFailed)):
+            exc.auth_header = CachedJWTAuthentication().authenticate_header(request)
+        error = exception_handler(exc, {})
+        response = self.render(error.data, error.status_code)
+        for header in ("WWW-Authenticate", "Retry-After"):
+            if header in error:
+                response[header] = error[header]
+        return response
+
+    @staticmethod
+    def render(data, code=status.HTTP_200_OK):
+        response = HttpResponse(JSONRenderer().render(data), status=code, content_type="application/json")
+        response["Vary"] = "Accept"
+        return response
+
+
+class AsyncPageMixin:
+    """
+    Paginación por número de página como PageNumberPagination (count, next,
+    previous, results). Con ?pagination=cursor o ?cursor= responde la vista
+    DRF, que es la que implementa el cursor.
+    """
+    pagination_class = None
+
+    def use_sync_view(self, request):
+        return self.pagination_class().use_cursor(request)
+
+    async def paginate(self, request, queryset, serializer_class, context=None):
+        page_size = self.pagination_class.page_size or api_settings.PAGE_SIZE
+        count = await queryset.acount()
+        num_pages = max(1, -(-count // page_size))
+        raw = request.GET.get("page", 1)
+        try:
+            number = num_pages if raw == "last" else int(raw)
+        except (TypeError, ValueError):
+            number = 0
+        if not 1 <= number <= num_pages:
+            raise NotFound("Invalid page.")
+
+        offset = (number - 1) * page_size
+        projection = projection_for(serializer_class, request, context)
+        if projection is not None:
+            rows = [row async for row in projection.values(queryset)[offset:offset + page_size].aiterator()]
+            results = projection.render(rows)
+        else:
+            objects = [obj async for obj in queryset[offset:offset + page_size].aiterator()]
+            results = serializer_class(objects, many=True, context=context or {}).data
+        url = request.build_absolute_uri()
+        next_link = replace_query_param(url, "page", number + 1) if number < num_pages else None
+        if number == 1:
+            previous_link = None
+        elif number == 2:
+            previous_link = remove_query_param(url, "page")
+        else:
+            previous_link = replace_query_param(url, "page", number - 1)
+        return {
+            "count": count,
+            "next": next_link,
+            "previous": previous_link,
+            "results": results,
+        }
+
+
+class AsyncAuctionListView(AsyncPageMixin, AsyncReadView):
+    sync_view = AuctionListCreate
+    pagination_class = AuctionPagination
+
+    def cache_namespaces(self):
+        return ["auction-list", "categories"]
+
+    async def get_cache_timeout(self):
+        return await aseconds_until_next_closing()
+
+    async def get_data(self, request):
+        queryset = filter_auctions(auction_listing_queryset(), request.GET)
+        queryset = sparse_queryset(queryset, AuctionListCreateSerializer, request)
+        return await self.paginate(request, queryset, AuctionListCreateSerializer, {"request": request})
+
+
+class AsyncAuctionDetailView(AsyncReadView):
+    sync_view = AuctionRetrieveUpdateDestroy
+
+    def cache_namespaces(self, pk):
+        return [f"auction:{pk}", "categories"]
+
+    async def get_cache_timeout(self):
+        return await aseconds_until_next_closing()
+
+    async def get_data(self, request, pk):
+        try:
+            auctions = sparse_queryset(Auction.objects.select_related("auctioneer", "category"), AuctionDetailSerializer, request)
+            auction = await auctions.aget(pk=pk)
+        except Auction.DoesNotExist:
+            raise NotFound(detail="La subasta solicitada no existe.")
+        return AuctionDetailSerializer(auction, context={"request": request}).data
+
+
+class AsyncBidListView(AsyncPageMixin, AsyncReadView):
+    sync_view = BidListCreate
+    pagination_class = BidPagination
+
+    async def get_data(self, request, auction_id):
+        bids = (await aauction_bids(auction_id)).select_related("auction", "bidder")
+        bids = sparse_queryset(bids, BidListCreateSerializer, request)
+        return await self.paginate(request, bids, BidListCreateSerializer, {"request": request})
+
+
+class AsyncRatingListView(AsyncReadView):
+    sync_view = RatingListCreateView
+
+    async def get_data(self, request, auction_id):
+        ratings = sparse_queryset(Rating.objects.filter(auction_id=auction_id).select_related("user"), RatingListCreateSerializer, request)
+        projection = projection_for(RatingListCreateSerializer, request, {"request": request})
+        if projection is not None:
+            results = projection.render([row async for row in projection.values(ratings).aiterator()])
+        else:
+            ratings = [rating async for rating in ratings.aiterator()]
+            results = RatingListCreateSerializer(ratings, many=True, context={"request": request}).data
+        # La media sale de los agregados guardados en la subasta
+        stats = await Auction.objects.filter(pk=auction_id).values_list("rating_sum", "rating_count").afirst()
+        media = stats[0] / stats[1] if stats and stats[1] else 1
+        return {
+            "results": results,
+            "media": round(media, 2),
+        }
+
+
+class AsyncWalletBalanceView(AsyncReadView):
+    sync_view = WalletBalanceView
+    requires_auth = True
+
+    async def get_data(self, request):
+        total = await WalletAccount.abalance_for(request.user)
+        return {"saldo_actual": str(round(total, 2))}
+
+
+class AsyncUserAuctionListView(AsyncReadView):
+    sync_view = UserAuctionListView
+    requires_auth = True
+
+    async def get_data(self, request):
+        auctions = auction_listing_queryset().filter(auctioneer=request.user)
+        auctions = [auction async for auction in auctions.aiterator()]
+        return AuctionListCreateSerializer(auctions, many=True, context={"request": request}).data
+
+
+class AsyncUserCommentListView(AsyncReadView):
+    sync_view = UserCommentListView
+    requires_auth = True
+
+    async def get_data(self, request):
+        comentarios = Comment.objects.filter(user=request.user).select_related("auction", "auction__category")
+        return [user_comment_data(c) async for c in comentarios.aiterator()]
+
+
+class AsyncUserRatingListView(AsyncReadView):
+    sync_view = UserRatingListView
+    requires_auth = True
+
+    async def get_data(self, request):
+        ratings = Rating.objects.filter(user=request.user).select_related("auction", "auction__category")
+        return [user_rating_data(r) async for r in ratings.aiterator()]
+
+
+class AsyncUserBidListView(AsyncReadView):
+    sync_view = UserBidListView
+    requires_auth = True
+
+    async def get_data(self, request):
+        rows = []
+        for queryset in user_bids(request.user):
+            queryset = sparse_queryset(queryset.select_related("auction", "bidder"), UserBidSerializer, request)
+            rows.append([bid async for bid in queryset.aiterator()])
+        return UserBidSerializer(merge_bids(*rows), many=True, context={"request": request}).data
@@ -0,0 +1,141 @@
+import csv
+import io
+import json
+import time
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from rest_framework import serializers
+from rest_framework.fields import empty
+
+from . import cache as response_cache
+from .models import Auction, Category
+from .search import get_search_backend
+from .serializers import AuctionListCreateSerializer
+
+FIELDS = ('title', 'description', 'price', 'stock', 'brand', 'category', 'closing_date')
+
+
+def iter_rows(stream, fmt):
+    """Lee el fichero fila a fila (CSV con cabecera o JSON Lines) sin cargarlo entero."""
+    text = stream if isinstance(stream, io.TextIOBase) else io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        yield from csv.DictReader(text)
+    elif fmt == 'jsonl':
+        for line in text:
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield {'__error__': f"JSON no válido: {e.msg}"}
+    else:
+        raise ValueError("Formato no soportado, usa 'csv' o 'jsonl'.")
+
+
+class AuctionImporter:
+    """
+    Importación masiva de subastas: valida cada fila con los campos y
+    validadores de AuctionListCreateSerializer (salvo la miniatura), resuelve
+    las categorías con un mapa en memoria y hace bulk_create de cada lote en
+    una transacción.
+    """
+    max_reported_errors = 1000
+
+    def __init__(self, auctioneer, batch_size=1000):
+        self.auctioneer = auctioneer
+        self.batch_size = batch_size
+        # Las mismas reglas que la API: campos, validate_<campo> y validate() del serializer.
+        # La categoría se busca en un mapa en memoria (por id o por nombre) en lugar de
+        # una consulta por fila con PrimaryKeyRelatedField
+        self.serializer = AuctionListCreateSerializer()
+        self.fields = [
+            (name, self.serializer.fields[name], getattr(self.serializer, f'validate_{name}', None))
+            for name in FIELDS if name != 'category'
+        ]
+        self.category_errors = self.serializer.fields['category'].error_messages
+        self.categories = {}
+        for category_id, name in Category.objects.values_list('id', 'name'):
+            self.categories[str(category_id)] = category_id
+            self.categories[name.lower()] = category_id
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+
+    def run(self, rows):
+        start = time.perf_counter()
+        batch = []
+        for number, row in enumerate(rows, start=1):
+            auction, errors = self.build(row)
+            if errors:
+                self.failed += 1
+                if len(self.errors) < self.max_reported_errors:
+                    self.errors.append({'row': number, 'errors': errors})
+                continue
+            batch.append(auction)
+            if len(batch) >= self.batch_size:
+                self.flush(batch)
+                batch = []
+        if batch:
+            self.flush(batch)
+        elapsed = time.perf_counter() - start
+        return self.report(elapsed)
+
+    def flush(self, batch):
+        with transaction.atomic():
+            created = Auction.objects.bulk_create(batch)
+            # bulk_create no lanza señales: se indexa y se invalida la caché aquí
+            get_search_backend().index_many([auction for auction in created if auction.pk is not None])
+        response_cache.invalidate('auction-list')
+        self.created += len(created)
+
+    def build(self, row):
+        if '__error__' in row:
+            return None, {'non_field_errors': [row['__error__']]}
+
+        errors = {}
+        values = {}
+        for name, field, validate_field in self.fields:
+            raw = row.get(name)
+            # Una celda vacía cuenta como campo ausente, igual que en la API
+            raw = empty if raw is None or str(raw).strip() == '' else str(raw)
+            try:
+                value = field.run_validation(raw)
+                if validate_field:
+                    value = validate_field(value)
+                # max_length y demás validadores del modelo: bulk_create no los comprueba
+                Auction._meta.get_field(name).run_validators(value)
+            except serializers.ValidationError as exc:
+                errors[name] = [str(message) for message in exc.detail]
+            except DjangoValidationError as exc:
+                errors[name] = exc.messages
+            else:
+                values[name] = value
+
+        category = str(row.get('category') or '').strip()
+        category_id = self.categories.get(category.lower())
+        if category_id is None:
+            errors['category'] = [
+                self.category_errors['required'] if not category else self.category_errors['does_not_exist']
+            ]
+
+        if not errors:
+            try:
+                values = self.serializer.validate(values)
+            except serializers.ValidationError as exc:
+                detail = exc.detail if isinstance(exc.detail, dict) else {'non_field_errors': exc.detail}
+                errors = {name: [str(message) for message in messages] for name, messages in detail.items()}
+
+        if errors:
+            return None, errors
+        return Auction(**values, category_id=category_id, auctioneer=self.auctioneer), None
+
+    def report(self, elapsed):
+        total = self.created + self.failed
+        return {
+            'created': self.created,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors),
+            'seconds': round(elapsed, 3),
+            'rows_per_second': round(total / elapsed, 1) if elapsed else None,
+        }
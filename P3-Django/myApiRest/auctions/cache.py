@@ -0,0 +1,176 @@
+import hashlib
+import time
+from contextlib import nullcontext
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from . import db_router
+
+KEY_PREFIX = "rc"
+
+
+def get_cache():
+    return caches[getattr(settings, "RESPONSE_CACHE_ALIAS", "default")]
+
+
+def default_timeout():
+    return getattr(settings, "RESPONSE_CACHE_TIMEOUT", 60)
+
+
+def namespace_state(namespaces):
+    """
+    Devuelve {namespace: (versión, última modificación)}. Invalidar un
+    namespace es cambiar su versión, así que las claves antiguas dejan de
+    usarse sin tener que borrarlas una a una.
+    """
+    keys = {f"{KEY_PREFIX}:ns:{name}": name for name in namespaces}
+    stored = get_cache().get_many(list(keys))
+    return {name: stored.get(key, (0, 0)) for key, name in keys.items()}
+
+
+async def anamespace_state(namespaces):
+    keys = {f"{KEY_PREFIX}:ns:{name}": name for name in namespaces}
+    stored = await get_cache().aget_many(list(keys))
+    return {name: stored.get(key, (0, 0)) for key, name in keys.items()}
+
+
+def invalidate(*namespaces):
+    def bump():
+        now = time.time()
+        get_cache().set_many(
+            {f"{KEY_PREFIX}:ns:{name}": (time.time_ns(), now) for name in namespaces},
+            timeout=None,
+        )
+    # Tras el commit, para no cachear datos de una transacción que aún no es visible
+    transaction.on_commit(bump)
+
+
+def record(outcome):
+    cache = get_cache()
+    key = f"{KEY_PREFIX}:stats:{outcome}"
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        pass
+
+
+async def arecord(outcome):
+    cache = get_cache()
+    key = f"{KEY_PREFIX}:stats:{outcome}"
+    await cache.aadd(key, 0, timeout=None)
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        pass
+
+
+def stats():
+    cache = get_cache()
+    values = cache.get_many([f"{KEY_PREFIX}:stats:hit", f"{KEY_PREFIX}:stats:miss"])
+    hits = values.get(f"{KEY_PREFIX}:stats:hit", 0)
+    misses = values.get(f"{KEY_PREFIX}:stats:miss", 0)
+    total = hits + misses
+    return {"hits": hits, "misses": misses, "hit_ratio": round(hits / total, 4) if total else None}
+
+
+def normalized_params(request):
+    params = getattr(request, "query_params", request.GET)
+    return sorted(
+        (key, value)
+        for key, values in params.lists()
+        for value in values
+        if value != ""
+    )
+
+
+def response_key(view_name, request, state):
+    # El nombre es el de la vista síncrona también desde las vistas async, para compartir entradas.
+    # Esquema y host forman parte de la clave: las URL de miniaturas y de paginación son absolutas
+    fingerprint = repr((
+        view_name, request.scheme, request.get_host(), request.path, normalized_params(request), sorted(state.items()),
+    ))
+    return f"{KEY_PREFIX}:resp:" + hashlib.md5(fingerprint.encode()).hexdigest()
+
+
+def new_entry(data):
+    # ETag y Last-Modified salen del contenido y de cuándo se generó, no de la clave:
+    # al caducar en un cierre la entrada se rehace con la misma clave pero otro isOpen
+    etag = hashlib.md5(JSONRenderer().render(data)).hexdigest()
+    return {"data": data, "etag": etag, "last_modified": time.time()}
+
+
+def fill_context(state):
+    # Un namespace que acaba de cambiar puede no haber llegado a las réplicas:
+    # la entrada se rellena desde la principal para no cachear datos atrasados
+    latest = max([changed for _, changed in state.values()] + [0])
+    if time.time() - latest < db_router.sticky_seconds():
+        return db_router.use_primary()
+    return nullcontext()
+
+
+def entry_headers(entry, outcome):
+    return {
+        "ETag": quote_etag(entry["etag"]),
+        "Last-Modified": http_date(entry["last_modified"]),
+        "X-Cache": outcome,
+    }
+
+
+def not_modified(request, entry):
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match:
+        return quote_etag(entry["etag"]) in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*"
+    since = parse_http_date_safe(request.headers.get("If-Modified-Since"))
+    return since is not None and int(entry["last_modified"]) <= since
+
+
+class CachedResponseMixin:
+    """
+    Cachea las respuestas GET de una vista de DRF. La vista indica de qué
+    namespaces depende (`get_cache_namespaces`) y las señales de los modelos
+    los invalidan. Añade ETag y Last-Modified y responde 304 si el cliente
+    ya tiene la versión actual.
+    """
+
+    def response_cacheable(self, request):
+        return True
+
+    def get_cache_namespaces(self):
+        raise NotImplementedError
+
+    def get_cache_timeout(self):
+        return default_timeout()
+
+    def get(self, request, *args, **kwargs):
+        if not self.response_cacheable(request):
+            return super().get(request, *args, **kwargs)
+
+        state = namespace_state(self.get_cache_namespaces())
+        key = response_key(type(self).__name__, request, state)
+
+        cache = get_cache()
+        entry = cache.get(key)
+        if entry is None:
+            record("miss")
+            with fill_context(state):
+                response = super().get(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            entry = new_entry(response.data)
+            cache.set(key, entry, timeout=self.get_cache_timeout())
+            outcome = "MISS"
+        else:
+            record("hit")
+            outcome = "HIT"
+
+        headers = entry_headers(entry, outcome)
+        if not_modified(request, entry):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(entry["data"], headers=headers)
@@ -0,0 +1,92 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+
+KEY_PREFIX = "db:primary"
+
+# Solo se lee de las réplicas dentro de una petición segura (GET, HEAD,
+# OPTIONS) que ReplicaRoutingMiddleware ha marcado. Comandos, workers y
+# cualquier otro código siguen en la base de datos principal.
+_reads_from_replica = ContextVar("reads_from_replica", default=False)
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias.startswith("replica")]
+
+
+def sticky_seconds():
+    return getattr(settings, "DATABASE_REPLICA_STICKY_SECONDS", 10)
+
+
+def get_cache():
+    return caches[getattr(settings, "DATABASE_REPLICA_STICKY_CACHE_ALIAS", "default")]
+
+
+def _sticky_key(user_id):
+    return f"{KEY_PREFIX}:{user_id}"
+
+
+def stick_to_primary(user_id):
+    # Lo que el usuario acaba de escribir puede no haber llegado aún a las réplicas
+    get_cache().set(_sticky_key(user_id), 1, timeout=sticky_seconds())
+
+
+def is_stuck_to_primary(user_id):
+    return get_cache().get(_sticky_key(user_id)) is not None
+
+
+async def astick_to_primary(user_id):
+    await get_cache().aset(_sticky_key(user_id), 1, timeout=sticky_seconds())
+
+
+async def ais_stuck_to_primary(user_id):
+    return await get_cache().aget(_sticky_key(user_id)) is not None
+
+
+def reads_from_replica():
+    return _reads_from_replica.get()
+
+
+@contextmanager
+def read_from_replica(enabled=True):
+    token = _reads_from_replica.set(enabled and bool(replica_aliases()))
+    try:
+        yield
+    finally:
+        _reads_from_replica.reset(token)
+
+
+def use_primary():
+    return read_from_replica(False)
+
+
+class ReplicaRouter:
+    """
+    Envía a las réplicas (DATABASES "replica_*") las lecturas de los modelos
+    del catálogo listados en DATABASE_REPLICA_MODELS. Todo lo demás va a la
+    principal: escrituras, pujas, monedero, usuarios, lecturas dentro de una
+    transacción (la validación de una puja bloquea la subasta con
+    select_for_update) y lecturas fuera de una petición segura.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not reads_from_replica() or model._meta.label_lower not in settings.DATABASE_REPLICA_MODELS:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        aliases = replica_aliases()
+        return random.choice(aliases) if aliases else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Las réplicas son copias de la principal
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,69 @@
+import asyncio
+import json
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.module_loading import import_string
+
+
+class InProcessBroker:
+    """
+    Pub/sub en memoria del proceso: cada suscriptor es una asyncio.Queue
+    acotada. `publish` se puede llamar desde código síncrono (señales) y
+    reparte el evento a todas las colas de la subasta.
+    """
+    queue_size = 100
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def subscribe(self, auction_id):
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        subscriber = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            self._subscribers[auction_id].add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, auction_id, subscriber):
+        with self._lock:
+            self._subscribers[auction_id].discard(subscriber)
+            if not self._subscribers[auction_id]:
+                del self._subscribers[auction_id]
+
+    def subscriber_count(self, auction_id=None):
+        with self._lock:
+            if auction_id is not None:
+                return len(self._subscribers.get(auction_id, ()))
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def publish(self, auction_id, event, data):
+        message = (event, data)
+        with self._lock:
+            subscribers = list(self._subscribers.get(auction_id, ()))
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(_offer, queue, message)
+
+
+def _offer(queue, message):
+    # Si un cliente va lento se descarta su evento más antiguo en lugar de bloquear al resto
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(message)
+
+
+_broker = None
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        path = getattr(settings, "AUCTION_EVENT_BROKER", "auctions.events.InProcessBroker")
+        _broker = import_string(path)()
+    return _broker
+
+
+def format_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
@@ -0,0 +1,51 @@
+import csv
+from datetime import datetime
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, StreamingHttpResponse
+
+CHUNK_SIZE = 2000
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class _Echo:
+    """Pseudo-buffer para csv.writer: devuelve la línea en vez de guardarla."""
+
+    def write(self, value):
+        return value
+
+
+def _csv_lines(columns, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow([value.isoformat() if isinstance(value, datetime) else value for value in row])
+
+
+def _ndjson_lines(columns, rows):
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode(dict(zip(columns, row))) + "\n"
+
+
+def export_response(queryset, columns, fmt, filename):
+    """
+    Descarga en streaming de `queryset` en CSV o NDJSON. `columns` es un
+    dict {nombre en la salida: campo o lookup del ORM}. Las filas se leen con
+    .iterator() (cursor de servidor en Postgres), así que la memoria no crece
+    con el número de filas.
+    """
+    if fmt not in CONTENT_TYPES:
+        raise Http404("Formato no soportado, usa 'csv' o 'ndjson'.")
+    rows = queryset.values_list(*columns.values()).iterator(chunk_size=CHUNK_SIZE)
+    names = list(columns)
+    lines = _csv_lines(names, rows) if fmt == 'csv' else _ndjson_lines(names, rows)
+    response = StreamingHttpResponse(lines, content_type=CONTENT_TYPES[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{fmt}"'
+    # Que los proxies no acumulen la respuesta entera antes de enviarla
+    response['X-Accel-Buffering'] = 'no'
+    return response
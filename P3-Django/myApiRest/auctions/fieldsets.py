@@ -0,0 +1,104 @@
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+
+def _param_names(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    return {field.strip() for field in value.split(",") if field.strip()}
+
+
+def selected_fields(serializer_class, request):
+    """
+    Campos que hay que devolver según ?fields= y ?omit= (separados por comas),
+    o None si la petición no los usa. Los nombres desconocidos se ignoran.
+    Solo se aplica a las lecturas: en una escritura el serializer valida la
+    entrada con todos sus campos.
+    """
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+    params = getattr(request, "query_params", request.GET)
+    fields, omit = _param_names(params, "fields"), _param_names(params, "omit")
+    if fields is None and omit is None:
+        return None
+    available = list(serializer_class.Meta.fields)
+    keep = [name for name in available if fields is None or name in fields]
+    return {name for name in keep if name not in (omit or ())}
+
+
+def field_sources(serializer, name):
+    """
+    Rutas del modelo (con __) que lee un campo. Los SerializerMethodField las
+    declaran en Meta.sparse_sources; el resto sale de su `source`.
+    """
+    declared = getattr(serializer.Meta, "sparse_sources", {})
+    if name in declared:
+        return declared[name]
+    field = serializer.fields[name]
+    if field.source == "*":
+        return []
+    if isinstance(field, serializers.PrimaryKeyRelatedField):
+        # Solo necesita la columna de la FK, sin JOIN
+        return [f"{field.source}_id"]
+    return [field.source.replace(".", "__")]
+
+
+def _select_related_paths(related, prefix=""):
+    for name, nested in related.items():
+        yield prefix + name
+        yield from _select_related_paths(nested, f"{prefix}{name}__")
+
+
+def _deferrable(model):
+    return {field.name for field in model._meta.concrete_fields if not field.is_relation and not field.primary_key}
+
+
+def sparse_queryset(queryset, serializer_class, request):
+    """
+    Ajusta la consulta a los campos pedidos: difiere (defer) las columnas que
+    no lee ningún campo y quita los select_related que ya no hacen falta. En
+    las relaciones que solo se usan por algunas columnas (p. ej.
+    category__name) difiere también el resto de columnas de la tabla unida.
+    """
+    keep = selected_fields(serializer_class, request)
+    if keep is None:
+        return queryset
+    serializer = serializer_class()
+    paths = [path for name in keep for path in field_sources(serializer, name)]
+    model = queryset.model
+    used = {path.split("__")[0] for path in paths}
+
+    deferred = [name for name in _deferrable(model) if name not in used]
+    related = queryset.query.select_related
+    if isinstance(related, dict):
+        kept = [path for path in _select_related_paths(related) if path.split("__")[0] in used]
+        queryset = queryset.select_related(None)
+        if kept:
+            # select_related() sin argumentos seguiría todas las FKs
+            queryset = queryset.select_related(*kept)
+        for relation in {path.split("__")[0] for path in kept}:
+            columns = {path.split("__")[1] for path in paths if path.startswith(f"{relation}__")}
+            # Si algún campo usa el objeto entero (p. ej. su __str__) se carga completo
+            if relation in paths or not columns:
+                continue
+            related_model = model._meta.get_field(relation).related_model
+            deferred += [f"{relation}__{name}" for name in _deferrable(related_model) if name not in columns]
+    return queryset.defer(*deferred) if deferred else queryset
+
+
+class SparseFieldsetMixin:
+    """
+    Campos a la carta en las lecturas: ?fields=id,title,price devuelve solo
+    esos y ?omit=description quita los indicados. Los campos descartados se
+    eliminan del serializer antes de serializar, así que sus
+    SerializerMethodField ni se ejecutan; sparse_queryset() hace lo mismo
+    con la consulta.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        keep = selected_fields(type(self), self.context.get("request"))
+        if keep is not None:
+            for name in set(self.fields) - keep:
+                self.fields.pop(name)
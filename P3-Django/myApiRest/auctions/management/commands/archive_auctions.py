@@ -0,0 +1,54 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.utils import timezone
+
+from auctions.archive import archivable_auction_ids, archivable_auctions, archive_auctions, archive_horizon
+from auctions.models import Bid
+
+
+class Command(BaseCommand):
+    help = (
+        "Archiva las subastas cerradas y cobradas hace más de AUCTION_ARCHIVE_HORIZON_DAYS: "
+        "mueve sus pujas a ArchivedBid y guarda un resumen en AuctionArchive. Cada lote "
+        "es una transacción y el progreso vive en la base de datos, así que se puede "
+        "interrumpir y volver a lanzar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, help="Días desde el cierre (por defecto AUCTION_ARCHIVE_HORIZON_DAYS).")
+        parser.add_argument("--batch-size", type=int, default=100, help="Subastas por transacción.")
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Pujas por inserción.")
+        parser.add_argument("--max-batches", type=int, help="Para después de N lotes.")
+        parser.add_argument("--pause", type=float, default=0.0, help="Segundos entre lotes, para no cargar la base de datos.")
+        parser.add_argument("--dry-run", action="store_true", help="Solo cuenta lo que se archivaría.")
+
+    def handle(self, *args, **options):
+        horizon = archive_horizon() if options["days"] is None else timedelta(days=options["days"])
+        cutoff = timezone.now() - horizon
+
+        if options["dry_run"]:
+            candidates = archivable_auctions(cutoff)
+            bids = Bid.objects.filter(auction__in=candidates).aggregate(total=Count('id'))['total']
+            self.stdout.write(f"{candidates.count()} subastas cerradas antes de {cutoff:%Y-%m-%d} ({bids} pujas).")
+            return
+
+        batches = archived = moved = 0
+        while options["max_batches"] is None or batches < options["max_batches"]:
+            ids = archivable_auction_ids(cutoff, options["batch_size"])
+            if not ids:
+                break
+            start = time.perf_counter()
+            count, bids = archive_auctions(ids, options["chunk_size"])
+            batches += 1
+            archived += count
+            moved += bids
+            self.stdout.write(
+                f"Lote {batches}: {count} subastas, {bids} pujas en {(time.perf_counter() - start) * 1000:.0f} ms"
+            )
+            if options["pause"]:
+                time.sleep(options["pause"])
+
+        self.stdout.write(self.style.SUCCESS(f"{archived} subastas archivadas, {moved} pujas movidas."))
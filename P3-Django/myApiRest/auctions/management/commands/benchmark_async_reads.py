@@ -0,0 +1,234 @@
+import asyncio
+import json
+import statistics
+import threading
+import time
+import tracemalloc
+from types import ModuleType
+
+from asgiref.sync import ThreadSensitiveContext
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+from django.urls import path
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from auctions.async_views import (
+    AsyncAuctionDetailView, AsyncAuctionListView, AsyncBidListView, AsyncRatingListView, AsyncUserAuctionListView,
+    AsyncUserBidListView, AsyncUserCommentListView, AsyncUserRatingListView, AsyncWalletBalanceView,
+)
+from auctions.models import Category
+from users.models import CustomUser
+
+from .benchmark_endpoints import seed_data
+
+MODES = ("wsgi", "asgi-sync", "asgi-async")
+
+# Mismas rutas que en urls.py; cada modo sirve la vista DRF o su variante async
+VIEWS = [
+    ("api/auctions/", AsyncAuctionListView),
+    ("api/auctions/<int:pk>/", AsyncAuctionDetailView),
+    ("api/auctions/<int:auction_id>/bid/", AsyncBidListView),
+    ("api/auctions/<int:auction_id>/ratings/", AsyncRatingListView),
+    ("api/auctions/wallet/balance/", AsyncWalletBalanceView),
+    ("api/auctions/users/", AsyncUserAuctionListView),
+    ("api/auctions/user/comments/", AsyncUserCommentListView),
+    ("api/auctions/user/ratings/", AsyncUserRatingListView),
+    ("api/bids/users/", AsyncUserBidListView),
+]
+
+
+def urlconf(use_async):
+    module = ModuleType(f"benchmark_urls_{'async' if use_async else 'sync'}")
+    module.urlpatterns = [
+        path(route, (view if use_async else view.sync_view).as_view()) for route, view in VIEWS
+    ]
+    return module
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara las lecturas servidas por WSGI (un hilo por conexión), por ASGI con "
+        "las vistas DRF y por ASGI con las vistas async (auctions/async_views.py): "
+        "peticiones por segundo, latencia y memoria por conexión concurrente. Los datos "
+        "generados se confirman para que los vean todos los hilos y se borran al terminar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--auctions", type=int, default=500, help="Subastas a generar.")
+        parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50],
+                            help="Conexiones simultáneas.")
+        parser.add_argument("--requests", type=int, default=200, help="Peticiones por ruta, modo y concurrencia.")
+        parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+        parser.add_argument("--routes", nargs="*", help="Solo las rutas cuyo nombre contenga alguno de estos textos.")
+        parser.add_argument("--output", help="Fichero JSON donde guardar los resultados.")
+
+    def handle(self, *args, **options):
+        overrides = {
+            "ALLOWED_HOSTS": [*settings.ALLOWED_HOSTS, "testserver"],
+            # Se mide el acceso a datos, no la caché de respuestas
+            "CACHES": {**settings.CACHES, "benchmark": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}},
+            "RESPONSE_CACHE_ALIAS": "benchmark",
+        }
+        self.stdout.write(f"Generando {options['auctions']} subastas...")
+        fixtures = seed_data(options["auctions"])
+        try:
+            with override_settings(**overrides):
+                routes = self._routes(fixtures, options["routes"])
+                self._check_parity(routes)
+                results = self._run(routes, options)
+        finally:
+            self._cleanup(fixtures["stamp"])
+
+        if options["output"]:
+            report = {
+                "meta": {"auctions": options["auctions"], "requests": options["requests"], "database": connection.vendor},
+                "results": results,
+            }
+            with open(options["output"], "w") as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Resultados guardados en {options['output']}")
+
+    def _routes(self, fixtures, only):
+        tokens = {
+            role: str(RefreshToken.for_user(user).access_token)
+            for role, user in fixtures["users"].items()
+        }
+        auction = fixtures["auction"]
+        routes = [
+            ("auctions", "/api/auctions/", None),
+            ("auctions?search+estado", "/api/auctions/?search=guitarra&estado=abierta", None),
+            ("auctions?page=3", "/api/auctions/?page=3", None),
+            ("auctions/<id>", f"/api/auctions/{auction.pk}/", None),
+            ("auctions/<id>/bid", f"/api/auctions/{auction.pk}/bid/", None),
+            ("auctions/<id>/ratings", f"/api/auctions/{auction.pk}/ratings/", None),
+            ("auctions/wallet/balance", "/api/auctions/wallet/balance/", "buyer"),
+            ("auctions/users", "/api/auctions/users/", "seller"),
+            ("auctions/user/comments", "/api/auctions/user/comments/", "seller"),
+            ("auctions/user/ratings", "/api/auctions/user/ratings/", "seller"),
+            ("bids/users", "/api/bids/users/", "buyer"),
+        ]
+        return [
+            (name, url, {"Authorization": f"Bearer {tokens[role]}"} if role else {})
+            for name, url, role in routes
+            if not only or any(part in name for part in only)
+        ]
+
+    def _check_parity(self, routes):
+        # Antes de medir: las dos implementaciones tienen que devolver lo mismo
+        bodies = {}
+        for use_async in (False, True):
+            with override_settings(ROOT_URLCONF=urlconf(use_async)):
+                client = AsyncClient()
+
+                async def fetch(url, headers):
+                    return await client.get(url, headers=headers)
+
+                for name, url, headers in routes:
+                    response = asyncio.run(fetch(url, headers))
+                    bodies.setdefault(name, []).append((response.status_code, json.loads(response.content)))
+        for name, (sync_body, async_body) in bodies.items():
+            if sync_body != async_body:
+                self.stdout.write(self.style.ERROR(f"{name}: la respuesta async no coincide con la de DRF"))
+
+    # Medición
+
+    def _run(self, routes, options):
+        results = {}
+        self.stdout.write(
+            f"{'ruta':28} {'modo':11} {'conc':>5} {'req/s':>8} {'p50':>8} {'p95':>8} {'KiB/conn':>9} {'hilos':>6}"
+        )
+        for name, url, headers in routes:
+            for concurrency in options["concurrency"]:
+                for mode in options["modes"]:
+                    with override_settings(ROOT_URLCONF=urlconf(mode == "asgi-async")):
+                        row = self._measure(mode, url, headers, concurrency, options["requests"])
+                    results.setdefault(name, {}).setdefault(str(concurrency), {})[mode] = row
+                    self.stdout.write(
+                        f"{name:28} {mode:11} {concurrency:5} {row['rps']:8.0f} {row['p50_ms']:8.2f} "
+                        f"{row['p95_ms']:8.2f} {row['kib_per_connection']:9.1f} {row['threads']:6}"
+                    )
+        return results
+
+    def _measure(self, mode, url, headers, concurrency, requests):
+        runner = self._run_threads if mode == "wsgi" else self._run_asgi
+        runner(url, headers, concurrency, concurrency)  # calentamiento
+        timings, elapsed, threads = runner(url, headers, concurrency, requests)
+
+        # Memoria en una pasada aparte: tracemalloc ralentiza mucho las peticiones
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        runner(url, headers, concurrency, concurrency * 2)
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+        tracemalloc.stop()
+
+        return {
+            "rps": round(len(timings) / elapsed, 1),
+            "p50_ms": round(statistics.median(timings), 3),
+            "p95_ms": round(statistics.quantiles(timings, n=20)[-1], 3) if len(timings) > 1 else round(timings[0], 3),
+            "kib_per_connection": round(peak / concurrency / 1024, 1),
+            "threads": threads,
+        }
+
+    def _run_threads(self, url, headers, concurrency, requests):
+        # Como un servidor WSGI con un hilo por conexión (gunicorn gthread, runserver)
+        timings, lock = [], threading.Lock()
+        pending = iter(range(requests))
+        peak = [threading.active_count()]
+
+        def worker():
+            client = Client()
+            try:
+                while True:
+                    with lock:
+                        if next(pending, None) is None:
+                            return
+                        peak[0] = max(peak[0], threading.active_count())
+                    start = time.perf_counter()
+                    client.get(url, headers=headers)
+                    with lock:
+                        timings.append((time.perf_counter() - start) * 1000)
+            finally:
+                close_old_connections()
+                connection.close()
+
+        workers = [threading.Thread(target=worker) for _ in range(concurrency)]
+        start = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        return timings, time.perf_counter() - start, peak[0]
+
+    def _run_asgi(self, url, headers, concurrency, requests):
+        # Como ASGIHandler: cada petición en su ThreadSensitiveContext
+        timings = []
+        peak = [threading.active_count()]
+
+        async def main():
+            client = AsyncClient()
+            pending = iter(range(requests))
+
+            async def connection_loop():
+                while next(pending, None) is not None:
+                    start = time.perf_counter()
+                    async with ThreadSensitiveContext():
+                        await client.get(url, headers=headers)
+                    timings.append((time.perf_counter() - start) * 1000)
+                    peak[0] = max(peak[0], threading.active_count())
+
+            started = time.perf_counter()
+            await asyncio.gather(*(connection_loop() for _ in range(concurrency)))
+            return time.perf_counter() - started
+
+        elapsed = asyncio.run(main())
+        return timings, elapsed, peak[0]
+
+    def _cleanup(self, stamp):
+        # Usuarios en cascada (subastas, pujas, valoraciones, comentarios, monedero) y categorías
+        CustomUser.objects.filter(username__startswith=f"bench-{stamp}-").delete()
+        Category.objects.filter(name__startswith=f"bench-{stamp}-"[:50]).delete()
+        close_old_connections()
@@ -0,0 +1,310 @@
+import itertools
+import json
+import platform
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import AsyncClient, Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from auctions.models import Auction, Bid, Category, Comment, Rating, WalletTransaction
+from auctions.search import get_search_backend
+from users.models import CustomUser
+
+PASSWORD = "bench-Passw0rd"
+WORDS = (
+    "iphone samsung bicicleta reloj cámara guitarra portátil zapatillas sofá lámpara "
+    "vintage madera cuero acero nuevo usado oferta original"
+).split()
+PERCENTILES = (50, 90, 95, 99)
+
+
+class Rollback(Exception):
+    pass
+
+
+def seed_data(rows):
+    """Genera los datos de las mediciones; todo cuelga de usuarios y categorías 'bench-<stamp>-*'."""
+    rng = random.Random(0)
+    stamp = time.time_ns()
+    password = make_password(PASSWORD)
+    users = CustomUser.objects.bulk_create([
+        CustomUser(username=f"bench-{stamp}-{i}", password=password)
+        for i in range(max(rows // 20, 3))
+    ])
+    seller, buyer, admin = users[0], users[1], users[2]
+    admin.is_staff = True
+    admin.save(update_fields=["is_staff"])
+
+    categories = Category.objects.bulk_create(
+        [Category(name=f"bench-{stamp}-{i}"[:50]) for i in range(20)]
+    )
+    now = timezone.now()
+    auctions = Auction.objects.bulk_create([
+        Auction(
+            title=" ".join(rng.sample(WORDS, 3)), description=" ".join(rng.sample(WORDS, 8)),
+            price=rng.randint(1, 1000), stock=1, brand="bench",
+            category=rng.choice(categories), auctioneer=rng.choice(users),
+            closing_date=now + timedelta(days=rng.randint(-365, 30)),
+        )
+        for _ in range(rows)
+    ], batch_size=1000)
+    # El alta masiva no lanza señales: índice de búsqueda y contadores a mano
+    get_search_backend().index_many(auctions)
+
+    Bid.objects.bulk_create([
+        Bid(auction=rng.choice(auctions), bidder=rng.choice(users), price=rng.randint(1, 5000))
+        for _ in range(rows * 3)
+    ], batch_size=1000)
+    Rating.objects.bulk_create([
+        Rating(auction=auction, user=rng.choice(users), rating=rng.randint(1, 5))
+        for auction in auctions
+    ], batch_size=1000)
+    Comment.objects.bulk_create([
+        Comment(auction=rng.choice(auctions), user=rng.choice(users), title="c", content="c")
+        for _ in range(rows)
+    ], batch_size=1000)
+    for auction in auctions:
+        auction.refresh_bid_cache()
+        auction.refresh_rating_stats()
+
+    # Subasta abierta donde se puja y saldo de sobra para el comprador
+    target = Auction.objects.create(
+        title="bench target", description="bench", price=1, stock=1, brand="bench",
+        category=categories[0], auctioneer=seller, closing_date=now + timedelta(days=30),
+    )
+    WalletTransaction.objects.create(user=buyer, card_number="4" * 16, amount=10_000_000, is_deposit=True)
+    for user in (seller, buyer):
+        for _ in range(50):
+            WalletTransaction.objects.create(
+                user=user, card_number="4" * 16, amount=rng.randint(11, 500), is_deposit=True
+            )
+
+    return {
+        "users": {"seller": seller, "buyer": buyer, "admin": admin},
+        "auction": auctions[len(auctions) // 2],
+        "target": target,
+        "category": categories[0],
+        "stamp": stamp,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide latencia (percentiles) y número de consultas de los endpoints principales "
+        "con el cliente de pruebas de Django (WSGI o ASGI) sobre datos generados. "
+        "Guarda el resultado en JSON y, con --baseline, marca las regresiones. Todo se "
+        "ejecuta en una transacción que se deshace al terminar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--auctions", type=int, default=2000, help="Subastas a generar.")
+        parser.add_argument("--requests", type=int, default=30, help="Peticiones medidas por ruta.")
+        parser.add_argument("--warmup", type=int, default=3, help="Peticiones previas sin medir por ruta.")
+        parser.add_argument("--client", choices=["wsgi", "asgi"], default="wsgi")
+        parser.add_argument("--routes", nargs="*", help="Solo las rutas cuyo nombre contenga alguno de estos textos.")
+        parser.add_argument("--output", help="Fichero JSON donde guardar los resultados.")
+        parser.add_argument("--baseline", help="Resultados previos (JSON) con los que comparar.")
+        parser.add_argument("--threshold", type=float, default=0.25,
+                            help="Empeoramiento relativo del p95 que cuenta como regresión (0.25 = 25%%).")
+        parser.add_argument("--min-delta-ms", type=float, default=2.0,
+                            help="Diferencia absoluta mínima del p95 para considerarla (evita ruido).")
+        parser.add_argument("--with-cache", action="store_true",
+                            help="Mantener la caché de respuestas (por defecto se mide sin ella).")
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options["baseline"]:
+            with open(options["baseline"]) as f:
+                baseline = json.load(f)
+
+        # Sin límites de peticiones: si no, se medirían las respuestas 429
+        overrides = {"ALLOWED_HOSTS": [*settings.ALLOWED_HOSTS, "testserver"], "TOKEN_BUCKET_THROTTLES": {}}
+        if not options["with_cache"]:
+            overrides["CACHES"] = {
+                **settings.CACHES,
+                "benchmark": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"},
+            }
+            overrides["RESPONSE_CACHE_ALIAS"] = "benchmark"
+
+        with override_settings(**overrides):
+            try:
+                with transaction.atomic():
+                    fixtures = seed_data(options["auctions"])
+                    results = self._run(fixtures, options)
+                    raise Rollback
+            except Rollback:
+                pass
+
+        # Una medición con errores no sirve de referencia: no se guarda
+        failed = [name for name, row in results.items() if any(not 200 <= code < 300 for code in row["status"])]
+        if failed:
+            raise CommandError(f"Respuestas que no son 2xx en: {', '.join(failed)}.")
+
+        report = {
+            "meta": {
+                "created": timezone.now().isoformat(),
+                "auctions": options["auctions"],
+                "requests": options["requests"],
+                "client": options["client"],
+                "database": connection.vendor,
+                "python": platform.python_version(),
+                "cache": options["with_cache"],
+            },
+            "routes": results,
+        }
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Resultados guardados en {options['output']}")
+
+        if baseline is not None:
+            regressions = self._compare(baseline, report, options["threshold"], options["min_delta_ms"])
+            if regressions:
+                raise CommandError(f"{len(regressions)} regresiones respecto a {options['baseline']}.")
+            self.stdout.write(self.style.SUCCESS("Sin regresiones respecto a la referencia."))
+
+    def _routes(self, fixtures):
+        auction, target, category = fixtures["auction"], fixtures["target"], fixtures["category"]
+        filters = {
+            "search": "guitarra",
+            "category": str(category.pk),
+            "price": "minPrice=100&maxPrice=500",
+            "estado": "estado=abierta",
+        }
+        routes = []
+        for size in range(len(filters) + 1):
+            for combination in itertools.combinations(filters, size):
+                params = "&".join(
+                    f"{name}={filters[name]}" if name in ("search", "category") else filters[name]
+                    for name in combination
+                )
+                name = "auctions?" + "+".join(combination) if combination else "auctions"
+                routes.append((name, "get", f"/api/auctions/?{params}", None, None))
+
+        bid_prices = itertools.count(target.price + 1)
+        routes += [
+            ("auctions?category=nombre", "get", f"/api/auctions/?category={category.name}", None, None),
+            ("auctions?pagination=cursor", "get", "/api/auctions/?pagination=cursor", None, None),
+            ("auctions/<id>", "get", f"/api/auctions/{auction.pk}/", None, None),
+            ("auctions/<id>/bid [GET]", "get", f"/api/auctions/{auction.pk}/bid/", None, None),
+            ("auctions/<id>/bid [POST]", "post", f"/api/auctions/{target.pk}/bid/",
+             lambda: {"price": next(bid_prices)}, "buyer"),
+            ("auctions/<id>/ratings", "get", f"/api/auctions/{auction.pk}/ratings/", None, None),
+            ("auctions/<id>/comments", "get", f"/api/auctions/{auction.pk}/comments/", None, None),
+            ("auctions/users", "get", "/api/auctions/users/", None, "seller"),
+            ("auctions/user/comments", "get", "/api/auctions/user/comments/", None, "seller"),
+            ("auctions/user/ratings", "get", "/api/auctions/user/ratings/", None, "seller"),
+            ("auctions/wallet", "get", "/api/auctions/wallet/", None, "buyer"),
+            ("auctions/wallet/balance", "get", "/api/auctions/wallet/balance/", None, "buyer"),
+            ("bids/users", "get", "/api/bids/users/", None, "buyer"),
+            ("users/profile", "get", "/api/users/profile/", None, "buyer"),
+            ("users (admin)", "get", "/api/users/", None, "admin"),
+            ("users/<id> (admin)", "get", f"/api/users/{fixtures['users']['buyer'].pk}/", None, "admin"),
+            ("token", "post", "/api/token/",
+             lambda: {"username": fixtures["users"]["buyer"].username, "password": PASSWORD}, None),
+        ]
+        return routes
+
+    # Medición
+
+    def _run(self, fixtures, options):
+        tokens = {
+            role: str(RefreshToken.for_user(user).access_token)
+            for role, user in fixtures["users"].items()
+        }
+        if options["client"] == "asgi":
+            client = AsyncClient()
+
+            async def request(method, *args, **kwargs):
+                return await getattr(client, method)(*args, **kwargs)
+
+            send = async_to_sync(request)
+        else:
+            client = Client()
+
+            def send(method, *args, **kwargs):
+                return getattr(client, method)(*args, **kwargs)
+
+        results = {}
+        self.stdout.write(f"{'ruta':40} {'p50':>8} {'p95':>8} {'p99':>8} {'consultas':>9}  estado")
+        for name, method, url, body, role in self._routes(fixtures):
+            if options["routes"] and not any(part in name for part in options["routes"]):
+                continue
+            headers = {"Authorization": f"Bearer {tokens[role]}"} if role else {}
+
+            def call():
+                kwargs = {"headers": headers}
+                if body is not None:
+                    kwargs.update(data=json.dumps(body()), content_type="application/json")
+                return send(method, url, **kwargs)
+
+            for _ in range(options["warmup"]):
+                call()
+            timings, queries, statuses = [], [], set()
+            for _ in range(options["requests"]):
+                # El registro de consultas tiene un tope; se vacía para que el recuento no se sature
+                connection.queries_log.clear()
+                with CaptureQueriesContext(connection) as captured:
+                    start = time.perf_counter()
+                    response = call()
+                    timings.append((time.perf_counter() - start) * 1000)
+                queries.append(len(captured))
+                statuses.add(response.status_code)
+
+            results[name] = {
+                "url": url,
+                "method": method.upper(),
+                **{f"p{p}_ms": round(self._percentile(timings, p), 3) for p in PERCENTILES},
+                "mean_ms": round(statistics.fmean(timings), 3),
+                "max_ms": round(max(timings), 3),
+                "queries": max(queries),
+                "status": sorted(statuses),
+            }
+            row = results[name]
+            status_text = ",".join(map(str, row["status"]))
+            style = self.style.SUCCESS if all(200 <= code < 300 for code in row["status"]) else self.style.ERROR
+            self.stdout.write(
+                f"{name:40} {row['p50_ms']:8.2f} {row['p95_ms']:8.2f} {row['p99_ms']:8.2f} "
+                f"{row['queries']:9}  {style(status_text)}"
+            )
+        return results
+
+    @staticmethod
+    def _percentile(values, percentile):
+        ordered = sorted(values)
+        position = (len(ordered) - 1) * percentile / 100
+        lower = int(position)
+        upper = min(lower + 1, len(ordered) - 1)
+        return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+    def _compare(self, baseline, report, threshold, min_delta_ms):
+        regressions = []
+        for key in ("auctions", "client", "database", "cache"):
+            if baseline.get("meta", {}).get(key) != report["meta"][key]:
+                self.stdout.write(self.style.WARNING(
+                    f"La referencia usa otro '{key}' ({baseline.get('meta', {}).get(key)}); la comparación es orientativa."
+                ))
+        for name, current in report["routes"].items():
+            previous = baseline.get("routes", {}).get(name)
+            if previous is None:
+                continue
+            problems = []
+            delta = current["p95_ms"] - previous["p95_ms"]
+            if delta > min_delta_ms and current["p95_ms"] > previous["p95_ms"] * (1 + threshold):
+                problems.append(f"p95 {previous['p95_ms']:.2f} -> {current['p95_ms']:.2f} ms")
+            if current["queries"] > previous["queries"]:
+                problems.append(f"consultas {previous['queries']} -> {current['queries']}")
+            if problems:
+                regressions.append(name)
+                self.stdout.write(self.style.ERROR(f"REGRESIÓN {name}: " + "; ".join(problems)))
+        return regressions
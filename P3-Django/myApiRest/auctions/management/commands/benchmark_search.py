@@ -0,0 +1,84 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from auctions.models import Auction, Category
+from auctions.search import IcontainsSearchBackend, get_search_backend
+from users.models import CustomUser
+
+COMMON_WORDS = (
+    "nuevo usado oferta original garantía envío rápido perfecto estado rojo azul negro"
+).split()
+PRODUCT_WORDS = (
+    "iphone samsung bicicleta reloj cámara guitarra portátil zapatillas sofá lámpara "
+    "vintage madera cuero acero edición limitada coleccionista"
+).split()
+SYLLABLES = "ba ce di fo gu la me ni po ru sa te vi zo tra ple cor mun dis".split()
+# Vocabulario sintético amplio para que los términos tengan una selectividad realista
+VOCABULARY = [a + b + c for a in SYLLABLES for b in SYLLABLES for c in SYLLABLES]
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara la búsqueda icontains con el backend de texto completo sobre un "
+        "catálogo generado. Todo se ejecuta en una transacción que se deshace al final."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000)
+        parser.add_argument("--batch-size", type=int, default=10_000)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("terms", nargs="*", default=["nuevo", "guitarra", "reloj vintage", "bacedi", "tramunple"])
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._seed(options["rows"], options["batch_size"])
+                backend = get_search_backend()
+                backend.rebuild()
+                for term in options["terms"]:
+                    for name, engine in (("icontains", IcontainsSearchBackend()), (type(backend).__name__, backend)):
+                        elapsed = self._time(engine, term, options["repeat"])
+                        self.stdout.write(f"{term!r:20} {name:25} {elapsed * 1000:10.1f} ms")
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _seed(self, rows, batch_size):
+        user = CustomUser.objects.create(username=f"bench-{time.time_ns()}")
+        category = Category.objects.create(name=f"bench-{time.time_ns()}"[:50])
+        closing = timezone.now() + timedelta(days=30)
+        rng = random.Random(0)
+        start = time.perf_counter()
+        for offset in range(0, rows, batch_size):
+            Auction.objects.bulk_create([
+                Auction(
+                    title=" ".join(rng.choices(PRODUCT_WORDS, k=2) + rng.choices(VOCABULARY, k=3)),
+                    description=" ".join(
+                        rng.choices(COMMON_WORDS, k=5) + rng.choices(PRODUCT_WORDS, k=2) + rng.choices(VOCABULARY, k=25)
+                    ),
+                    price=rng.randint(1, 1000), stock=1, brand="bench",
+                    category=category, auctioneer=user, closing_date=closing,
+                )
+                for _ in range(min(batch_size, rows - offset))
+            ])
+        self.stdout.write(f"{rows} subastas generadas en {time.perf_counter() - start:.1f} s")
+
+    def _time(self, engine, term, repeat):
+        # Primera página del listado (PAGE_SIZE = 6) más el COUNT del paginador
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            queryset = engine.search(Auction.objects.all(), term)
+            queryset.count()
+            list(queryset[:6])
+            best = min(best, time.perf_counter() - start)
+        return best
@@ -0,0 +1,119 @@
+import json
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from rest_framework.renderers import JSONRenderer
+
+from auctions.management.commands.benchmark_endpoints import seed_data
+from auctions.models import Auction, Bid, Comment, Rating, WalletTransaction
+from auctions.projections import Projection
+from auctions.serializers import (
+    AuctionListCreateSerializer, BidListCreateSerializer, CommentSerializer,
+    RatingListCreateSerializer, WalletTransactionSerializer,
+)
+from auctions.views import auction_listing_queryset
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara, por serializer de listado, el serializer de DRF con la serialización "
+        "rápida (auctions/projections.py): filas por segundo solo serializando y "
+        "contando la consulta. Antes de medir comprueba que el JSON es idéntico byte a "
+        "byte. Los datos se generan en una transacción que se deshace al terminar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--auctions", type=int, default=2000, help="Subastas a generar (pujas x3).")
+        parser.add_argument("--repeat", type=int, default=5, help="Repeticiones; se queda la mejor.")
+        parser.add_argument("--output", help="Fichero JSON donde guardar los resultados.")
+
+    def handle(self, *args, **options):
+        results = {}
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            try:
+                with transaction.atomic():
+                    fixtures = seed_data(options["auctions"])
+                    self._complete(fixtures)
+                    context = {"request": RequestFactory().get("/api/auctions/")}
+                    for name, queryset, serializer_class in self._cases(fixtures):
+                        results[name] = self._measure(queryset, serializer_class, context, options["repeat"])
+                    raise Rollback
+            except Rollback:
+                pass
+
+        self.stdout.write(
+            f"{'listado':10} {'filas':>6} {'DRF ser.':>10} {'rápida ser.':>11} {'x':>5} "
+            f"{'DRF+BD':>10} {'rápida+BD':>10} {'x':>5}   (filas/s)"
+        )
+        for name, row in results.items():
+            self.stdout.write(
+                f"{name:10} {row['rows']:6} {row['drf_serialize']:10.0f} {row['fast_serialize']:11.0f} "
+                f"{row['fast_serialize'] / row['drf_serialize']:5.1f} {row['drf_total']:10.0f} "
+                f"{row['fast_total']:10.0f} {row['fast_total'] / row['drf_total']:5.1f}"
+            )
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump({"auctions": options["auctions"], "results": results}, f, indent=2)
+
+    @staticmethod
+    def _complete(fixtures):
+        # seed_data no rellena miniaturas, medias ni monedero, que también tienen su camino
+        auctions = Auction.objects.filter(category__name__startswith=f"bench-{fixtures['stamp']}")
+        auctions.update(rating_sum=7, rating_count=3)
+        for auction in list(auctions)[::2]:
+            auction.thumbnail.name = f"thumbnails/bench-{auction.pk}.jpg"
+            auction.thumbnail_variants = {"small": {"webp": f"thumbnails/variants/bench-{auction.pk}.webp"}}
+            auction.save(update_fields=["thumbnail", "thumbnail_variants"])
+        users = list(fixtures["users"].values())
+        WalletTransaction.objects.bulk_create([
+            WalletTransaction(user=users[i % len(users)], card_number="4" * 16, amount=10 + i % 90, is_deposit=i % 3 > 0)
+            for i in range(auctions.count())
+        ], batch_size=1000)
+
+    @staticmethod
+    def _cases(fixtures):
+        prefix = f"bench-{fixtures['stamp']}"
+        return [
+            ("auctions", auction_listing_queryset().filter(category__name__startswith=prefix), AuctionListCreateSerializer),
+            ("bids", Bid.objects.filter(bidder__username__startswith=prefix).select_related("auction", "bidder"),
+             BidListCreateSerializer),
+            ("comments", Comment.objects.filter(user__username__startswith=prefix).select_related("auction", "user"),
+             CommentSerializer),
+            ("ratings", Rating.objects.filter(user__username__startswith=prefix).select_related("user"),
+             RatingListCreateSerializer),
+            ("wallet", WalletTransaction.objects.filter(user__username__startswith=prefix), WalletTransactionSerializer),
+        ]
+
+    def _measure(self, queryset, serializer_class, context, repeat):
+        renderer = JSONRenderer()
+        projection = Projection(serializer_class, serializer_class.Meta.fields, context)
+        objects = list(queryset)
+        rows = list(projection.values(queryset))
+        expected = renderer.render(serializer_class(objects, many=True, context=context).data)
+        if renderer.render(projection.render(rows)) != expected:
+            raise CommandError(f"{serializer_class.__name__}: la serialización rápida no da el mismo JSON.")
+
+        def best(function):
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                function()
+                timings.append(time.perf_counter() - start)
+            return len(objects) / min(timings)
+
+        return {
+            "rows": len(objects),
+            "drf_serialize": best(lambda: serializer_class(objects, many=True, context=context).data),
+            "fast_serialize": best(lambda: projection.render(rows)),
+            "drf_total": best(lambda: serializer_class(list(queryset.all()), many=True, context=context).data),
+            "fast_total": best(lambda: projection.render(list(projection.values(queryset)))),
+            "bytes": len(expected),
+        }
@@ -0,0 +1,185 @@
+import random
+import re
+import time
+from datetime import timedelta
+from itertools import takewhile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.test import APIRequestFactory
+
+from auctions.archive import auction_bids, user_bids
+from auctions.fieldsets import sparse_queryset
+from auctions.models import Auction, Bid, Category, Comment, Rating, WalletAccount, WalletTransaction
+from auctions.search import get_search_backend
+from auctions.serializers import AuctionListCreateSerializer
+from auctions.views import auction_listing_queryset, filter_auctions
+from users.models import CustomUser
+
+
+class Rollback(Exception):
+    pass
+
+
+def seed_data(rows):
+    """Datos para que el planificador tenga algo que elegir; todo cuelga de 'plan-<stamp>-*'."""
+    rng = random.Random(0)
+    stamp = time.time_ns()
+    users = CustomUser.objects.bulk_create(
+        [CustomUser(username=f"plan-{stamp}-{i}") for i in range(max(rows // 50, 2))]
+    )
+    categories = Category.objects.bulk_create(
+        [Category(name=f"plan-{stamp}-{i}"[:50]) for i in range(20)]
+    )
+    now = timezone.now()
+    auctions = Auction.objects.bulk_create([
+        Auction(
+            title=f"Subasta {i}", description="", price=rng.randint(1, 1000), stock=1,
+            brand="plan", category=rng.choice(categories), auctioneer=rng.choice(users),
+            # La mayoría de subastas de una base real ya están cerradas
+            closing_date=now + timedelta(days=rng.randint(-365, 30)),
+        )
+        for i in range(rows)
+    ], batch_size=1000)
+    # bulk_create no lanza las señales que mantienen el índice de búsqueda
+    get_search_backend().index_many(auctions)
+    Bid.objects.bulk_create([
+        Bid(auction=rng.choice(auctions), bidder=rng.choice(users), price=rng.randint(1, 5000))
+        for _ in range(rows * 5)
+    ], batch_size=1000)
+    Rating.objects.bulk_create([
+        Rating(auction=auction, user=rng.choice(users), rating=rng.randint(1, 5))
+        for auction in auctions
+    ], batch_size=1000)
+    Comment.objects.bulk_create([
+        Comment(auction=rng.choice(auctions), user=rng.choice(users), title="c", content="c")
+        for _ in range(rows)
+    ], batch_size=1000)
+    WalletTransaction.objects.bulk_create([
+        WalletTransaction(user=rng.choice(users), card_number="0", amount=rng.randint(11, 500), is_deposit=True)
+        for _ in range(rows * 2)
+    ], batch_size=1000)
+
+
+def hot_queries():
+    """
+    {nombre: queryset} con las consultas de los endpoints más usados, construidas
+    como en las vistas (auction_listing_queryset, filter_auctions, select_related)
+    y con el tamaño de página de la API donde se paginan.
+    """
+    page = api_settings.PAGE_SIZE
+    now = timezone.now()
+    auction = Auction.objects.order_by("-id").first()
+    user = auction.auctioneer
+    listing = auction_listing_queryset()
+    live_bids, archived_bids = user_bids(user)
+    return {
+        "auctions?estado=abierta": filter_auctions(listing, {"estado": "abierta"})[:page],
+        # ?fields= sin category ni auctioneer quita los JOIN (auctions/fieldsets.py)
+        "auctions?estado=abierta&fields=id,title": sparse_queryset(
+            filter_auctions(listing, {"estado": "abierta"}), AuctionListCreateSerializer,
+            Request(APIRequestFactory().get("/", {"fields": "id,title"})),
+        )[:page],
+        # El COUNT de la paginación: Django quita los select_related y el orden
+        "auctions?estado=abierta (COUNT)": filter_auctions(listing, {"estado": "abierta"}).select_related(None).order_by(),
+        "auctions?minPrice&maxPrice": filter_auctions(listing, {"minPrice": 100, "maxPrice": 110})[:page],
+        "auctions?category&estado": filter_auctions(
+            listing, {"category": str(auction.category_id), "estado": "abierta"},
+        )[:page],
+        "auctions?search": filter_auctions(listing, {"search": auction.title})[:page],
+        "auctions/users": listing.filter(auctioneer=user),
+        "auctions/<id>/bid": auction_bids(auction.pk).select_related("auction", "bidder")[:page],
+        "highest bid": Bid.objects.filter(auction=auction).order_by("-price")[:1],
+        "bids/users": live_bids.select_related("auction", "bidder"),
+        "bids/users (archivadas)": archived_bids.select_related("auction", "bidder"),
+        "auctions/<id>/comments": Comment.objects.filter(auction=auction)[:page],
+        "auctions/user/comments": Comment.objects.filter(user=user).select_related("auction", "auction__category"),
+        "auctions/<id>/ratings": Rating.objects.filter(auction=auction).select_related("user"),
+        "auctions/user/ratings": Rating.objects.filter(user=user).select_related("auction", "auction__category"),
+        "wallet": WalletTransaction.objects.filter(user=user)[:page],
+        "wallet/balance": WalletAccount.objects.filter(user=user),
+        # Cola de run_settlement_worker, con el índice parcial auction_unsettled_idx
+        "settlement queue": Auction.objects.filter(settled_at__isnull=True, closing_date__lte=now)
+        .order_by("closing_date", "id").values_list("id", flat=True)[:200],
+    }
+
+
+# Tablas de catálogo con pocas filas que no crecen con el uso. El planificador
+# puede recorrerlas como bucle exterior de un JOIN (una búsqueda por índice en
+# la tabla grande por cada categoría), y eso no es un recorrido completo de
+# lo que importa.
+LOOKUP_TABLES = {Category._meta.db_table}
+
+
+def is_full_scan(plan):
+    """
+    True si el plan recorre una tabla o un índice entero. Un índice recorrido
+    de principio a fin (p. ej. solo para ordenar) cuenta como recorrido completo.
+    """
+    lines = plan.splitlines()
+    if connection.vendor == "postgresql":
+        for i, line in enumerate(lines):
+            seq_scan = re.search(r"\bSeq Scan on (\w+)", line)
+            if seq_scan and seq_scan.group(1) not in LOOKUP_TABLES:
+                return True
+            if re.search(r"\bIndex (Only )?Scan\b", line):
+                # Sin "Index Cond" el índice se lee entero
+                details = takewhile(lambda detail: "->" not in detail, lines[i + 1:])
+                if not any("Index Cond" in detail for detail in details):
+                    return True
+        return False
+    # SQLite: "SEARCH" usa el índice con una condición; "SCAN tabla", con o sin
+    # "USING [COVERING] INDEX", la recorre entera
+    for line in lines:
+        match = re.search(r"\bSCAN (\w+)(.*)", line)
+        if not match or match.group(1) == "CONSTANT" or match.group(1) in LOOKUP_TABLES:
+            continue
+        # FTS5: "VIRTUAL TABLE INDEX 0:M..." lleva el MATCH; "INDEX 0:" sin nada la recorre entera
+        if "VIRTUAL TABLE" in match.group(2) and re.search(r"INDEX \d+:\S", match.group(2)):
+            continue
+        return True
+    return False
+
+
+class Command(BaseCommand):
+    help = (
+        "Ejecuta EXPLAIN sobre las consultas de los endpoints más usados y falla si "
+        "alguna recorre una tabla entera. Con --rows siembra datos en una transacción "
+        "que se deshace al terminar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=5000, help="Subastas a generar (0 = usar los datos actuales).")
+
+    def handle(self, *args, **options):
+        self.verbosity = options["verbosity"]
+        try:
+            with transaction.atomic():
+                if options["rows"]:
+                    seed_data(options["rows"])
+                with connection.cursor() as cursor:
+                    cursor.execute("ANALYZE")
+                failures = self._check()
+                raise Rollback
+        except Rollback:
+            pass
+
+        if failures:
+            raise CommandError("Consultas con recorrido completo: " + ", ".join(failures))
+        self.stdout.write(self.style.SUCCESS("Todas las consultas usan índices."))
+
+    def _check(self):
+        failures = []
+        for name, queryset in hot_queries().items():
+            plan = queryset.explain()
+            full_scan = is_full_scan(plan)
+            status = self.style.ERROR("SCAN") if full_scan else self.style.SUCCESS("OK")
+            self.stdout.write(f"{status:>4} {name}")
+            if full_scan or self.verbosity > 1:
+                self.stdout.write("     " + plan.replace("\n", "\n     "))
+            if full_scan:
+                failures.append(name)
+        return failures
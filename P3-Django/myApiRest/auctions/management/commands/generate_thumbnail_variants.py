@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from auctions.models import Auction
+from auctions.thumbnails import generate_variants
+
+
+class Command(BaseCommand):
+    help = "Genera las variantes (card, detail, retina en WebP y JPEG) de las miniaturas existentes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="Regenera también las que ya tienen variantes.")
+
+    def handle(self, *args, **options):
+        auctions = Auction.objects.exclude(thumbnail="").exclude(thumbnail__isnull=True)
+        if not options["all"]:
+            auctions = auctions.filter(thumbnail_variants={})
+        done = 0
+        for auction_id, thumbnail in auctions.values_list("id", "thumbnail").iterator():
+            try:
+                generate_variants(auction_id, thumbnail)
+                done += 1
+            except (OSError, ValueError) as e:
+                self.stderr.write(f"Subasta {auction_id}: {e}")
+        self.stdout.write(self.style.SUCCESS(f"{done} miniaturas procesadas."))
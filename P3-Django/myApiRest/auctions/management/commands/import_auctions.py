@@ -0,0 +1,35 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from auctions.bulk_import import AuctionImporter, iter_rows
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = "Importa subastas desde un fichero CSV o JSON Lines en lotes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--auctioneer", required=True, help="Nombre de usuario del subastador.")
+        parser.add_argument("--format", choices=["csv", "jsonl"])
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            auctioneer = CustomUser.objects.get(username=options["auctioneer"])
+        except CustomUser.DoesNotExist:
+            raise CommandError(f"No existe el usuario {options['auctioneer']}.")
+
+        path = options["path"]
+        fmt = options["format"] or ("jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv")
+        importer = AuctionImporter(auctioneer, batch_size=options["batch_size"])
+        with open(path, encoding="utf-8-sig", newline="") as stream:
+            report = importer.run(iter_rows(stream, fmt))
+
+        for error in report["errors"]:
+            self.stderr.write(f"Fila {error['row']}: {json.dumps(error['errors'], ensure_ascii=False)}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['created']} creadas, {report['failed']} con errores "
+            f"en {report['seconds']} s ({report['rows_per_second']} filas/s)."
+        ))
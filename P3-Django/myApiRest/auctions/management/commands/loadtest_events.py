@@ -0,0 +1,70 @@
+import asyncio
+import statistics
+import threading
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from auctions.events import InProcessBroker, format_event
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide cuántos suscriptores SSE aguanta un worker: suscribe N colas en un "
+        "bucle asyncio y publica eventos desde otro hilo, como hacen las señales."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--subscribers", type=int, nargs="+", default=[100, 1000, 10000])
+        parser.add_argument("--events", type=int, default=20)
+        parser.add_argument("--auctions", type=int, default=10)
+
+    def handle(self, *args, **options):
+        for subscribers in options["subscribers"]:
+            result = asyncio.run(self._run(subscribers, options["events"], options["auctions"]))
+            self.stdout.write(
+                f"{subscribers:>7} suscriptores: entrega p50={result['p50'] * 1000:.1f} ms "
+                f"p99={result['p99'] * 1000:.1f} ms, "
+                f"{result['deliveries_per_s']:.0f} entregas/s, "
+                f"{result['memory_per_subscriber']:.0f} B/suscriptor"
+            )
+
+    async def _run(self, subscribers, events, auctions):
+        broker = InProcessBroker()
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        queues = [broker.subscribe(i % auctions)[1] for i in range(subscribers)]
+        memory = (tracemalloc.get_traced_memory()[0] - before) / max(subscribers, 1)
+        tracemalloc.stop()
+
+        latencies = []
+
+        async def consume(queue):
+            # Lo mismo que hace AuctionEventStreamView por cada cliente
+            for _ in range(events):
+                _, data = await queue.get()
+                format_event("bid", data)
+                latencies.append(time.perf_counter() - data["sent"])
+
+        def produce():
+            for price in range(events):
+                for auction_id in range(auctions):
+                    broker.publish(auction_id, "bid", {"price": price, "sent": time.perf_counter()})
+                time.sleep(0.01)
+
+        start = time.perf_counter()
+        consumers = asyncio.gather(*(consume(queue) for queue in queues))
+        producer = threading.Thread(target=produce)
+        producer.start()
+        await consumers
+        elapsed = time.perf_counter() - start
+        producer.join()
+
+        latencies.sort()
+        return {
+            "p50": statistics.median(latencies),
+            "p99": latencies[int(len(latencies) * 0.99) - 1],
+            "deliveries_per_s": len(latencies) / elapsed,
+            "memory_per_subscriber": memory,
+        }
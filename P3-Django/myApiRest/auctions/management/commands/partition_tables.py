@@ -0,0 +1,147 @@
+from datetime import datetime, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from auctions.models import Bid, WalletTransaction
+
+# Tablas que crecen sin parar, particionadas por mes según su fecha de creación
+PARTITIONED_MODELS = [(Bid, "creation_date"), (WalletTransaction, "created_at")]
+
+
+def month_start(value):
+    return datetime(value.year, value.month, 1, tzinfo=dt_timezone.utc)
+
+
+def next_month(value):
+    return month_start(datetime(value.year + value.month // 12, value.month % 12 + 1, 1))
+
+
+class Command(BaseCommand):
+    help = (
+        "PostgreSQL: particiona por rango de fechas (una partición por mes y otra "
+        "por defecto) auctions_bid y auctions_wallettransaction. Con --convert "
+        "convierte las tablas actuales copiando sus filas, índices y restricciones; "
+        "sin él solo crea las particiones de los próximos meses (lanzarlo a diario o "
+        "semanalmente). La clave primaria pasa a ser (id, fecha)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--convert", action="store_true", help="Convierte las tablas que aún no estén particionadas.")
+        parser.add_argument("--months-ahead", type=int, default=3)
+        parser.add_argument("--dry-run", action="store_true", help="Muestra el SQL sin ejecutarlo.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("El particionado solo está disponible en PostgreSQL.")
+        self.dry_run = options["dry_run"]
+
+        for model, field_name in PARTITIONED_MODELS:
+            table = model._meta.db_table
+            column = model._meta.get_field(field_name).column
+            with transaction.atomic(), connection.cursor() as cursor:
+                if not self._is_partitioned(cursor, table):
+                    if not options["convert"]:
+                        self.stdout.write(self.style.WARNING(f"{table} no está particionada; usa --convert."))
+                        continue
+                    self._convert(cursor, table, column, options["months_ahead"])
+                else:
+                    # Las filas de meses sin partición están en la de defecto; solo se añaden meses futuros
+                    self._create_partitions(cursor, table, None, options["months_ahead"])
+
+    def _execute(self, cursor, sql):
+        if self.dry_run:
+            self.stdout.write(sql + ";")
+        else:
+            cursor.execute(sql)
+
+    @staticmethod
+    def _is_partitioned(cursor, table):
+        cursor.execute("SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass", [table])
+        return cursor.fetchone() is not None
+
+    def _create_partitions(self, cursor, table, oldest, months_ahead):
+        qn = connection.ops.quote_name
+        now = timezone.now()
+        start = month_start(min(oldest or now, now))
+        end = month_start(now)
+        for _ in range(months_ahead + 1):
+            end = next_month(end)
+        created = 0
+        while start < end:
+            following = next_month(start)
+            partition = f"{table}_p{start:%Y%m}"
+            cursor.execute("SELECT to_regclass(%s)", [partition])
+            if cursor.fetchone()[0] is None:
+                self._execute(cursor, (
+                    f"CREATE TABLE {qn(partition)} PARTITION OF {qn(table)} "
+                    f"FOR VALUES FROM ('{start.isoformat()}') TO ('{following.isoformat()}')"
+                ))
+                created += 1
+            start = following
+        self.stdout.write(f"{table}: {created} particiones nuevas hasta {end:%Y-%m}.")
+
+    def _convert(self, cursor, table, column, months_ahead):
+        qn = connection.ops.quote_name
+        old = f"{table}_unpartitioned"
+
+        # Una FK hacia la tabla necesitaría la clave de partición
+        cursor.execute(
+            "SELECT conrelid::regclass::text, conname FROM pg_constraint WHERE contype = 'f' AND confrelid = %s::regclass",
+            [table],
+        )
+        inbound = cursor.fetchall()
+        if inbound:
+            raise CommandError(f"{table} tiene FKs que apuntan a ella: {inbound}")
+
+        # Índices y restricciones (salvo la clave primaria) para recrearlos sobre la tabla nueva
+        cursor.execute(
+            "SELECT pg_get_indexdef(x.indexrelid), x.indisunique FROM pg_index x "
+            "WHERE x.indrelid = %s::regclass AND NOT x.indisprimary",
+            [table],
+        )
+        indexes = cursor.fetchall()
+        if any(unique for _, unique in indexes):
+            raise CommandError(f"{table} tiene índices únicos sin la columna de partición.")
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype IN ('c', 'f')",
+            [table],
+        )
+        constraints = cursor.fetchall()
+        cursor.execute(
+            "SELECT attidentity, pg_get_serial_sequence(%s, 'id') FROM pg_attribute "
+            "WHERE attrelid = %s::regclass AND attname = 'id'",
+            [table, table],
+        )
+        identity, sequence = cursor.fetchone()
+        cursor.execute(f"SELECT MIN({qn(column)}) FROM {qn(table)}")
+        oldest = cursor.fetchone()[0]
+
+        self._execute(cursor, f"ALTER TABLE {qn(table)} RENAME TO {qn(old)}")
+        self._execute(cursor, (
+            f"CREATE TABLE {qn(table)} (LIKE {qn(old)} INCLUDING DEFAULTS INCLUDING IDENTITY INCLUDING STORAGE) "
+            f"PARTITION BY RANGE ({qn(column)})"
+        ))
+        self._execute(cursor, f"ALTER TABLE {qn(table)} ADD PRIMARY KEY (id, {qn(column)})")
+        if not identity and sequence:
+            # Columna serial: la secuencia pertenece a la tabla vieja y se borraría con ella
+            self._execute(cursor, f"ALTER SEQUENCE {sequence} OWNED BY {qn(table)}.id")
+        self._execute(cursor, f"CREATE TABLE {qn(table + '_default')} PARTITION OF {qn(table)} DEFAULT")
+        self._create_partitions(cursor, table, oldest, months_ahead)
+
+        overriding = " OVERRIDING SYSTEM VALUE" if identity else ""
+        self._execute(cursor, f"INSERT INTO {qn(table)}{overriding} SELECT * FROM {qn(old)}")
+        if identity:
+            self._execute(cursor, (
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE(MAX(id), 1), MAX(id) IS NOT NULL) "
+                f"FROM {qn(table)}"
+            ))
+        self._execute(cursor, f"DROP TABLE {qn(old)}")
+        # Se crean en la tabla particionada y PostgreSQL los propaga a cada partición
+        for definition, _ in indexes:
+            self._execute(cursor, definition)
+        for name, definition in constraints:
+            self._execute(cursor, f"ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(name)} {definition}")
+        self.stdout.write(self.style.SUCCESS(f"{table} particionada por {column}."))
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from auctions.models import Auction, Rating
+
+
+class Command(BaseCommand):
+    help = "Recalcula rating_sum/rating_count de las subastas a partir de Rating."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Solo informa de las diferencias, sin corregirlas.",
+        )
+
+    def handle(self, *args, **options):
+        expected = {
+            row["auction_id"]: (row["total"], row["count"])
+            for row in Rating.objects.values("auction_id")
+            .annotate(total=Sum("rating"), count=Count("id"))
+            .order_by()
+        }
+
+        drift = {}
+        for auction_id, rating_sum, rating_count in Auction.objects.values_list("id", "rating_sum", "rating_count").iterator():
+            correct = expected.get(auction_id, (0, 0))
+            if (rating_sum, rating_count) != correct:
+                drift[auction_id] = ((rating_sum, rating_count), correct)
+
+        for auction_id, (current, correct) in drift.items():
+            self.stdout.write(f"Subasta {auction_id}: guardado={current} valoraciones={correct}")
+
+        if options["check"]:
+            self.stdout.write(f"{len(drift)} subastas descuadradas.")
+            return
+
+        with transaction.atomic():
+            for auction_id, (current, (rating_sum, rating_count)) in drift.items():
+                Auction.objects.filter(pk=auction_id).update(rating_sum=rating_sum, rating_count=rating_count)
+
+        self.stdout.write(self.style.SUCCESS(f"{len(drift)} subastas corregidas."))
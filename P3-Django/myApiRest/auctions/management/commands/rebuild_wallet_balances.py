@@ -0,0 +1,54 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q, Sum
+
+from auctions.models import WalletAccount, WalletTransaction
+
+
+class Command(BaseCommand):
+    help = "Reconstruye el saldo materializado (WalletAccount) a partir de WalletTransaction."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Solo informa de las diferencias, sin corregirlas.",
+        )
+
+    def handle(self, *args, **options):
+        zero = Decimal("0.00")
+        totals = (
+            WalletTransaction.objects.values("user_id")
+            .annotate(
+                deposits=Sum("amount", filter=Q(is_deposit=True), default=zero),
+                withdrawals=Sum("amount", filter=Q(is_deposit=False), default=zero),
+            )
+            .order_by()
+        )
+        expected = {row["user_id"]: row["deposits"] - row["withdrawals"] for row in totals}
+        stored = dict(WalletAccount.objects.values_list("user_id", "balance"))
+
+        drift = {
+            user_id: (stored.get(user_id), balance)
+            for user_id, balance in expected.items()
+            if stored.get(user_id) != balance
+        }
+        # Cuentas sin movimientos deben quedar a cero
+        for user_id, balance in stored.items():
+            if user_id not in expected and balance != zero:
+                drift[user_id] = (balance, zero)
+
+        for user_id, (current, correct) in drift.items():
+            self.stdout.write(f"Usuario {user_id}: guardado={current} ledger={correct}")
+
+        if options["check"]:
+            self.stdout.write(f"{len(drift)} saldos descuadrados.")
+            return
+
+        with transaction.atomic():
+            for user_id, (current, correct) in drift.items():
+                WalletAccount.objects.update_or_create(user_id=user_id, defaults={"balance": correct})
+
+        self.stdout.write(self.style.SUCCESS(f"{len(drift)} saldos corregidos."))
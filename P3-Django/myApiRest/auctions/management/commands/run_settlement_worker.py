@@ -0,0 +1,48 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from auctions.models import Auction
+from auctions.settlement import due_auction_ids, next_closing_date, settle_auction
+
+logger = logging.getLogger("auctions.settlement")
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker que cierra y cobra las subastas a medida que vencen. Lee la cola "
+        "ordenada por closing_date, procesa por lotes y duerme hasta el siguiente "
+        "cierre. El estado vive en la base de datos, así que se puede reiniciar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=200)
+        parser.add_argument("--max-sleep", type=float, default=30.0, help="Segundos máximos entre comprobaciones.")
+        parser.add_argument("--once", action="store_true", help="Procesa lo vencido y termina.")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        while True:
+            ids = due_auction_ids(batch_size)
+            for auction_id in ids:
+                try:
+                    outcome, amount = settle_auction(auction_id)
+                except Auction.DoesNotExist:
+                    # Borrada entre la lectura de la cola y el cobro: no hay nada que cerrar
+                    logger.warning("Subasta %s borrada antes de cerrarla; se omite.", auction_id)
+                    continue
+                self.stdout.write(f"Subasta {auction_id}: {outcome}" + (f" ({amount}€)" if amount else ""))
+            if len(ids) == batch_size:
+                continue
+            if options["once"]:
+                return
+            time.sleep(self._sleep_seconds(options["max_sleep"]))
+
+    @staticmethod
+    def _sleep_seconds(max_sleep):
+        upcoming = next_closing_date()
+        if upcoming is None:
+            return max_sleep
+        return min(max_sleep, max(0.0, (upcoming - timezone.now()).total_seconds()))
@@ -0,0 +1,154 @@
+import json
+import random
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from auctions.middleware import QueryRecorder
+from auctions.models import Auction, Bid, Category, WalletTransaction
+from users.models import CustomUser
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Simula una guerra de pujas con los mismos pujadores y máximos dos veces: "
+        "pujando a mano (cada uno supera al líder por el incremento mínimo hasta su "
+        "máximo) y con pujas automáticas (cada uno registra su máximo una vez). Compara "
+        "peticiones, filas de Bid, consultas y tiempo en base de datos. Todo se deshace al terminar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--bidders", type=int, default=10)
+        parser.add_argument("--price", type=int, default=100, help="Precio inicial de la subasta.")
+        parser.add_argument("--spread", type=int, default=300,
+                            help="Los máximos se reparten entre precio+1 y precio+spread.")
+        parser.add_argument("--increment", type=int, default=None,
+                            help="Incremento mínimo (por defecto PROXY_BID_INCREMENT).")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", help="Fichero JSON donde guardar los resultados.")
+
+    def handle(self, *args, **options):
+        increment = options["increment"] or getattr(settings, "PROXY_BID_INCREMENT", 1)
+        # Sin límite de peticiones: todos los pujadores comparten IP y pujan seguido
+        overrides = {"ALLOWED_HOSTS": [*settings.ALLOWED_HOSTS, "testserver"], "PROXY_BID_INCREMENT": increment,
+                     "TOKEN_BUCKET_THROTTLES": {}}
+        with override_settings(**overrides):
+            try:
+                with transaction.atomic():
+                    bidders, maxima = self._seed(options)
+                    results = {
+                        "manual": self._simulate(bidders, maxima, options, increment, proxy=False),
+                        "proxy": self._simulate(bidders, maxima, options, increment, proxy=True),
+                    }
+                    raise Rollback
+            except Rollback:
+                pass
+
+        self.stdout.write(
+            f"{'modo':8} {'peticiones':>10} {'filas Bid':>10} {'consultas':>10} {'ms en BD':>9} "
+            f"{'ms total':>9} {'precio final':>12}  ganador"
+        )
+        for mode, row in results.items():
+            self.stdout.write(
+                f"{mode:8} {row['requests']:10} {row['bid_rows']:10} {row['queries']:10} {row['db_ms']:9.1f} "
+                f"{row['total_ms']:9.1f} {row['final_price']:12}  {row['winner']}"
+            )
+        manual, proxy = results["manual"], results["proxy"]
+        if manual["winner"] != proxy["winner"]:
+            self.stdout.write(self.style.WARNING("El ganador no coincide entre los dos modos."))
+        self.stdout.write(
+            f"Pujas automáticas: {manual['requests'] / max(proxy['requests'], 1):.1f}x menos peticiones, "
+            f"{manual['bid_rows'] / max(proxy['bid_rows'], 1):.1f}x menos filas, "
+            f"{manual['db_ms'] / max(proxy['db_ms'], 0.001):.1f}x menos tiempo en BD."
+        )
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump({"options": {k: options[k] for k in ("bidders", "price", "spread", "seed")},
+                           "increment": increment, "results": results}, f, indent=2)
+
+    def _seed(self, options):
+        rng = random.Random(options["seed"])
+        stamp = time.time_ns()
+        bidders = [
+            CustomUser.objects.create(username=f"bidwar-{stamp}-{i}")
+            for i in range(options["bidders"])
+        ]
+        for bidder in bidders:
+            WalletTransaction.objects.create(
+                user=bidder, card_number="4" * 16, amount=options["price"] + options["spread"] + 1, is_deposit=True
+            )
+        # Máximos distintos para que el ganador no dependa del orden
+        maxima = rng.sample(range(options["price"] + 1, options["price"] + options["spread"] + 1), len(bidders))
+        return bidders, dict(zip((bidder.pk for bidder in bidders), maxima))
+
+    def _new_auction(self, options):
+        seller = CustomUser.objects.create(username=f"bidwar-seller-{time.time_ns()}")
+        category = Category.objects.create(name=f"bidwar-{time.time_ns()}"[:50])
+        return Auction.objects.create(
+            title="bid war", description="simulación", price=options["price"], stock=1, brand="bench",
+            category=category, auctioneer=seller, closing_date=timezone.now() + timedelta(days=1),
+        )
+
+    def _simulate(self, bidders, maxima, options, increment, proxy):
+        auction = self._new_auction(options)
+        client = Client()
+        headers = {
+            bidder.pk: {"Authorization": f"Bearer {RefreshToken.for_user(bidder).access_token}"}
+            for bidder in bidders
+        }
+        order = list(bidders)
+        random.Random(options["seed"] + 1).shuffle(order)
+
+        recorder = QueryRecorder()
+        requests = rejected = 0
+        start = time.perf_counter()
+        with recorder.install():
+            if proxy:
+                for bidder in order:
+                    response = client.post(f"/api/auctions/{auction.pk}/bid/proxy/",
+                                           {"max_price": maxima[bidder.pk]}, headers=headers[bidder.pk])
+                    requests += 1
+                    # Un máximo que ya no supera el precio actual se rechaza (400), como una puja manual
+                    assert response.status_code in (201, 400), response.content
+                    rejected += response.status_code == 400
+            else:
+                # Cada uno, si no va ganando, supera al líder por el mínimo mientras no pase de su máximo
+                current, holder = options["price"], None
+                active = True
+                while active:
+                    active = False
+                    for bidder in order:
+                        price = current + increment
+                        if holder == bidder.pk or price > maxima[bidder.pk]:
+                            continue
+                        response = client.post(f"/api/auctions/{auction.pk}/bid/",
+                                               {"price": price}, headers=headers[bidder.pk])
+                        requests += 1
+                        assert response.status_code == 201, response.content
+                        current, holder = price, bidder.pk
+                        active = True
+        total_ms = (time.perf_counter() - start) * 1000
+
+        auction.refresh_from_db()
+        winner = auction.highest_bid.bidder_id if auction.highest_bid_id else None
+        return {
+            "requests": requests,
+            "rejected": rejected,
+            "bid_rows": Bid.objects.filter(auction=auction).count(),
+            "queries": recorder.count,
+            "db_ms": round(recorder.duration * 1000, 2),
+            "total_ms": round(total_ms, 2),
+            "final_price": auction.current_price,
+            "winner": next(i for i, bidder in enumerate(bidders) if bidder.pk == winner) if winner else None,
+        }
@@ -0,0 +1,43 @@
+import sqlite3
+import time
+from contextlib import closing
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from auctions.db_router import replica_aliases
+
+
+class Command(BaseCommand):
+    help = (
+        "Copia la base de datos SQLite principal en las réplicas SQLite de "
+        "DATABASE_REPLICA_URLS, para probar en local el enrutado de lecturas. "
+        "Con --interval se repite cada N segundos y simula el retraso de una réplica real."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=float, help="Segundos entre copias; sin él se copia una vez.")
+
+    def handle(self, *args, **options):
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != "sqlite":
+            raise CommandError("La base de datos principal no es SQLite.")
+        replicas = [alias for alias in replica_aliases() if connections[alias].vendor == "sqlite"]
+        if not replicas:
+            raise CommandError("No hay réplicas SQLite en DATABASE_REPLICA_URLS.")
+
+        while True:
+            for alias in replicas:
+                start = time.perf_counter()
+                self._copy(primary.settings_dict["NAME"], connections[alias].settings_dict["NAME"])
+                self.stdout.write(f"{alias}: copiada en {(time.perf_counter() - start) * 1000:.0f} ms")
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
+
+    @staticmethod
+    def _copy(source, target):
+        # La API de copia de SQLite da una instantánea coherente aunque la principal esté en uso.
+        # El "with" de sqlite3 solo cierra la transacción: closing() cierra las conexiones
+        with closing(sqlite3.connect(source)) as src, closing(sqlite3.connect(target, timeout=30)) as dst:
+            src.backup(dst)
@@ -0,0 +1,196 @@
+import hashlib
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from users.authentication import CachedJWTAuthentication
+from . import db_router
+
+logger = logging.getLogger("auctions.queries")
+
+# Listas IN de longitud variable y espacios sobrantes no cambian la forma de la consulta
+_IN_LIST = re.compile(r"\((?:\s*%s\s*,)+\s*%s\s*\)")
+_SPACES = re.compile(r"\s+")
+
+
+def fingerprint(sql):
+    shape = _SPACES.sub(" ", _IN_LIST.sub("(%s, ...)", sql)).strip()
+    return hashlib.sha1(shape.encode()).hexdigest()[:12], shape
+
+
+class QueryRecorder:
+    """execute_wrapper que cuenta consultas, su duración y cuántas veces se repite cada forma de SQL."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+        self.samples = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            key, shape = fingerprint(sql)
+            self.shapes[key] += 1
+            self.samples.setdefault(key, shape)
+
+    def install(self):
+        stack = ExitStack()
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(self))
+        return stack
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Mide las consultas de cada petición: número, tiempo en base de datos y
+    consultas repetidas. Lo añade como cabecera Server-Timing, escribe una
+    línea JSON en el logger "auctions.queries" y avisa si una misma forma de
+    SQL se ejecuta más de QUERY_INSTRUMENTATION_DUPLICATE_THRESHOLD veces
+    (el patrón típico de un N+1).
+
+    Solo se activa con QUERY_INSTRUMENTATION = True; si no, Django la quita
+    de la cadena al arrancar (MiddlewareNotUsed) y no cuesta nada.
+    Las consultas que se hacen al consumir una respuesta en streaming no se cuentan.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "QUERY_INSTRUMENTATION", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.threshold = getattr(settings, "QUERY_INSTRUMENTATION_DUPLICATE_THRESHOLD", 5)
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with recorder.install():
+            response = self.get_response(request)
+        self.report(request, response, recorder, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        # Las conexiones son por hilo: se instala en el hilo en el que
+        # sync_to_async ejecuta el ORM de esta petición
+        stack = await sync_to_async(recorder.install)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        self.report(request, response, recorder, time.perf_counter() - start)
+        return response
+
+    def report(self, request, response, recorder, elapsed):
+        duplicates = {key: count for key, count in recorder.shapes.items() if count > 1}
+        db_ms = recorder.duration * 1000
+        total_ms = elapsed * 1000
+
+        timing = [
+            f'db;dur={db_ms:.2f};desc="{recorder.count} queries"',
+            f"app;dur={max(total_ms - db_ms, 0):.2f}",
+        ]
+        if duplicates:
+            timing.append(f'dup;desc="{sum(duplicates.values())} repeated"')
+        existing = response.get("Server-Timing")
+        response["Server-Timing"] = ", ".join(([existing] if existing else []) + timing)
+
+        logger.info(json.dumps({
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "queries": recorder.count,
+            "db_ms": round(db_ms, 2),
+            "total_ms": round(total_ms, 2),
+            "duplicates": duplicates,
+        }))
+        for key, count in duplicates.items():
+            if count > self.threshold:
+                logger.warning(
+                    "Posible N+1 en %s %s: la consulta %s se ha ejecutado %d veces: %s",
+                    request.method, request.path, key, count, recorder.samples[key][:300],
+                )
+
+
+def token_user_id(request):
+    """Id de usuario del JWT de la petición, sin ir a la base de datos (None si no hay o no es válido)."""
+    authenticator = CachedJWTAuthentication()
+    header = authenticator.get_header(request)
+    if header is None:
+        return None
+    try:
+        raw_token = authenticator.get_raw_token(header)
+        if raw_token is None:
+            return None
+        return authenticator.get_validated_token(raw_token).get(api_settings.USER_ID_CLAIM)
+    except (InvalidToken, AuthenticationFailed):
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Decide en cada petición si las lecturas del catálogo pueden ir a las
+    réplicas (ver auctions/db_router.py). Las peticiones GET, HEAD y OPTIONS
+    las usan salvo que el usuario haya escrito hace menos de
+    DATABASE_REPLICA_STICKY_SECONDS; las demás van enteras a la principal y,
+    si salen bien, dejan al usuario en la principal durante ese tiempo para
+    que vea lo que acaba de escribir.
+
+    Sin réplicas configuradas Django la quita de la cadena al arrancar.
+    """
+    sync_capable = True
+    async_capable = True
+    safe_methods = ("GET", "HEAD", "OPTIONS")
+
+    def __init__(self, get_response):
+        if not db_router.replica_aliases():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        user_id = token_user_id(request)
+        if request.method in self.safe_methods:
+            replica = user_id is None or not db_router.is_stuck_to_primary(user_id)
+            with db_router.read_from_replica(replica):
+                return self.get_response(request)
+        response = self.get_response(request)
+        if user_id is not None and response.status_code < 400:
+            db_router.stick_to_primary(user_id)
+        return response
+
+    async def __acall__(self, request):
+        user_id = token_user_id(request)
+        if request.method in self.safe_methods:
+            replica = user_id is None or not await db_router.ais_stuck_to_primary(user_id)
+            with db_router.read_from_replica(replica):
+                return await self.get_response(request)
+        response = await self.get_response(request)
+        if user_id is not None and response.status_code < 400:
+            await db_router.astick_to_primary(user_id)
+        return response
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.20 on 2026-10-18 16:25
+
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_wallet_accounts(apps, schema_editor):
+    WalletTransaction = apps.get_model('auctions', 'WalletTransaction')
+    WalletAccount = apps.get_model('auctions', 'WalletAccount')
+    totals = (
+        WalletTransaction.objects.values('user_id')
+        .annotate(
+            deposits=models.Sum('amount', filter=models.Q(is_deposit=True), default=Decimal('0.00')),
+            withdrawals=models.Sum('amount', filter=models.Q(is_deposit=False), default=Decimal('0.00')),
+        )
+    )
+    WalletAccount.objects.bulk_create([
+        WalletAccount(user_id=row['user_id'], balance=row['deposits'] - row['withdrawals'])
+        for row in totals
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('auctions', '0014_wallettransaction'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WalletAccount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('balance', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='wallet_account', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(populate_wallet_accounts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.20 on 2026-10-18 16:26
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_bid_cache(apps, schema_editor):
+    Auction = apps.get_model('auctions', 'Auction')
+    Bid = apps.get_model('auctions', 'Bid')
+    for auction in Auction.objects.all().iterator():
+        bids = Bid.objects.filter(auction=auction)
+        highest = bids.order_by('-price').first()
+        auction.highest_bid = highest
+        auction.current_price = highest.price if highest else None
+        auction.bid_count = bids.count()
+        auction.save(update_fields=['highest_bid', 'current_price', 'bid_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0015_walletaccount'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auction',
+            name='bid_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='auction',
+            name='current_price',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='auction',
+            name='highest_bid',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='auctions.bid'),
+        ),
+        migrations.RunPython(populate_bid_cache, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+from django.db import migrations
+
+# SQL copiado aquí a propósito: la migración no debe cambiar si cambia auctions/search.py
+INSTALL = {
+    "postgresql": [
+        "ALTER TABLE auctions_auction ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        "GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('spanish', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('spanish', coalesce(description, '')), 'B')"
+        ") STORED",
+        "CREATE INDEX IF NOT EXISTS auctions_auction_search_gin "
+        "ON auctions_auction USING GIN (search_vector)",
+    ],
+    "sqlite": [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS auctions_auction_fts "
+        "USING fts5(title, description, tokenize='unicode61 remove_diacritics 2')",
+        "DELETE FROM auctions_auction_fts",
+        "INSERT INTO auctions_auction_fts (rowid, title, description) "
+        "SELECT id, title, description FROM auctions_auction",
+    ],
+}
+
+UNINSTALL = {
+    "postgresql": [
+        "DROP INDEX IF EXISTS auctions_auction_search_gin",
+        "ALTER TABLE auctions_auction DROP COLUMN IF EXISTS search_vector",
+    ],
+    "sqlite": [
+        "DROP TABLE IF EXISTS auctions_auction_fts",
+    ],
+}
+
+
+def install_search_index(apps, schema_editor):
+    for sql in INSTALL.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def uninstall_search_index(apps, schema_editor):
+    for sql in UNINSTALL.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0016_auction_bid_cache'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_index, uninstall_search_index),
+    ]
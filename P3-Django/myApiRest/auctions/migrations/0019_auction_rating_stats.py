@@ -0,0 +1,36 @@
+# Generated by Django 4.2.20 on 2026-10-18 16:47
+
+from django.db import migrations, models
+
+
+def populate_rating_stats(apps, schema_editor):
+    Auction = apps.get_model('auctions', 'Auction')
+    Rating = apps.get_model('auctions', 'Rating')
+    stats = (
+        Rating.objects.values('auction_id')
+        .annotate(total=models.Sum('rating'), count=models.Count('id'))
+        .order_by()
+    )
+    for row in stats:
+        Auction.objects.filter(pk=row['auction_id']).update(rating_sum=row['total'], rating_count=row['count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0018_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auction',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='auction',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_rating_stats, migrations.RunPython.noop),
+    ]
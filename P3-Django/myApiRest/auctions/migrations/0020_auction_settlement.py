@@ -0,0 +1,37 @@
+# Generated by Django 4.2.20 on 2026-10-18 16:49
+
+from django.db import migrations, models
+from django.db.models import F
+from django.utils import timezone
+
+
+def skip_closed_auctions(apps, schema_editor):
+    # Las subastas ya cerradas pudieron cobrarse a mano antes de existir el worker;
+    # se dejan fuera de la cola (estado vacío) para no cobrarlas dos veces
+    Auction = apps.get_model('auctions', 'Auction')
+    Auction.objects.filter(closing_date__lte=timezone.now()).update(settled_at=F('closing_date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0019_auction_rating_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auction',
+            name='settled_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='auction',
+            name='settlement_status',
+            field=models.CharField(blank=True, choices=[('settled', 'Cobrada'), ('no_bids', 'Sin pujas'), ('insufficient_funds', 'Saldo insuficiente')], max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='auction',
+            index=models.Index(condition=models.Q(('settled_at__isnull', True)), fields=['closing_date'], name='auction_unsettled_idx'),
+        ),
+        migrations.RunPython(skip_closed_auctions, migrations.RunPython.noop),
+    ]
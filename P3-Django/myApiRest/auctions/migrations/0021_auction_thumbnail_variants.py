@@ -0,0 +1,18 @@
+# Generated by Django 4.2.20 on 2026-10-18 16:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0020_auction_settlement'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auction',
+            name='thumbnail_variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
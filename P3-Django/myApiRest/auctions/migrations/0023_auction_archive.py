@@ -0,0 +1,69 @@
+# Generated by Django 4.2.20 on 2026-10-18 17:25
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('auctions', '0022_proxybid'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedBid',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('price', models.PositiveIntegerField()),
+                ('creation_date', models.DateTimeField()),
+            ],
+            options={
+                'ordering': ['-price'],
+            },
+        ),
+        migrations.AddField(
+            model_name='auction',
+            name='archived_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='auction',
+            name='highest_bid',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='auctions.bid'),
+        ),
+        migrations.CreateModel(
+            name='AuctionArchive',
+            fields=[
+                ('auction', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='archive', serialize=False, to='auctions.auction')),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('final_price', models.PositiveIntegerField(blank=True, null=True)),
+                ('bid_count', models.PositiveIntegerField(default=0)),
+                ('rating_sum', models.PositiveIntegerField(default=0)),
+                ('rating_count', models.PositiveIntegerField(default=0)),
+                ('settlement_status', models.CharField(blank=True, choices=[('settled', 'Cobrada'), ('no_bids', 'Sin pujas'), ('insufficient_funds', 'Saldo insuficiente')], max_length=20)),
+                ('winner', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('winning_bid', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='auctions.archivedbid')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='archivedbid',
+            name='auction',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_bids', to='auctions.auction'),
+        ),
+        migrations.AddField(
+            model_name='archivedbid',
+            name='bidder',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_bids', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='archivedbid',
+            index=models.Index(fields=['auction', '-price'], name='archivedbid_auction_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedbid',
+            index=models.Index(fields=['bidder', '-price'], name='archivedbid_bidder_price_idx'),
+        ),
+    ]
@@ -1,4 +1,6 @@
-from django.db import models
+from django.db import connections, models, router, transaction
+from django.db.models import F
+from decimal import Decimal
 from users.models import CustomUser 
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.core.validators import FileExtensionValidator
@@ -13,6 +15,15 @@ class Category(models.Model):
     
 
 class Auction(models.Model):
+    SETTLED = 'settled'
+    NO_BIDS = 'no_bids'
+    INSUFFICIENT_FUNDS = 'insufficient_funds'
+    SETTLEMENT_CHOICES = [
+        (SETTLED, 'Cobrada'),
+        (NO_BIDS, 'Sin pujas'),
+        (INSUFFICIENT_FUNDS, 'Saldo insuficiente'),
+    ]
+
     title = models.CharField(max_length=150)
     description = models.TextField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
@@ -26,14 +37,87 @@ class Auction(models.Model):
     validators=[FileExtensionValidator(['jpg', 'jpeg', 'png'])],
     null=True,
     blank=True)
+    # Variantes redimensionadas (auctions/thumbnails.py): {variante: {formato: ruta}}
+    thumbnail_variants = models.JSONField(default=dict, blank=True)
     creation_date = models.DateTimeField(auto_now_add=True)
     closing_date = models.DateTimeField()
     auctioneer = models.ForeignKey(CustomUser, related_name='auctions', on_delete=models.CASCADE) 
+    # Caché de la puja más alta; se mantiene en BidListCreate con la subasta bloqueada (Auction.locked)
+    current_price = models.PositiveIntegerField(null=True, blank=True)
+    # Sin FK en la base de datos: en PostgreSQL auctions_bid puede estar particionada
+    # por fecha (partition_tables) y no admitiría una FK solo sobre id. El SET_NULL lo hace Django
+    highest_bid = models.ForeignKey('Bid', related_name='+', null=True, blank=True, on_delete=models.SET_NULL,
+                                    db_constraint=False)
+    bid_count = models.PositiveIntegerField(default=0)
+    # Agregados de valoraciones; los mantiene Rating.save y la señal post_delete de Rating
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    # Resultado del cierre (auctions/settlement.py); settled_at nulo = pendiente
+    settlement_status = models.CharField(max_length=20, choices=SETTLEMENT_CHOICES, blank=True)
+    settled_at = models.DateTimeField(null=True, blank=True)
+    # Fecha en que sus pujas pasaron a ArchivedBid (auctions/archive.py); nulo = pujas en Bid
+    archived_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         ordering=('id',)
+        # Filtros de AuctionListCreate: estado, minPrice/maxPrice y categoría + estado
+        indexes = [
+            models.Index(fields=['closing_date'], name='auction_closing_idx'),
+            models.Index(fields=['price'], name='auction_price_idx'),
+            models.Index(fields=['category', 'closing_date'], name='auction_cat_closing_idx'),
+            # Cola del worker de cierre: solo las subastas aún sin liquidar
+            models.Index(fields=['closing_date'], condition=models.Q(settled_at__isnull=True), name='auction_unsettled_idx'),
+        ]
     def __str__(self):
         return self.title
+
+    @classmethod
+    def apply_rating(cls, auction_id, delta, count_delta):
+        cls.objects.filter(pk=auction_id).update(
+            rating_sum=F('rating_sum') + delta,
+            rating_count=F('rating_count') + count_delta,
+        )
+
+    @classmethod
+    def locked(cls, pk):
+        """
+        La subasta con select_for_update, bloqueada hasta el final de la
+        transacción. SQLite no tiene SELECT ... FOR UPDATE (Django lo omite):
+        allí una escritura que no cambia nada toma antes el bloqueo de
+        escritura, así que una segunda puja espera a la primera en lugar de
+        fallar las dos con "database is locked" al escribir.
+        """
+        if not connections[router.db_for_write(cls)].features.has_select_for_update:
+            cls.objects.filter(pk=pk).update(bid_count=F('bid_count'))
+        return cls.objects.select_for_update().get(pk=pk)
+
+    def register_bid(self, bid):
+        # Debe llamarse con la subasta bloqueada (Auction.locked)
+        self.highest_bid = bid
+        self.current_price = bid.price
+        self.bid_count += 1
+        self.save(update_fields=['highest_bid', 'current_price', 'bid_count'])
+
+    @property
+    def average_rating(self):
+        return self.rating_sum / self.rating_count if self.rating_count else None
+
+    def refresh_rating_stats(self):
+        stats = self.ratings.aggregate(total=models.Sum('rating'), count=models.Count('id'))
+        self.rating_sum = stats['total'] or 0
+        self.rating_count = stats['count']
+        self.save(update_fields=['rating_sum', 'rating_count'])
+
+    @property
+    def is_archived(self):
+        return self.archived_at is not None
+
+    def refresh_bid_cache(self):
+        highest = self.bids.order_by('-price').first()
+        self.highest_bid = highest
+        self.current_price = highest.price if highest else None
+        self.bid_count = self.bids.count()
+        self.save(update_fields=['highest_bid', 'current_price', 'bid_count'])
     
 
 class Bid(models.Model): 
@@ -44,11 +128,82 @@ class Bid(models.Model):
 
     class Meta:  
         ordering = ['-price']
+        indexes = [
+            models.Index(fields=['auction', '-price'], name='bid_auction_price_idx'),
+            models.Index(fields=['bidder', '-price'], name='bid_bidder_price_idx'),
+        ]
 
     def __str__(self): 
         return f"Bid on {self.auction} by {self.bidder}"
 
 
+class ArchivedBid(models.Model):
+    """
+    Puja de una subasta archivada. Conserva el id que tenía en Bid para que
+    las URLs de detalle sigan funcionando. Solo lectura.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    auction = models.ForeignKey(Auction, related_name='archived_bids', on_delete=models.CASCADE)
+    price = models.PositiveIntegerField()
+    creation_date = models.DateTimeField()
+    bidder = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="archived_bids")
+
+    class Meta:
+        ordering = ['-price']
+        indexes = [
+            models.Index(fields=['auction', '-price'], name='archivedbid_auction_price_idx'),
+            models.Index(fields=['bidder', '-price'], name='archivedbid_bidder_price_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived bid on {self.auction} by {self.bidder}"
+
+
+class AuctionArchive(models.Model):
+    """
+    Resumen de una subasta archivada, guardado al mover sus pujas: la puja
+    ganadora y los agregados de pujas y valoraciones en ese momento.
+    """
+    auction = models.OneToOneField(Auction, related_name='archive', on_delete=models.CASCADE, primary_key=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+    winning_bid = models.ForeignKey(ArchivedBid, related_name='+', null=True, blank=True, on_delete=models.SET_NULL)
+    winner = models.ForeignKey(CustomUser, related_name='+', null=True, blank=True, on_delete=models.SET_NULL)
+    final_price = models.PositiveIntegerField(null=True, blank=True)
+    bid_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    settlement_status = models.CharField(max_length=20, choices=Auction.SETTLEMENT_CHOICES, blank=True)
+
+    def __str__(self):
+        return f"Archivo de {self.auction_id}: {self.final_price} ({self.bid_count} pujas)"
+
+    @property
+    def average_rating(self):
+        return self.rating_sum / self.rating_count if self.rating_count else None
+
+
+class ProxyBid(models.Model):
+    """
+    Puja automática: el usuario fija un máximo y auctions/proxy_bidding.py
+    puja por él lo justo para ir ganando. Solo las pujas visibles resultantes
+    se guardan como Bid.
+    """
+    auction = models.ForeignKey(Auction, related_name='proxy_bids', on_delete=models.CASCADE)
+    bidder = models.ForeignKey(CustomUser, related_name='proxy_bids', on_delete=models.CASCADE)
+    max_price = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('auction', 'bidder')
+        indexes = [
+            models.Index(fields=['auction', '-max_price'], name='proxybid_auction_max_idx'),
+        ]
+
+    def __str__(self):
+        return f"Puja automática de {self.bidder_id} en {self.auction_id} hasta {self.max_price}"
+
+
 class Rating(models.Model):
     rating = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
@@ -57,6 +212,17 @@ class Rating(models.Model):
     class Meta:  
         unique_together = ('user', 'auction')
 
+    def save(self, *args, **kwargs):
+        # Actualiza rating_sum/rating_count de la subasta en la misma transacción
+        with transaction.atomic():
+            previous = None
+            if not self._state.adding:
+                previous = Rating.objects.filter(pk=self.pk).values_list('auction_id', 'rating').first()
+            super().save(*args, **kwargs)
+            if previous:
+                Auction.apply_rating(previous[0], -previous[1], -1)
+            Auction.apply_rating(self.auction_id, self.rating, 1)
+
 
 class Comment(models.Model):
     title = models.CharField(max_length=100)
@@ -68,6 +234,10 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['auction', '-created_at'], name='comment_auction_created_idx'),
+            models.Index(fields=['user', '-created_at'], name='comment_user_created_idx'),
+        ]
 
     def __str__(self):
         return f"Comment by {self.user} on {self.auction}"
@@ -81,6 +251,60 @@ class WalletTransaction(models.Model):
     is_deposit = models.BooleanField()  # True = ingreso, False = retiro
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='wallet_user_created_idx'),
+        ]
+
     def __str__(self):
         tipo = "Ingreso" if self.is_deposit else "Retiro"
         return f"{tipo} de {self.amount}€ por {self.user.username}"
+
+    @property
+    def signed_amount(self):
+        return self.amount if self.is_deposit else -self.amount
+
+    def save(self, *args, **kwargs):
+        # El saldo materializado se actualiza en la misma transacción que el movimiento.
+        # Al editar se deshace el importe anterior (puede cambiar de usuario o de signo);
+        # el borrado lo cubre la señal post_delete de WalletTransaction
+        with transaction.atomic():
+            previous = None
+            if not self._state.adding:
+                previous = WalletTransaction.objects.filter(pk=self.pk).values_list('user_id', 'amount', 'is_deposit').first()
+            super().save(*args, **kwargs)
+            if previous:
+                user_id, amount, is_deposit = previous
+                WalletAccount.apply(user_id, -amount if is_deposit else amount)
+            WalletAccount.apply(self.user_id, self.signed_amount)
+
+
+class WalletAccount(models.Model):
+    """
+    Saldo materializado por usuario. Se mantiene a partir de WalletTransaction
+    (save y su señal post_delete) y se puede reconstruir con
+    `python manage.py rebuild_wallet_balances`, que hace falta después de
+    operaciones en bloque (bulk_create, QuerySet.update/delete).
+    """
+    user = models.OneToOneField(CustomUser, related_name="wallet_account", on_delete=models.CASCADE)
+    balance = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0.00"))
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Saldo de {self.user_id}: {self.balance}€"
+
+    @classmethod
+    def apply(cls, user_id, delta):
+        account, _ = cls.objects.get_or_create(user_id=user_id)
+        cls.objects.filter(pk=account.pk).update(balance=F("balance") + delta)
+
+    @classmethod
+    def balance_for(cls, user):
+        balance = cls.objects.filter(user=user).values_list("balance", flat=True).first()
+        return balance if balance is not None else Decimal("0.00")
+
+    @classmethod
+    async def abalance_for(cls, user):
+        balance = await cls.objects.filter(user=user).values_list("balance", flat=True).afirst()
+        return balance if balance is not None else Decimal("0.00")
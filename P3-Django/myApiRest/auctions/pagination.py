@@ -0,0 +1,68 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class KeysetCursorPagination(CursorPagination):
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class OptInCursorPagination(PageNumberPagination):
+    """
+    Paginación por número de página (la de siempre) salvo que el cliente pida
+    ?pagination=cursor o envíe un ?cursor=. En ese caso se pagina por clave
+    (sin COUNT ni OFFSET) usando `cursor_ordering`, y se puede negociar
+    ?page_size= hasta `max_page_size`.
+
+    El cursor reordena por `cursor_ordering`. Si la petición trae alguno de
+    `ordered_params` (p. ej. ?search=, que ordena por relevancia) se pagina
+    por número de página aunque se pida el cursor, para no perder ese orden.
+    """
+    cursor_ordering = 'id'
+    ordered_params = ()
+    max_page_size = KeysetCursorPagination.max_page_size
+
+    def use_cursor(self, request):
+        params = getattr(request, 'query_params', request.GET)
+        if any(params.get(name) for name in self.ordered_params):
+            return False
+        return 'cursor' in params or params.get('pagination') == 'cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        if self.use_cursor(request):
+            self.cursor_paginator = KeysetCursorPagination()
+            self.cursor_paginator.ordering = self.cursor_ordering
+            self.cursor_paginator.page_size = self.page_size
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_html_context(self):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_html_context()
+        return super().get_html_context()
+
+
+class AuctionPagination(OptInCursorPagination):
+    cursor_ordering = 'id'
+    # La búsqueda ordena por relevancia (auctions/search.py)
+    ordered_params = ('search',)
+
+
+class BidPagination(OptInCursorPagination):
+    # Cada puja validada supera a la anterior, pero ninguna restricción impide
+    # precios repetidos (pujas creadas a mano o por el admin). Con empates el
+    # cursor de DRF desempata con un desplazamiento dentro del mismo precio
+    cursor_ordering = '-price'
+
+
+class CommentPagination(OptInCursorPagination):
+    cursor_ordering = '-created_at'
+
+
+class WalletTransactionPagination(OptInCursorPagination):
+    cursor_ordering = '-created_at'
@@ -0,0 +1,172 @@
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import ISO_8601, serializers
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from .fieldsets import field_sources, selected_fields
+
+# Campos cuyo to_representation devuelve el mismo valor que da values()
+IDENTITY_FIELDS = (
+    serializers.CharField, serializers.IntegerField, serializers.BooleanField,
+    serializers.ReadOnlyField, serializers.PrimaryKeyRelatedField,
+)
+# Campos que convierten el valor: se usa su propio to_representation
+VALUE_FIELDS = (serializers.DateField, serializers.DecimalField)
+
+
+def fast_serialization_enabled():
+    return getattr(settings, "FAST_READ_SERIALIZATION", True)
+
+
+def _datetime_converter(field):
+    """
+    DateTimeField.to_representation busca la zona horaria actual en cada
+    valor; aquí se resuelve una vez por petición. Para fechas con zona (las
+    que da la base de datos con USE_TZ) el resultado es el mismo.
+    """
+    to_representation = field.to_representation
+    output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+    if output_format is None or not settings.USE_TZ:
+        return to_representation
+    field_timezone = field.timezone if hasattr(field, "timezone") else field.default_timezone()
+
+    if output_format.lower() == ISO_8601:
+        def convert(value):
+            if isinstance(value, str) or value.tzinfo is None:
+                return to_representation(value)
+            value = value.astimezone(field_timezone).isoformat()
+            return value[:-6] + "Z" if value.endswith("+00:00") else value
+    else:
+        def convert(value):
+            if isinstance(value, str) or value.tzinfo is None:
+                return to_representation(value)
+            return value.astimezone(field_timezone).strftime(output_format)
+    return convert
+
+
+def _converter(serializer, name, field):
+    """
+    ("method", función de la fila) para los campos con row_<campo>; si no,
+    ("value", conversor del valor o None si se copia tal cual).
+    """
+    row_method = getattr(serializer, f"row_{name}", None)
+    if row_method is not None:
+        return "method", row_method
+    if isinstance(field, serializers.ImageField):
+        storage = serializer.Meta.model._meta.get_field(field.source).storage
+        request = serializer.context.get("request")
+        build_url = request.build_absolute_uri if request is not None else (lambda url: url)
+        # Como FileField.to_representation, pero con el nombre que da values()
+        return "value", lambda value: build_url(storage.url(value)) if value else None
+    if isinstance(field, IDENTITY_FIELDS):
+        return "value", None
+    if isinstance(field, serializers.DateTimeField):
+        return "value", _datetime_converter(field)
+    if isinstance(field, VALUE_FIELDS):
+        return "value", field.to_representation
+    raise ImproperlyConfigured(
+        f"{type(serializer).__name__}.{name}: define row_{name}(self, row) para la serialización rápida."
+    )
+
+
+@lru_cache(maxsize=256)
+def _plan(serializer_class, names):
+    """
+    Qué hace falta para cada campo: solo depende de la clase y de los campos,
+    así que se calcula una vez. Los conversores (que pueden depender de la
+    petición) se resuelven al crear la Projection.
+
+    Devuelve (campos legibles, columnas para values(), ((campo, columna o None), ...)).
+    La columna es None en los campos con row_<campo>, que reciben la fila entera.
+    """
+    serializer = serializer_class()
+    names = tuple(name for name in names if not serializer.fields[name].write_only)
+    paths, steps = [], []
+    for name in names:
+        kind, _ = _converter(serializer, name, serializer.fields[name])
+        sources = field_sources(serializer, name)
+        if kind == "method":
+            paths += sources
+            steps.append((name, None))
+        else:
+            paths.append(sources[0])
+            steps.append((name, sources[0]))
+    return names, tuple(dict.fromkeys(paths)), tuple(steps)
+
+
+def _getter(path, converter):
+    if path is None:
+        # row_<campo>(row)
+        return converter
+    if converter is None:
+        return lambda row: row[path]
+
+    def get(row):
+        # Igual que Serializer.to_representation: None no pasa por el campo
+        value = row[path]
+        return None if value is None else converter(value)
+    return get
+
+
+class Projection:
+    """
+    Versión de solo lectura de un serializer para listados: lee con values()
+    solo las columnas que usan sus campos y convierte cada fila con una
+    función por campo, preparada una vez por petición. El JSON es el mismo
+    que el del serializer, pero sin instanciar modelos ni recorrer los campos
+    de DRF por cada fila.
+
+    Los SerializerMethodField (y los campos que no sean columnas) necesitan
+    un método row_<campo>(self, row) equivalente a get_<campo>, con sus
+    columnas en Meta.sparse_sources.
+    """
+
+    def __init__(self, serializer_class, names, context=None):
+        _, self.paths, steps = _plan(serializer_class, tuple(names))
+        serializer = serializer_class(context=context or {})
+        self.getters = tuple(
+            (name, _getter(path, _converter(serializer, name, serializer.fields[name])[1]))
+            for name, path in steps
+        )
+
+    def row_to_dict(self, row):
+        return {name: get(row) for name, get in self.getters}
+
+    def values(self, queryset, *extra):
+        # `extra`: columnas que necesita alguien más, p. ej. el orden de la paginación por cursor
+        return queryset.values(*dict.fromkeys(self.paths + extra))
+
+    def render(self, rows):
+        row_to_dict = self.row_to_dict
+        return [row_to_dict(row) for row in rows]
+
+
+def projection_for(serializer_class, request, context=None):
+    """Projection con los campos de la petición (?fields=/?omit=), o None si está desactivada."""
+    if not fast_serialization_enabled():
+        return None
+    keep = selected_fields(serializer_class, request)
+    names = [name for name in serializer_class.Meta.fields if keep is None or name in keep]
+    return Projection(serializer_class, names, context)
+
+
+class FastListMixin:
+    """
+    Para ListAPIView: sirve el listado con Projection en lugar de instanciar
+    el serializer por fila. Mismo filtrado, paginación y respuesta.
+    """
+
+    def list(self, request, *args, **kwargs):
+        projection = projection_for(self.get_serializer_class(), request, self.get_serializer_context())
+        if projection is None:
+            return super().list(request, *args, **kwargs)
+        ordering = getattr(self.paginator, "cursor_ordering", None) if self.paginator else None
+        extra = (ordering.lstrip("-"),) if ordering else ()
+        rows = projection.values(self.filter_queryset(self.get_queryset()), *extra)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(projection.render(page))
+        return Response(projection.render(rows))
@@ -0,0 +1,94 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from rest_framework import serializers
+
+from .models import Auction, Bid, ProxyBid, WalletAccount
+from .serializers import BidListCreateSerializer
+
+
+def increment():
+    return getattr(settings, "PROXY_BID_INCREMENT", 1)
+
+
+def register_proxy_bid(auction_id, user, max_price):
+    """
+    Guarda (o cambia) el máximo de `user` en la subasta y resuelve las pujas
+    automáticas en la misma transacción. El saldo se comprueba una vez contra
+    el máximo, no en cada incremento.
+
+    Devuelve (puja automática, subasta, pujas visibles creadas).
+    """
+    with transaction.atomic():
+        auction = Auction.locked(auction_id)
+        BidListCreateSerializer.check_auction_open(auction)
+        # Mismo criterio que una puja manual: el máximo tiene que superar el precio actual
+        BidListCreateSerializer.check_bid_price(auction, max_price)
+        if max_price > WalletAccount.balance_for(user):
+            raise serializers.ValidationError("No tienes saldo suficiente para ese máximo.")
+
+        proxy, _ = ProxyBid.objects.update_or_create(auction=auction, bidder=user, defaults={"max_price": max_price})
+        placed = resolve(auction)
+    return proxy, auction, placed
+
+
+def resolve(auction):
+    """
+    Enfrenta las pujas automáticas que aún pueden subir. Debe llamarse con la
+    subasta bloqueada (Auction.locked), después de cualquier puja nueva.
+
+    Como en una subasta de segundo precio, solo importan las dos más altas:
+    la segunda puja hasta su máximo y la primera queda un incremento por
+    encima (o en su máximo, si no llega). A igual máximo gana la más antigua.
+    Se guardan como mucho dos pujas, en lugar de una por cada incremento.
+
+    El saldo se comprobó al fijar el máximo, pero puede haber bajado después:
+    cada puja automática llega como mucho a lo que su dueño tiene ahora.
+    """
+    current = auction.current_price
+    holder = Bid.objects.filter(pk=auction.highest_bid_id).values_list("bidder_id", flat=True).first()
+    floor = current if current is not None else auction.price
+
+    balance = WalletAccount.objects.filter(user_id=OuterRef("bidder_id")).values("balance")[:1]
+    candidates = (
+        ProxyBid.objects.filter(auction=auction, max_price__gt=floor)
+        .select_related("bidder")
+        .annotate(balance=Subquery(balance))
+        .order_by("-max_price", "created_at", "id")
+    )
+    proxies = []
+    for proxy in candidates:
+        # Las pujas son enteras: el límite efectivo es el saldo redondeado hacia abajo
+        proxy.limit = min(proxy.max_price, int(proxy.balance or 0))
+        if proxy.limit > floor:
+            proxies.append(proxy)
+    # Orden estable: a igual límite sigue ganando la más antigua
+    proxies.sort(key=lambda proxy: -proxy.limit)
+    if not proxies:
+        return []
+    leader = proxies[0]
+    rival = proxies[1] if len(proxies) > 1 else None
+
+    # Lo que tiene que superar el líder
+    competing = [rival.limit] if rival else []
+    if current is None:
+        # Las pujas son enteras y el precio inicial puede tener céntimos
+        competing.append(int(auction.price))
+    elif holder != leader.bidder_id:
+        competing.append(current)
+    if not competing:
+        # Ya va ganando y nadie le disputa la subasta
+        return []
+    target = min(leader.limit, max(competing) + increment())
+
+    placed = []
+    if rival and rival.limit < target:
+        placed.append(_place(auction, rival.bidder, rival.limit))
+    placed.append(_place(auction, leader.bidder, target))
+    return placed
+
+
+def _place(auction, bidder, price):
+    bid = Bid.objects.create(auction=auction, bidder=bidder, price=price)
+    auction.register_bid(bid)
+    return bid
@@ -0,0 +1,148 @@
+import re
+
+from django.conf import settings
+from django.db import connection as default_connection
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+
+class IcontainsSearchBackend:
+    """Búsqueda original con LIKE; sirve para cualquier base de datos."""
+
+    def install(self, schema_editor):
+        pass
+
+    def uninstall(self, schema_editor):
+        pass
+
+    def index(self, auction):
+        pass
+
+    def index_many(self, auctions):
+        for auction in auctions:
+            self.index(auction)
+
+    def remove(self, auction_id):
+        pass
+
+    def rebuild(self):
+        pass
+
+    def search(self, queryset, text):
+        return queryset.filter(Q(title__icontains=text) | Q(description__icontains=text))
+
+
+class PostgresSearchBackend(IcontainsSearchBackend):
+    """
+    Columna tsvector generada (se mantiene sola al guardar) con índice GIN.
+    Los resultados se ordenan por ts_rank.
+    """
+    config = "spanish"
+
+    def install(self, schema_editor):
+        schema_editor.execute(
+            "ALTER TABLE auctions_auction ADD COLUMN IF NOT EXISTS search_vector tsvector "
+            "GENERATED ALWAYS AS ("
+            f"setweight(to_tsvector('{self.config}', coalesce(title, '')), 'A') || "
+            f"setweight(to_tsvector('{self.config}', coalesce(description, '')), 'B')"
+            ") STORED"
+        )
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS auctions_auction_search_gin "
+            "ON auctions_auction USING GIN (search_vector)"
+        )
+
+    def uninstall(self, schema_editor):
+        schema_editor.execute("DROP INDEX IF EXISTS auctions_auction_search_gin")
+        schema_editor.execute("ALTER TABLE auctions_auction DROP COLUMN IF EXISTS search_vector")
+
+    def search(self, queryset, text):
+        tsquery = f"websearch_to_tsquery('{self.config}', %s)"
+        return queryset.annotate(
+            search_match=RawSQL(f"auctions_auction.search_vector @@ {tsquery}", [text], output_field=BooleanField()),
+            search_rank=RawSQL(f"ts_rank(auctions_auction.search_vector, {tsquery})", [text], output_field=FloatField()),
+        ).filter(search_match=True).order_by("-search_rank", "id")
+
+
+class SqliteSearchBackend(IcontainsSearchBackend):
+    """
+    Tabla virtual FTS5 con rowid = id de la subasta. Se sincroniza desde las
+    señales de Auction (ver auctions/signals.py) y se ordena por bm25.
+    """
+    table = "auctions_auction_fts"
+
+    def install(self, schema_editor):
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} "
+            "USING fts5(title, description, tokenize='unicode61 remove_diacritics 2')"
+        )
+        self._fill(schema_editor.connection)
+
+    def uninstall(self, schema_editor):
+        schema_editor.execute(f"DROP TABLE IF EXISTS {self.table}")
+
+    def index(self, auction):
+        with default_connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE rowid = %s", [auction.pk])
+            cursor.execute(
+                f"INSERT INTO {self.table} (rowid, title, description) VALUES (%s, %s, %s)",
+                [auction.pk, auction.title, auction.description],
+            )
+
+    def index_many(self, auctions):
+        # Para altas masivas (bulk_create): filas nuevas, sin DELETE previo
+        with default_connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {self.table} (rowid, title, description) VALUES (%s, %s, %s)",
+                [(auction.pk, auction.title, auction.description) for auction in auctions],
+            )
+
+    def remove(self, auction_id):
+        with default_connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE rowid = %s", [auction_id])
+
+    def rebuild(self):
+        self._fill(default_connection)
+
+    def _fill(self, connection):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table}")
+            cursor.execute(
+                f"INSERT INTO {self.table} (rowid, title, description) "
+                "SELECT id, title, description FROM auctions_auction"
+            )
+
+    def search(self, queryset, text):
+        words = re.findall(r"\w+", text)
+        if not words:
+            return super().search(queryset, text)
+        # Cada palabra entre comillas para no interpretar la sintaxis de FTS5; * = prefijo
+        match = " ".join('"{}"*'.format(word) for word in words)
+        match_sql = f"SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s"
+        # bm25 solo existe dentro de una consulta MATCH; con rowid = id FTS5 salta a esa fila
+        rank_sql = (
+            f"SELECT -bm25({self.table}, 10.0, 1.0) FROM {self.table} "
+            f"WHERE {self.table} MATCH %s AND {self.table}.rowid = auctions_auction.id"
+        )
+        return queryset.filter(id__in=RawSQL(match_sql, [match])).annotate(
+            search_rank=RawSQL(rank_sql, [match], output_field=FloatField()),
+        ).order_by("-search_rank", "id")
+
+
+VENDOR_BACKENDS = {
+    "postgresql": PostgresSearchBackend,
+    "sqlite": SqliteSearchBackend,
+}
+
+
+def get_search_backend(connection=None):
+    """
+    Devuelve el backend configurado en AUCTION_SEARCH_BACKEND o, si no hay
+    ninguno, el que corresponde al motor de la base de datos.
+    """
+    path = getattr(settings, "AUCTION_SEARCH_BACKEND", None)
+    if path:
+        return import_string(path)()
+    connection = connection or default_connection
+    return VENDOR_BACKENDS.get(connection.vendor, IcontainsSearchBackend)()
@@ -1,10 +1,26 @@
 from rest_framework import serializers
 from django.utils import timezone
-from .models import Category, Auction, Bid, Rating, Comment, WalletTransaction
+from .models import Category, Auction, Bid, Rating, Comment, WalletTransaction, WalletAccount, ProxyBid
 from drf_spectacular.utils import extend_schema_field
 from rest_framework.exceptions import NotFound, ValidationError
 from datetime import timedelta
 from django.db.models import Avg
+from .thumbnails import variant_urls, variant_urls_for
+from .fieldsets import SparseFieldsetMixin
+
+
+def full_name(first_name, last_name):
+    return f"{first_name} {last_name}"
+
+
+def media_rating(rating_sum, rating_count):
+    # Sin valoraciones se muestra 1
+    return round(rating_sum / rating_count if rating_count else 1, 2)
+
+
+def build_absolute_url(request):
+    # Igual que ImageField: URL absoluta si hay petición, relativa si no
+    return request.build_absolute_uri if request else (lambda url: url)
 
 
 class CategoryListCreateSerializer(serializers.ModelSerializer):
@@ -17,7 +33,7 @@ class CategoryDetailSerializer(serializers.ModelSerializer):
         model = Category
         fields = '__all__'
 
-class AuctionListCreateSerializer(serializers.ModelSerializer):
+class AuctionListCreateSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     auctioneer_name = serializers.SerializerMethodField()
     creation_date = serializers.DateTimeField(
         format="%Y-%m-%dT%H:%M:%SZ", read_only=True
@@ -43,9 +59,10 @@ class AuctionListCreateSerializer(serializers.ModelSerializer):
     brand = serializers.CharField(error_messages={"required": "La marca es obligatoria.",})
     category = serializers.PrimaryKeyRelatedField(
         queryset=Category.objects.all(),
-        error_messages={"required": "La categoría es obligatoria."}
+        error_messages={"required": "La categoría es obligatoria.", "does_not_exist": "La categoría no existe."}
     )
     thumbnail = serializers.ImageField(required=True)
+    thumbnail_variants = serializers.SerializerMethodField(read_only=True)
     isOpen = serializers.SerializerMethodField(read_only=True)
     category_name = serializers.SerializerMethodField(read_only=True)
     media_rating = serializers.SerializerMethodField(read_only=True) 
@@ -54,9 +71,19 @@ class AuctionListCreateSerializer(serializers.ModelSerializer):
         model = Auction
         fields = [
         'id', 'title', 'description', 'price', 'stock',
-        'brand', 'category', 'category_name', 'thumbnail',
-        'creation_date', 'closing_date', 'isOpen', 'auctioneer_name', 'media_rating'
+        'brand', 'category', 'category_name', 'thumbnail', 'thumbnail_variants',
+        'creation_date', 'closing_date', 'isOpen', 'auctioneer_name', 'media_rating',
+        'rating_count', 'current_price', 'bid_count'
     ]
+        read_only_fields = ['rating_count', 'current_price', 'bid_count']
+        # Columnas que leen los SerializerMethodField, para ?fields= y ?omit= (auctions/fieldsets.py)
+        sparse_sources = {
+            'auctioneer_name': ['auctioneer__first_name', 'auctioneer__last_name'],
+            'thumbnail_variants': ['thumbnail', 'thumbnail_variants'],
+            'isOpen': ['closing_date'],
+            'category_name': ['category__name'],
+            'media_rating': ['rating_sum', 'rating_count'],
+        }
 
     @extend_schema_field(serializers.BooleanField())
     def get_isOpen(self, obj):
@@ -77,9 +104,11 @@ class AuctionListCreateSerializer(serializers.ModelSerializer):
     #         raise serializers.ValidationError("Valoration has to be between 1 and 5")
     #     return value
 
+    def get_thumbnail_variants(self, obj):
+        return variant_urls(obj, build_absolute_url(self.context.get("request")))
+
     def get_media_rating(self, obj):
-        avg = obj.ratings.aggregate(Avg("rating"))["rating__avg"]
-        return round(avg or 1, 2)
+        return media_rating(obj.rating_sum, obj.rating_count)
     
     def validate(self, data):
         closing_date = data.get("closing_date")
@@ -104,9 +133,26 @@ class AuctionListCreateSerializer(serializers.ModelSerializer):
         return obj.category.name
     
     def get_auctioneer_name(self, obj):
-        return f"{obj.auctioneer.first_name} {obj.auctioneer.last_name}" if obj.auctioneer else "Anónimo"
+        return full_name(obj.auctioneer.first_name, obj.auctioneer.last_name) if obj.auctioneer else "Anónimo"
 
-class AuctionDetailSerializer(serializers.ModelSerializer):
+    # Equivalentes de los get_* sobre una fila de values() (auctions/projections.py).
+    # ProjectionParityTests compara los dos caminos
+    def row_auctioneer_name(self, row):
+        return full_name(row['auctioneer__first_name'], row['auctioneer__last_name'])
+
+    def row_thumbnail_variants(self, row):
+        return variant_urls_for(row['thumbnail'], row['thumbnail_variants'], build_absolute_url(self.context.get("request")))
+
+    def row_isOpen(self, row):
+        return row['closing_date'] > timezone.now()
+
+    def row_category_name(self, row):
+        return row['category__name']
+
+    def row_media_rating(self, row):
+        return media_rating(row['rating_sum'], row['rating_count'])
+
+class AuctionDetailSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     auctioneer_name = serializers.SerializerMethodField()
     creation_date = serializers.DateTimeField(format="%Y-%m-%dT%H:%M:%SZ",
     read_only=True)
@@ -114,17 +160,29 @@ class AuctionDetailSerializer(serializers.ModelSerializer):
     isOpen = serializers.SerializerMethodField(read_only=True)
     category_name = serializers.SerializerMethodField(read_only=True)
     es_mia = serializers.SerializerMethodField()
+    thumbnail_variants = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
         model = Auction
         fields = [
         'id', 'title', 'description', 'price', 'stock',
-        'brand', 'category', 'category_name', 'thumbnail',
+        'brand', 'category', 'category_name', 'thumbnail', 'thumbnail_variants',
         'creation_date', 'closing_date', 'isOpen', 'auctioneer_name',
-        'es_mia'
+        'es_mia', 'current_price', 'bid_count'
     ]
+        read_only_fields = ['current_price', 'bid_count']
+        sparse_sources = {
+            'auctioneer_name': ['auctioneer__first_name', 'auctioneer__last_name'],
+            'thumbnail_variants': ['thumbnail', 'thumbnail_variants'],
+            'isOpen': ['closing_date'],
+            'category_name': ['category__name'],
+            'es_mia': ['auctioneer'],
+        }
 
 
+    def get_thumbnail_variants(self, obj):
+        return variant_urls(obj, build_absolute_url(self.context.get("request")))
+
     def get_es_mia(self, obj):
         request = self.context.get("request")
 
@@ -177,10 +235,10 @@ class AuctionDetailSerializer(serializers.ModelSerializer):
         return obj.category.name
     
     def get_auctioneer_name(self, obj):
-        return f"{obj.auctioneer.first_name} {obj.auctioneer.last_name}" if obj.auctioneer else "Anónimo"
+        return full_name(obj.auctioneer.first_name, obj.auctioneer.last_name) if obj.auctioneer else "Anónimo"
     
 
-class BidListCreateSerializer(serializers.ModelSerializer):
+class BidListCreateSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     creation_date = serializers.DateTimeField(format="%Y-%m-%dT%H:%M:%SZ", read_only=True)
     bidder = serializers.StringRelatedField(read_only=True)
     auction = serializers.PrimaryKeyRelatedField(read_only=True)
@@ -189,6 +247,7 @@ class BidListCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Bid
         fields = ['id', 'auction', 'auction_title', 'price', 'creation_date', 'bidder']
+        sparse_sources = {'auction_title': ['auction__title'], 'bidder': ['bidder__username']}
 
     def validate_price(self, value):
         if value <= 0:
@@ -207,27 +266,56 @@ class BidListCreateSerializer(serializers.ModelSerializer):
 
         price = data.get("price")
 
-        highest_bid = auction.bids.order_by('-price').first()
-        if highest_bid and price <= highest_bid.price:
-            raise serializers.ValidationError("La puja debe ser mayor que la anterior.")
-        if not highest_bid and price <= auction.price:
-            raise serializers.ValidationError("La puja debe ser mayor que el precio inicial.")
+        self.check_bid_price(auction, price)
 
-        saldo = sum([
-            t.amount if t.is_deposit else -t.amount
-            for t in user.wallet_transactions.all()
-            ])
+        saldo = WalletAccount.balance_for(user)
         if price > saldo:
             raise serializers.ValidationError("No tienes saldo suficiente para realizar esta puja.")
 
         return data
 
+    @staticmethod
+    def check_auction_open(auction):
+        # Cerrada o archivada: ya se cobró (o se va a cobrar) con la puja ganadora que tiene
+        if auction.closing_date <= timezone.now() or auction.archived_at is not None:
+            raise serializers.ValidationError("La subasta está cerrada.")
+
+    @staticmethod
+    def check_bid_price(auction, price):
+        # Usa la caché de la subasta en lugar de buscar la puja más alta
+        if auction.current_price is not None and price <= auction.current_price:
+            raise serializers.ValidationError("La puja debe ser mayor que la anterior.")
+        if auction.current_price is None and price <= auction.price:
+            raise serializers.ValidationError("La puja debe ser mayor que el precio inicial.")
+
     def get_auction_title(self, obj):
         return obj.auction.title
 
+    def row_auction_title(self, row):
+        return row['auction__title']
+
+    def row_bidder(self, row):
+        # Lo que da str() de CustomUser
+        return row['bidder__username']
+
+
+
+class ProxyBidSerializer(serializers.ModelSerializer):
+    auction = serializers.PrimaryKeyRelatedField(read_only=True)
+    created_at = serializers.DateTimeField(format="%Y-%m-%dT%H:%M:%SZ", read_only=True)
+    updated_at = serializers.DateTimeField(format="%Y-%m-%dT%H:%M:%SZ", read_only=True)
+
+    class Meta:
+        model = ProxyBid
+        fields = ['id', 'auction', 'max_price', 'created_at', 'updated_at']
+
+    def validate_max_price(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("El máximo debe ser positivo.")
+        return value
 
 
-class BidDetailSerializer(serializers.ModelSerializer):
+class BidDetailSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     creation_date = serializers.DateTimeField(format="%Y-%m-%dT%H:%M:%SZ", 
     read_only=True) 
     auction_title = serializers.SerializerMethodField()
@@ -236,6 +324,7 @@ class BidDetailSerializer(serializers.ModelSerializer):
         model = Bid 
         #fields = '__all__' 
         fields = ['id', 'price', 'creation_date', 'auction', 'auction_title']
+        sparse_sources = {'auction_title': ['auction__title']}
 
     def validate_price(self, value):
         if value <= 0:
@@ -250,10 +339,9 @@ class BidDetailSerializer(serializers.ModelSerializer):
         if auction.closing_date < timezone.now():
             raise serializers.ValidationError("La subasta esta cerrada.")
 
-        highest_bid = auction.bids.order_by('-price').first()
-        if highest_bid and price <= highest_bid.price:
+        if auction.current_price is not None and price <= auction.current_price:
             raise serializers.ValidationError("La puja debe ser mayor a la previa.")
-        if not highest_bid and price <= auction.starting_price:
+        if auction.current_price is None and price <= auction.price:
             raise serializers.ValidationError("La puja debe ser mayor al precio inicial.")
         return data
     
@@ -261,7 +349,7 @@ class BidDetailSerializer(serializers.ModelSerializer):
         return obj.auction.title
     
 
-class UserBidSerializer(serializers.ModelSerializer):
+class UserBidSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     auction_title = serializers.SerializerMethodField()
     creation_date = serializers.DateTimeField(format="%Y-%m-%dT%H:%M:%SZ", read_only=True)
     bidder = serializers.StringRelatedField(read_only=True)
@@ -269,6 +357,7 @@ class UserBidSerializer(serializers.ModelSerializer):
     class Meta:
         model = Bid
         fields = ['id', 'auction', 'auction_title', 'price', 'creation_date', 'bidder']
+        sparse_sources = {'auction_title': ['auction__title']}
 
     def get_auction_title(self, obj):
         return obj.auction.title if obj.auction else ""
@@ -281,8 +370,7 @@ class UserBidSerializer(serializers.ModelSerializer):
         if auction.closing_date < timezone.now():
             raise serializers.ValidationError("Auction is closed.")
 
-        highest_bid = auction.bids.order_by('-price').first()
-        if highest_bid and price <= highest_bid.price:
+        if auction.current_price is not None and price <= auction.current_price:
             raise serializers.ValidationError("La puja debe ser mayor que la previa.")
 
         # Si el usuario ya tiene una puja, que solo pueda mejorarla
@@ -293,7 +381,7 @@ class UserBidSerializer(serializers.ModelSerializer):
         return data
     
 
-class RatingListCreateSerializer(serializers.ModelSerializer):
+class RatingListCreateSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     user = serializers.ReadOnlyField(source='user.username') 
     auction = serializers.PrimaryKeyRelatedField(read_only=True)
     
@@ -315,14 +403,14 @@ class RatingListCreateSerializer(serializers.ModelSerializer):
         return rating
 
 
-class RatingUpdateRetrieveSerializer(serializers.ModelSerializer):
+class RatingUpdateRetrieveSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     user = serializers.ReadOnlyField(source='user.username')
 
     class Meta:
         model = Rating
         fields = ['id', 'rating', 'user', 'auction']
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     user = serializers.ReadOnlyField(source='user.username')
     auction_title = serializers.ReadOnlyField(source='auction.title')
 
@@ -331,7 +419,7 @@ class CommentSerializer(serializers.ModelSerializer):
         fields = ['id', 'title', 'content', 'created_at', 'updated_at', 'user', 'auction', 'auction_title']
 
 
-class WalletTransactionSerializer(serializers.ModelSerializer):
+class WalletTransactionSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = WalletTransaction
         fields = ['id', 'card_number', 'amount', 'is_deposit', 'created_at']
@@ -347,10 +435,7 @@ class WalletTransactionSerializer(serializers.ModelSerializer):
 
         if not data['is_deposit']:
             user = self.context['request'].user
-            total = sum([
-                t.amount if t.is_deposit else -t.amount
-                for t in user.wallet_transactions.all()
-            ])
+            total = WalletAccount.balance_for(user)
             if amount > total:
                 raise serializers.ValidationError("No tienes suficiente saldo para retirar esa cantidad.")
 
@@ -0,0 +1,84 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from .events import get_broker
+from .models import Auction, WalletAccount, WalletTransaction
+
+ALREADY_SETTLED = 'already_settled'
+STILL_OPEN = 'still_open'
+
+
+def settle_auction(auction_id, retry_failed=False):
+    """
+    Cierra una subasta vencida cobrando la puja ganadora en una sola
+    transacción. Es idempotente: una subasta con settled_at no se vuelve a
+    cobrar, salvo que `retry_failed` permita reintentar las que fallaron por
+    saldo o las anteriores al worker (estado vacío).
+
+    Devuelve (resultado, importe).
+    """
+    with transaction.atomic():
+        auction = Auction.locked(auction_id)
+        if auction.closing_date > timezone.now():
+            return STILL_OPEN, None
+        if auction.settled_at is not None:
+            retryable = retry_failed and auction.settlement_status in ('', Auction.INSUFFICIENT_FUNDS)
+            if not retryable:
+                return ALREADY_SETTLED, None
+
+        highest_bid = auction.highest_bid
+        amount = highest_bid.price if highest_bid else None
+        if not highest_bid:
+            outcome = Auction.NO_BIDS
+        else:
+            # Bloquear la cuenta del pujador mientras se comprueba y descuenta el saldo
+            saldo_pujador = (
+                WalletAccount.objects.select_for_update()
+                .filter(user_id=highest_bid.bidder_id)
+                .values_list("balance", flat=True)
+                .first()
+            ) or Decimal("0.00")
+            if saldo_pujador < amount:
+                outcome = Auction.INSUFFICIENT_FUNDS
+            else:
+                WalletTransaction.objects.create(
+                    user_id=highest_bid.bidder_id,
+                    card_number="COBRO",
+                    amount=amount,
+                    is_deposit=False
+                )
+                WalletTransaction.objects.create(
+                    user_id=auction.auctioneer_id,
+                    card_number="COBRO",
+                    amount=amount,
+                    is_deposit=True
+                )
+                outcome = Auction.SETTLED
+
+        auction.settlement_status = outcome
+        auction.settled_at = timezone.now()
+        auction.save(update_fields=['settlement_status', 'settled_at'])
+
+        data = {"auction": auction.pk, "settlement_status": outcome, "price": amount}
+        transaction.on_commit(lambda: get_broker().publish(auction.pk, "closed", data))
+    return outcome, amount
+
+
+def due_auction_ids(limit):
+    # Usa el índice parcial auction_unsettled_idx: solo se leen las vencidas pendientes
+    return list(
+        Auction.objects.filter(settled_at__isnull=True, closing_date__lte=timezone.now())
+        .order_by('closing_date', 'id')
+        .values_list('id', flat=True)[:limit]
+    )
+
+
+def next_closing_date():
+    return (
+        Auction.objects.filter(settled_at__isnull=True)
+        .order_by('closing_date')
+        .values_list('closing_date', flat=True)
+        .first()
+    )
@@ -0,0 +1,109 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from users.models import CustomUser
+
+from . import cache as response_cache
+from .events import get_broker
+from .models import Auction, Bid, Category, Rating, WalletAccount, WalletTransaction
+from .search import get_search_backend
+
+
+@receiver(post_delete, sender=Bid)
+def refresh_auction_bid_cache(sender, instance, origin=None, **kwargs):
+    # Si se está borrando la propia subasta no hay nada que recalcular
+    if isinstance(origin, Auction):
+        return
+    auction = Auction.objects.filter(pk=instance.auction_id).first()
+    if auction:
+        auction.refresh_bid_cache()
+
+
+@receiver(post_delete, sender=Rating)
+def remove_rating_from_stats(sender, instance, origin=None, **kwargs):
+    # Cubre también el borrado en cascada al eliminar un usuario
+    if isinstance(origin, Auction):
+        return
+    Auction.apply_rating(instance.auction_id, -instance.rating, -1)
+
+
+@receiver(post_delete, sender=WalletTransaction)
+def remove_transaction_from_balance(sender, instance, origin=None, **kwargs):
+    # Al borrar el usuario su cuenta se borra con él
+    if isinstance(origin, CustomUser):
+        return
+    WalletAccount.apply(instance.user_id, -instance.signed_amount)
+
+
+@receiver(post_save, sender=Auction)
+def index_auction(sender, instance, update_fields=None, **kwargs):
+    # Solo hace falta reindexar si cambia el texto buscable
+    if update_fields and not {"title", "description"} & set(update_fields):
+        return
+    get_search_backend().index(instance)
+
+
+@receiver(post_delete, sender=Auction)
+def unindex_auction(sender, instance, **kwargs):
+    get_search_backend().remove(instance.pk)
+
+
+@receiver(post_save, sender=Auction)
+@receiver(post_delete, sender=Auction)
+def invalidate_auction_responses(sender, instance, **kwargs):
+    response_cache.invalidate(f"auction:{instance.pk}", "auction-list")
+
+
+@receiver(post_save, sender=Bid)
+@receiver(post_delete, sender=Bid)
+def invalidate_bid_responses(sender, instance, **kwargs):
+    response_cache.invalidate(f"auction:{instance.auction_id}", "auction-list")
+
+
+@receiver(post_save, sender=Rating)
+@receiver(post_delete, sender=Rating)
+def invalidate_rating_responses(sender, instance, **kwargs):
+    # La media de valoraciones solo aparece en el listado
+    response_cache.invalidate("auction-list")
+
+
+@receiver(post_save, sender=CustomUser)
+def invalidate_auctioneer_responses(sender, instance, created, update_fields=None, **kwargs):
+    # auctioneer_name sale del nombre del subastador (el login solo guarda last_login)
+    if created or (update_fields and not {"first_name", "last_name"} & set(update_fields)):
+        return
+    auction_ids = list(Auction.objects.filter(auctioneer=instance).values_list("pk", flat=True))
+    if auction_ids:
+        response_cache.invalidate("auction-list", *(f"auction:{pk}" for pk in auction_ids))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_responses(sender, instance, **kwargs):
+    response_cache.invalidate("categories")
+
+
+@receiver(post_save, sender=Bid)
+def publish_bid(sender, instance, created, **kwargs):
+    if not created:
+        return
+    data = {
+        "id": instance.pk,
+        "auction": instance.auction_id,
+        "price": instance.price,
+        "bidder": str(instance.bidder),
+        "creation_date": instance.creation_date,
+    }
+    transaction.on_commit(lambda: get_broker().publish(instance.auction_id, "bid", data))
+
+
+@receiver(post_save, sender=Auction)
+def publish_auction_price(sender, instance, **kwargs):
+    data = {
+        "auction": instance.pk,
+        "current_price": instance.current_price,
+        "bid_count": instance.bid_count,
+        "closing_date": instance.closing_date,
+    }
+    transaction.on_commit(lambda: get_broker().publish(instance.pk, "price", data))
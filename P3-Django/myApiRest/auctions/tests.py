@@ -1,3 +1,1328 @@
-from django.test import TestCase
+import asyncio
+import csv
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+from threading import Barrier, Thread
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection, connections
+from django.db.models import QuerySet
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import path
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from users.models import CustomUser
+
+from . import cache as response_cache
+from . import db_router
+from .management.commands.check_query_plans import hot_queries, is_full_scan, seed_data
+from .archive import archive_auctions
+from .async_views import (
+    AsyncAuctionDetailView, AsyncAuctionListView, AsyncBidListView, AsyncRatingListView, AsyncReadView,
+    AsyncUserAuctionListView, AsyncUserBidListView, AsyncUserCommentListView, AsyncUserRatingListView,
+    AsyncWalletBalanceView,
+)
+from .bulk_import import AuctionImporter
+from .db_router import ReplicaRouter
+from .events import InProcessBroker, _offer, format_event
+from .models import Auction, Bid, Category, Comment, Rating, WalletAccount, WalletTransaction
+from .fieldsets import sparse_queryset
+from .middleware import ReplicaRoutingMiddleware
+from .projections import projection_for
+from .serializers import (
+    AuctionListCreateSerializer, BidListCreateSerializer, CommentSerializer, RatingListCreateSerializer,
+    WalletTransactionSerializer,
+)
+from .settlement import settle_auction
+from .views import AuctionEventStreamView, filter_auctions
+
+
+def make_user(username, balance=Decimal("1000.00")):
+    user = CustomUser.objects.create_user(username=username, password="clave-segura-123", email=f"{username}@example.com")
+    WalletAccount.objects.create(user=user, balance=balance)
+    return user
+
+
+def make_auction(auctioneer, category, closing_in=timedelta(days=3), **fields):
+    return Auction.objects.create(
+        title=fields.pop("title", "Subasta"), description=fields.pop("description", "Descripción"), price=fields.pop("price", Decimal("10.00")),
+        stock=1, brand="Marca", category=category, auctioneer=auctioneer,
+        closing_date=timezone.now() + closing_in, **fields,
+    )
+
+
+# Sin límites de peticiones: aquí se prueba la lógica, no los cubos de fichas
+@override_settings(TOKEN_BUCKET_THROTTLES={})
+class AuctionsTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.auctioneer = make_user("subastador")
+        cls.bidder = make_user("pujador")
+        cls.category = Category.objects.create(name="Relojes")
+
+    def setUp(self):
+        # La caché de respuestas es de proceso y sobreviviría entre tests
+        for alias in ("default", "auth"):
+            caches[alias].clear()
+        self.client = APIClient()
+
+    def bid(self, auction, price, user=None):
+        self.client.force_authenticate(user or self.bidder)
+        return self.client.post(f"/api/auctions/{auction.pk}/bid/", {"price": price}, format="json")
+
+
+class BidCacheTests(AuctionsTestCase):
+
+    def test_check_bid_price(self):
+        auction = make_auction(self.auctioneer, self.category, price=Decimal("10.50"))
+        with self.assertRaisesMessage(serializers.ValidationError, "mayor que el precio inicial"):
+            BidListCreateSerializer.check_bid_price(auction, 10)
+        BidListCreateSerializer.check_bid_price(auction, 11)
+        auction.current_price = 20
+        with self.assertRaisesMessage(serializers.ValidationError, "mayor que la anterior"):
+            BidListCreateSerializer.check_bid_price(auction, 20)
+        BidListCreateSerializer.check_bid_price(auction, 21)
+
+    def test_bids_keep_cache_up_to_date(self):
+        auction = make_auction(self.auctioneer, self.category)
+        other = make_user("otro")
+        self.assertEqual(self.bid(auction, 20).status_code, 201)
+        self.assertEqual(self.bid(auction, 20, user=other).status_code, 400)
+        self.assertEqual(self.bid(auction, 35, user=other).status_code, 201)
+
+        auction.refresh_from_db()
+        top = Bid.objects.get(auction=auction, price=35)
+        self.assertEqual((auction.current_price, auction.bid_count, auction.highest_bid), (35, 2, top))
+
+    def test_deleting_a_bid_refreshes_cache(self):
+        auction = make_auction(self.auctioneer, self.category)
+        first = Bid.objects.create(auction=auction, bidder=self.bidder, price=20)
+        auction.register_bid(first)
+        second = Bid.objects.create(auction=auction, bidder=make_user("otro"), price=30)
+        auction.register_bid(second)
+
+        second.delete()
+        auction.refresh_from_db()
+        self.assertEqual((auction.current_price, auction.bid_count, auction.highest_bid), (20, 1, first))
+        first.delete()
+        auction.refresh_from_db()
+        self.assertEqual((auction.current_price, auction.bid_count, auction.highest_bid), (None, 0, None))
+
+
+@override_settings(TOKEN_BUCKET_THROTTLES={})
+class ConcurrentBidTests(TransactionTestCase):
+    """Pujas simultáneas al mismo precio: con la subasta bloqueada solo pasa la validación una."""
+
+    def test_only_one_of_concurrent_bids_passes(self):
+        auction = make_auction(make_user("subastador"), Category.objects.create(name="Relojes"))
+        bidders = [make_user(f"pujador{i}") for i in range(4)]
+        barrier = Barrier(len(bidders))
+        outcomes = []
+
+        def place(user):
+            client = APIClient()
+            client.force_authenticate(user)
+            barrier.wait()
+            try:
+                outcomes.append(client.post(f"/api/auctions/{auction.pk}/bid/", {"price": 50}, format="json").status_code)
+            except Exception as exc:
+                outcomes.append(repr(exc))
+            finally:
+                connections.close_all()
+
+        threads = [Thread(target=place, args=(user,)) for user in bidders]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Las demás validan contra la primera y se rechazan, no fallan con un error de la base de datos
+        self.assertEqual(sorted(outcomes, key=str), [201, 400, 400, 400])
+        winner = Bid.objects.get(auction=auction)
+        auction.refresh_from_db()
+        self.assertEqual((auction.current_price, auction.bid_count, auction.highest_bid), (50, 1, winner))
+
+
+@override_settings(PROXY_BID_INCREMENT=1)
+class ProxyBidTests(AuctionsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.auction = make_auction(self.auctioneer, self.category)
+
+    def proxy(self, max_price, user):
+        self.client.force_authenticate(user)
+        return self.client.post(f"/api/auctions/{self.auction.pk}/bid/proxy/", {"max_price": max_price}, format="json")
+
+    def assertLeader(self, user, price):
+        self.auction.refresh_from_db()
+        self.assertEqual((self.auction.highest_bid.bidder, self.auction.current_price), (user, price))
+
+    def bids(self):
+        return list(Bid.objects.filter(auction=self.auction).order_by("id").values_list("bidder__username", "price"))
+
+    def test_proxy_answers_manual_bids(self):
+        self.assertEqual(self.proxy(100, self.bidder).status_code, 201)
+        # Sin pujas, un incremento sobre el precio inicial
+        self.assertLeader(self.bidder, 11)
+
+        other = make_user("manual")
+        self.assertEqual(self.bid(self.auction, 50, user=other).status_code, 201)
+        self.assertLeader(self.bidder, 51)
+        # Por encima del máximo ya no responde
+        self.assertEqual(self.bid(self.auction, 120, user=other).status_code, 201)
+        self.assertLeader(other, 120)
+        self.assertEqual(self.bids(), [("pujador", 11), ("manual", 50), ("pujador", 51), ("manual", 120)])
+
+    def test_higher_maximum_wins_at_second_price_plus_increment(self):
+        self.proxy(100, self.bidder)
+        response = self.proxy(60, make_user("rival"))
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(response.data["leading"])
+        self.assertLeader(self.bidder, 61)
+        self.assertEqual(self.bids(), [("pujador", 11), ("rival", 60), ("pujador", 61)])
+
+    def test_leader_stops_at_own_maximum(self):
+        self.proxy(60, self.bidder)
+        self.proxy(100, make_user("rival"))
+        self.assertLeader(CustomUser.objects.get(username="rival"), 61)
+
+    def test_equal_maxima_go_to_older_proxy(self):
+        self.proxy(80, self.bidder)
+        response = self.proxy(80, make_user("rival"))
+        self.assertEqual(response.status_code, 201)
+        self.assertLeader(self.bidder, 80)
+        self.assertEqual(self.bids(), [("pujador", 11), ("pujador", 80)])
+
+    def test_at_most_two_bids_per_resolution(self):
+        for i, max_price in enumerate((40, 70, 55)):
+            self.proxy(max_price, make_user(f"auto{i}"))
+        before = Bid.objects.filter(auction=self.auction).count()
+        response = self.proxy(90, self.bidder)
+        self.assertLessEqual(len(response.data["bids"]), 2)
+        self.assertLessEqual(Bid.objects.filter(auction=self.auction).count() - before, 2)
+        self.assertLeader(self.bidder, 71)
+        self.auction.refresh_from_db()
+        self.assertEqual(self.auction.bid_count, Bid.objects.filter(auction=self.auction).count())
+
+    def test_proxy_is_capped_by_current_balance(self):
+        self.proxy(100, self.bidder)
+        # Retira saldo después de fijar el máximo
+        WalletTransaction.objects.create(user=self.bidder, amount=Decimal("960.00"), is_deposit=False, card_number="RETIRO")
+        self.assertEqual(WalletAccount.balance_for(self.bidder), Decimal("40.00"))
+
+        other = make_user("manual")
+        self.bid(self.auction, 30, user=other)
+        self.assertLeader(self.bidder, 31)
+        self.bid(self.auction, 45, user=other)
+        self.assertLeader(other, 45)
+
+    def test_rival_proxy_beats_maximum_without_funds(self):
+        self.proxy(100, self.bidder)
+        WalletAccount.objects.filter(user=self.bidder).update(balance=Decimal("40.50"))
+        self.proxy(60, make_user("rival"))
+        # Al que no tiene saldo solo se le cuenta hasta 40
+        self.assertLeader(CustomUser.objects.get(username="rival"), 41)
+        self.assertEqual(self.bids(), [("pujador", 11), ("pujador", 40), ("rival", 41)])
+
+
+class ClosedAuctionBidTests(AuctionsTestCase):
+
+    def test_closed_auction_rejects_bids(self):
+        auction = make_auction(self.auctioneer, self.category, closing_in=-timedelta(minutes=1))
+        response = self.bid(auction, 30)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("La subasta está cerrada.", str(response.data))
+        self.assertFalse(Bid.objects.filter(auction=auction).exists())
+
+    def test_settled_and_archived_auction_keeps_its_result(self):
+        auction = make_auction(self.auctioneer, self.category)
+        self.assertEqual(self.bid(auction, 20).status_code, 201)
+        Auction.objects.filter(pk=auction.pk).update(closing_date=timezone.now() - timedelta(days=1))
+        self.assertEqual(settle_auction(auction.pk), (Auction.SETTLED, 20))
+        self.assertEqual(archive_auctions([auction.pk]), (1, 1))
+
+        response = self.bid(auction, 30)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("La subasta está cerrada.", str(response.data))
+        auction.refresh_from_db()
+        self.assertEqual((auction.current_price, auction.bid_count, auction.highest_bid_id), (20, 1, None))
+        self.assertFalse(Bid.objects.filter(auction=auction).exists())
+
+
+class ArchivedBidHistoryTests(AuctionsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        old = make_auction(self.auctioneer, self.category, title="Archivada")
+        old.register_bid(Bid.objects.create(auction=old, bidder=self.bidder, price=40))
+        Auction.objects.filter(pk=old.pk).update(closing_date=timezone.now() - timedelta(days=1))
+        settle_auction(old.pk)
+        self.assertEqual(archive_auctions([old.pk]), (1, 1))
+        live = make_auction(self.auctioneer, self.category, title="Abierta")
+        live.register_bid(Bid.objects.create(auction=live, bidder=self.bidder, price=25))
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(self.bidder).access_token}")
+
+    def test_user_bids_include_archived_auctions(self):
+        response = self.client.get("/api/bids/users/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(bid["auction_title"], bid["price"]) for bid in response.json()],
+            [("Archivada", 40), ("Abierta", 25)],
+        )
+
+    def test_user_bid_export_includes_archived_auctions(self):
+        response = self.client.get("/api/bids/users/export.csv")
+        self.assertEqual(response.status_code, 200)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], "id,auction,auction_title,price,creation_date")
+        self.assertEqual(sorted(line.split(",")[2] for line in lines[1:]), ["Abierta", "Archivada"])
+
+
+class WalletBalanceTests(AuctionsTestCase):
+    """WalletAccount.balance tiene que cuadrar con el ledger de WalletTransaction."""
+
+    def setUp(self):
+        super().setUp()
+        # Sin cuenta previa: el saldo sale solo de sus movimientos
+        self.user = CustomUser.objects.create_user(username="cartera", password="clave-segura-123")
+
+    def move(self, amount, is_deposit=True, user=None):
+        return WalletTransaction.objects.create(
+            user=user or self.user, amount=Decimal(amount), is_deposit=is_deposit, card_number="4111111111111111",
+        )
+
+    def assertBalance(self, user, expected):
+        self.assertEqual(WalletAccount.balance_for(user), Decimal(expected))
+        self.assertEqual(async_to_sync(WalletAccount.abalance_for)(user), Decimal(expected))
+
+    def assertLedgerMatches(self, *users):
+        # Las cuentas de make_user empiezan con saldo sin movimientos; solo se miran las del test
+        out = StringIO()
+        call_command("rebuild_wallet_balances", "--check", stdout=out)
+        for user in users or (self.user,):
+            self.assertNotIn(f"Usuario {user.pk}:", out.getvalue())
+
+    def test_balance_without_account_is_zero(self):
+        self.assertBalance(self.user, "0.00")
+
+    def test_deposits_and_withdrawals_through_the_api(self):
+        self.client.force_authenticate(self.user)
+        for amount, is_deposit in (("100.00", True), ("30.50", False)):
+            response = self.client.post(
+                "/api/auctions/wallet/", {"card_number": "4111111111111111", "amount": amount, "is_deposit": is_deposit}, format="json",
+            )
+            self.assertEqual(response.status_code, 201)
+        self.assertBalance(self.user, "69.50")
+        response = self.client.post("/api/auctions/wallet/", {"card_number": "4111111111111111", "amount": "80.00", "is_deposit": False}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get("/api/auctions/wallet/balance/").json(), {"saldo_actual": "69.50"})
+
+    def test_settlement_moves_money_between_accounts(self):
+        self.move("100.00")
+        auction = make_auction(self.auctioneer, self.category)
+        self.bid(auction, 40, user=self.user)
+        Auction.objects.filter(pk=auction.pk).update(closing_date=timezone.now() - timedelta(seconds=1))
+        settle_auction(auction.pk)
+        self.assertBalance(self.user, "60.00")
+        self.assertBalance(self.auctioneer, "1040.00")
+
+    def test_editing_a_transaction_replaces_its_amount(self):
+        other = CustomUser.objects.create_user(username="otra-cartera", password="clave-segura-123")
+        movement = self.move("100.00")
+        self.move("20.00", is_deposit=False)
+
+        movement.amount = Decimal("150.00")
+        movement.save()
+        self.assertBalance(self.user, "130.00")
+        # Cambia de signo
+        movement.is_deposit = False
+        movement.save()
+        self.assertBalance(self.user, "-170.00")
+        # Cambia de usuario
+        movement.user = other
+        movement.save()
+        self.assertBalance(self.user, "-20.00")
+        self.assertBalance(other, "-150.00")
+        self.assertLedgerMatches(self.user, other)
+
+    def test_deleting_a_transaction_undoes_it(self):
+        deposit = self.move("100.00")
+        withdrawal = self.move("30.00", is_deposit=False)
+        withdrawal.delete()
+        self.assertBalance(self.user, "100.00")
+        deposit.delete()
+        self.assertBalance(self.user, "0.00")
+        self.assertLedgerMatches()
+
+    def test_deleting_the_user_removes_account_and_transactions(self):
+        self.move("100.00")
+        user_id = self.user.pk
+        self.user.delete()
+        self.assertFalse(WalletAccount.objects.filter(user_id=user_id).exists())
+        self.assertFalse(WalletTransaction.objects.filter(user_id=user_id).exists())
+
+    def test_rebuild_fixes_drift(self):
+        self.move("100.00")
+        self.move("25.00", is_deposit=False)
+        # Las operaciones en bloque se saltan save() y las señales
+        WalletTransaction.objects.bulk_create([
+            WalletTransaction(user=self.user, amount=Decimal("10.00"), is_deposit=True, card_number="4111111111111111"),
+        ])
+        WalletAccount.objects.filter(user=self.auctioneer).update(balance=Decimal("5.00"))
+
+        out = StringIO()
+        call_command("rebuild_wallet_balances", "--check", stdout=out)
+        self.assertIn(f"Usuario {self.user.pk}: guardado=75.00", out.getvalue())
+        self.assertIn(f"Usuario {self.auctioneer.pk}: guardado=5.00", out.getvalue())
+        self.assertBalance(self.user, "75.00")
+
+        call_command("rebuild_wallet_balances", stdout=StringIO())
+        self.assertBalance(self.user, "85.00")
+        # Sin movimientos, el saldo del ledger es cero
+        self.assertBalance(self.auctioneer, "0.00")
+        self.assertLedgerMatches(self.user, self.auctioneer, self.bidder)
+
+
+class SettlementTests(AuctionsTestCase):
+
+    def test_bid_after_settlement_does_not_change_result(self):
+        auction = make_auction(self.auctioneer, self.category)
+        self.assertEqual(self.bid(auction, 25).status_code, 201)
+        Auction.objects.filter(pk=auction.pk).update(closing_date=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(settle_auction(auction.pk), (Auction.SETTLED, 25))
+
+        self.assertEqual(self.bid(auction, 40, user=make_user("tardio")).status_code, 400)
+        auction.refresh_from_db()
+        self.assertEqual(auction.current_price, 25)
+        self.assertEqual(auction.highest_bid.bidder, self.bidder)
+        charged = WalletTransaction.objects.get(user=self.bidder, card_number="COBRO")
+        self.assertEqual(charged.amount, auction.current_price)
+
+    def test_worker_skips_auctions_deleted_before_settling(self):
+        auction = make_auction(self.auctioneer, self.category, closing_in=-timedelta(minutes=1))
+        deleted = make_auction(self.auctioneer, self.category, closing_in=-timedelta(minutes=1))
+        deleted_id = deleted.pk
+        deleted.delete()
+
+        out = StringIO()
+        with mock.patch(
+            "auctions.management.commands.run_settlement_worker.due_auction_ids",
+            return_value=[deleted_id, auction.pk],
+        ), self.assertLogs("auctions.settlement", "WARNING"):
+            call_command("run_settlement_worker", "--once", stdout=out)
+        self.assertIn(f"Subasta {auction.pk}: {Auction.NO_BIDS}", out.getvalue())
+        auction.refresh_from_db()
+        self.assertEqual(auction.settlement_status, Auction.NO_BIDS)
+
+
+class ResponseCacheTests(AuctionsTestCase):
+
+    def test_etag_changes_when_entry_is_rebuilt_after_closing(self):
+        auction = make_auction(self.auctioneer, self.category)
+        url = f"/api/auctions/{auction.pk}/"
+        first = self.client.get(url)
+        self.assertTrue(first.data["isOpen"])
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 304)
+
+        # Cierra sin guardar la subasta (no hay invalidación) y caduca la entrada, como al llegar su cierre
+        Auction.objects.filter(pk=auction.pk).update(closing_date=timezone.now() - timedelta(seconds=1))
+        state = response_cache.namespace_state([f"auction:{auction.pk}", "categories"])
+        key = response_cache.response_key("AuctionRetrieveUpdateDestroy", RequestFactory().get(url), state)
+        self.assertIsNotNone(response_cache.get_cache().get(key))
+        response_cache.get_cache().delete(key)
+
+        rebuilt = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(rebuilt.status_code, 200)
+        self.assertFalse(rebuilt.data["isOpen"])
+        self.assertNotEqual(rebuilt["ETag"], first["ETag"])
+
+
+    def test_key_depends_on_scheme_and_host(self):
+        state = response_cache.namespace_state(["auction-list"])
+        keys = {
+            response_cache.response_key("AuctionListCreate", RequestFactory().get("/api/auctions/", **extra), state)
+            for extra in ({}, {"HTTP_HOST": "localhost"}, {"secure": True})
+        }
+        self.assertEqual(len(keys), 3)
+
+    def test_renaming_the_auctioneer_invalidates_listing_and_detail(self):
+        auction = make_auction(self.auctioneer, self.category)
+        for url in ("/api/auctions/", f"/api/auctions/{auction.pk}/"):
+            self.client.get(url)
+            self.assertEqual(self.client.get(url)["X-Cache"], "HIT")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.auctioneer.first_name, self.auctioneer.last_name = "Ana", "Pérez"
+            self.auctioneer.save()
+        listing = self.client.get("/api/auctions/")
+        self.assertEqual((listing["X-Cache"], listing.data["results"][0]["auctioneer_name"]), ("MISS", "Ana Pérez"))
+        detail = self.client.get(f"/api/auctions/{auction.pk}/")
+        self.assertEqual((detail["X-Cache"], detail.data["auctioneer_name"]), ("MISS", "Ana Pérez"))
+
+    def test_login_does_not_invalidate_listing(self):
+        make_auction(self.auctioneer, self.category)
+        self.client.get("/api/auctions/")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.auctioneer.last_login = timezone.now()
+            self.auctioneer.save(update_fields=["last_login"])
+        self.assertEqual(self.client.get("/api/auctions/")["X-Cache"], "HIT")
+
+
+class AuctionQueryCountTests(AuctionsTestCase):
+    """Las consultas no dependen del número de filas: sin N+1 por categoría, subastador, pujas o valoraciones."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        categories = [cls.category, Category.objects.create(name="Cámaras")]
+        bidders = [cls.bidder, make_user("pujador2"), make_user("pujador3")]
+        cls.auctions = [make_auction(cls.auctioneer, categories[i % 2], title=f"Subasta {i}") for i in range(6)]
+        for auction in cls.auctions:
+            for i, bidder in enumerate(bidders):
+                auction.register_bid(Bid.objects.create(auction=auction, bidder=bidder, price=20 + i))
+                Rating.objects.create(auction=auction, user=bidder, rating=i + 2)
+
+    def assertQueries(self, url, queries, rows=None):
+        # Con la serialización rápida y con los serializers de DRF
+        self.client.force_authenticate(self.auctioneer)
+        for fast in (True, False):
+            with self.subTest(url=url, fast=fast), override_settings(FAST_READ_SERIALIZATION=fast):
+                with self.assertNumQueries(queries):
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                if rows is not None:
+                    data = response.data
+                    self.assertEqual(len(data["results"] if isinstance(data, dict) else data), rows)
+
+    def test_auction_list(self):
+        # COUNT de la paginación y la página
+        self.assertQueries("/api/auctions/", 2, rows=6)
+
+    def test_user_auction_list(self):
+        self.assertQueries("/api/auctions/users/", 1, rows=6)
+
+    def test_auction_detail(self):
+        self.assertQueries(f"/api/auctions/{self.auctions[0].pk}/", 1)
+
+
+class QueryPlanTests(TestCase):
+    """EXPLAIN de las consultas de check_query_plans: ninguna recorre la tabla entera."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_data(2000)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def test_hot_queries_use_indexes(self):
+        for name, queryset in hot_queries().items():
+            with self.subTest(name):
+                plan = queryset.explain()
+                self.assertFalse(is_full_scan(plan), f"{name}:\n{plan}")
+
+    def test_command_passes(self):
+        out = StringIO()
+        call_command("check_query_plans", "--rows", "0", stdout=out)
+        self.assertIn("Todas las consultas usan índices.", out.getvalue())
+
+    def test_open_filter_keeps_its_meaning(self):
+        open_ids = set(Auction.objects.filter(closing_date__gt=timezone.now()).values_list("id", flat=True))
+        self.assertEqual(set(filter_auctions(Auction.objects.all(), {"estado": "abierta"}).values_list("id", flat=True)), open_ids)
+
+
+class IsFullScanTests(TestCase):
+
+    @skipUnless(connection.vendor == "sqlite", "planes de SQLite")
+    def test_sqlite_plans(self):
+        self.assertFalse(is_full_scan("5 0 0 SEARCH auctions_bid USING INDEX bid_auction_price_idx (auction_id=?)"))
+        self.assertTrue(is_full_scan("3 0 0 SCAN auctions_auction"))
+        # Recorrer un índice entero para ordenar también es un recorrido completo
+        self.assertTrue(is_full_scan("3 0 0 SCAN auctions_auction USING INDEX auction_closing_idx"))
+        self.assertTrue(is_full_scan("3 0 0 SCAN auctions_bid USING COVERING INDEX bid_auction_price_idx"))
+        self.assertFalse(is_full_scan("12 10 0 SCAN auctions_auction_fts VIRTUAL TABLE INDEX 0:M2"))
+        self.assertTrue(is_full_scan("12 10 0 SCAN auctions_auction_fts VIRTUAL TABLE INDEX 0:"))
+        self.assertFalse(is_full_scan(
+            "7 0 0 SCAN auctions_category\n"
+            "9 0 0 SEARCH auctions_auction USING INDEX auction_cat_closing_idx (category_id=? AND closing_date>?)"
+        ))
+
+    @skipUnless(connection.vendor == "postgresql", "planes de PostgreSQL")
+    def test_postgres_plans(self):
+        self.assertTrue(is_full_scan("Seq Scan on auctions_auction  (cost=0.00..1.00 rows=1 width=4)"))
+        self.assertFalse(is_full_scan(
+            "Index Scan using bid_auction_price_idx on auctions_bid  (cost=0.29..8.30 rows=1 width=4)\n"
+            "  Index Cond: (auction_id = 1)"
+        ))
+        self.assertTrue(is_full_scan(
+            "Limit  (cost=0.28..1.00 rows=6 width=4)\n"
+            "  ->  Index Scan using auctions_auction_pkey on auctions_auction  (cost=0.28..90.00 rows=400 width=4)\n"
+            "        Filter: (closing_date > now())"
+        ))
+
+
+@skipUnless(connection.vendor == "sqlite", "FTS5: prefijos y bm25 son propios de SqliteSearchBackend")
+class SearchTests(AuctionsTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        make_auction(cls.auctioneer, cls.category, title="Reloj de bolsillo", description="Plata maciza")
+        make_auction(cls.auctioneer, cls.category, title="Cámara antigua", description="Incluye un reloj de regalo")
+        make_auction(cls.auctioneer, cls.category, title="Relojería completa", description="Herramientas")
+        make_auction(cls.auctioneer, cls.category, title="Carrete de pesca", description="Near mint, casi nuevo")
+
+    def search(self, text):
+        response = self.client.get("/api/auctions/", {"search": text})
+        self.assertEqual(response.status_code, 200)
+        return [auction["title"] for auction in response.data["results"]]
+
+    def test_title_matches_rank_above_description_matches(self):
+        results = self.search("reloj")
+        self.assertEqual(set(results[:2]), {"Reloj de bolsillo", "Relojería completa"})
+        self.assertEqual(results[2:], ["Cámara antigua"])
+
+    def test_prefix_matching_replaces_icontains(self):
+        self.assertEqual(set(self.search("relo")), {"Reloj de bolsillo", "Relojería completa", "Cámara antigua"})
+        # Sin acentos y sin coincidir a mitad de palabra, como hacía icontains
+        self.assertEqual(self.search("camara"), ["Cámara antigua"])
+        self.assertEqual(self.search("loj"), [])
+        # Todas las palabras tienen que estar
+        self.assertEqual(self.search("reloj plata"), ["Reloj de bolsillo"])
+
+    def test_fts_syntax_is_not_interpreted(self):
+        self.assertEqual(self.search('"'), [])
+        self.assertEqual(self.search("*"), [])
+        self.assertEqual(self.search('reloj"'), self.search("reloj"))
+        self.assertEqual(self.search("NEAR(reloj"), [])
+        self.assertEqual(self.search("near"), ["Carrete de pesca"])
+        # El guion no excluye: "-plata" busca plata
+        self.assertEqual(self.search("-plata"), ["Reloj de bolsillo"])
+        self.assertEqual(self.search("reloj OR carrete"), [])
+
+    def test_index_follows_saves_and_deletes(self):
+        auction = make_auction(self.auctioneer, self.category, title="Gramófono")
+        self.assertEqual(self.search("gramofono"), ["Gramófono"])
+        # El listado está en la caché de respuestas, que se invalida tras el commit
+        with self.captureOnCommitCallbacks(execute=True):
+            auction.title = "Tocadiscos"
+            auction.save()
+        self.assertEqual(self.search("gramofono"), [])
+        self.assertEqual(self.search("tocadiscos"), ["Tocadiscos"])
+        with self.captureOnCommitCallbacks(execute=True):
+            auction.delete()
+        self.assertEqual(self.search("tocadiscos"), [])
+
+
+class CursorPaginationTests(AuctionsTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.auctions = [make_auction(cls.auctioneer, cls.category, title=f"Reloj {i}") for i in range(7)]
+        auction = cls.auctions[0]
+        same_time = timezone.now() - timedelta(hours=1)
+        for i, price in enumerate((20, 25, 25, 25, 30, 40, 40)):
+            auction.register_bid(Bid.objects.create(auction=auction, bidder=cls.bidder, price=price))
+            Comment.objects.create(auction=auction, user=cls.bidder, title=f"Comentario {i}", content="Texto")
+            WalletTransaction.objects.create(user=cls.bidder, amount=Decimal("5.00"), is_deposit=True, card_number="4111111111111111")
+        # Fechas repetidas: el cursor tiene que desempatar sin saltarse ni repetir filas
+        Comment.objects.filter(pk__in=Comment.objects.order_by("id").values("pk")[:4]).update(created_at=same_time)
+        WalletTransaction.objects.filter(
+            pk__in=WalletTransaction.objects.order_by("id").values("pk")[:4]
+        ).update(created_at=same_time)
+
+    def walk(self, url):
+        ids, pages = [], 0
+        response = self.client.get(url, {"pagination": "cursor", "page_size": 2})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn("count", response.data)
+            ids += [row["id"] for row in response.data["results"]]
+            pages += 1
+            if not response.data["next"]:
+                return ids, pages
+            response = self.client.get(response.data["next"])
+
+    def assertWalksAll(self, url, queryset):
+        ids, pages = self.walk(url)
+        self.assertEqual(len(ids), len(set(ids)), "filas repetidas")
+        self.assertEqual(sorted(ids), sorted(queryset.values_list("id", flat=True)))
+        self.assertEqual(pages, 4)
+
+    def test_auctions(self):
+        self.assertWalksAll("/api/auctions/", Auction.objects.all())
+
+    def test_bids_with_repeated_prices(self):
+        auction = self.auctions[0]
+        self.assertWalksAll(f"/api/auctions/{auction.pk}/bid/", Bid.objects.filter(auction=auction))
+
+    def test_comments_with_repeated_dates(self):
+        auction = self.auctions[0]
+        self.assertWalksAll(f"/api/auctions/{auction.pk}/comments/", Comment.objects.filter(auction=auction))
+
+    def test_wallet_with_repeated_dates(self):
+        self.client.force_authenticate(self.bidder)
+        self.assertWalksAll("/api/auctions/wallet/", WalletTransaction.objects.filter(user=self.bidder))
+
+    def test_search_keeps_relevance_order(self):
+        make_auction(self.auctioneer, self.category, title="Lote", description="Incluye un reloj")
+        expected = [row["id"] for row in self.client.get("/api/auctions/", {"search": "reloj"}).data["results"]]
+        response = self.client.get("/api/auctions/", {"search": "reloj", "pagination": "cursor"})
+        # Con ?search= se pagina por número de página, en el orden de la búsqueda
+        self.assertIn("count", response.data)
+        self.assertEqual([row["id"] for row in response.data["results"]], expected)
+
+
+class ProjectionParityTests(AuctionsTestCase):
+    """Projection (values() + row_*) tiene que dar el mismo JSON que el serializer."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        CustomUser.objects.filter(pk=cls.auctioneer.pk).update(first_name="Ana", last_name="Pérez")
+        cls.auctions = [
+            make_auction(cls.auctioneer, cls.category, title="Sin imagen"),
+            make_auction(cls.auctioneer, cls.category, title="Cerrada", closing_in=-timedelta(days=1),
+                         thumbnail="auction_thumbnails/reloj.jpg"),
+            make_auction(cls.auctioneer, Category.objects.create(name="Cámaras"), title="Con variantes",
+                         thumbnail="auction_thumbnails/camara.png", price=Decimal("99.95"),
+                         thumbnail_variants={"card": {"webp": "auction_thumbnails/variants/camara-card.webp"}}),
+        ]
+        for auction in cls.auctions:
+            auction.register_bid(Bid.objects.create(auction=auction, bidder=cls.bidder, price=150))
+            Comment.objects.create(auction=auction, user=cls.bidder, title="Hola", content="Texto")
+        for rating, user in ((5, cls.bidder), (2, cls.auctioneer)):
+            Rating.objects.create(auction=cls.auctions[2], user=user, rating=rating)
+        WalletTransaction.objects.create(user=cls.bidder, amount=Decimal("25.50"), is_deposit=True, card_number="4111111111111111")
+        WalletTransaction.objects.create(user=cls.bidder, amount=Decimal("10.25"), is_deposit=False, card_number="4111111111111111")
+
+    def cases(self):
+        select = ("category", "auctioneer")
+        return [
+            (AuctionListCreateSerializer, Auction.objects.select_related(*select).order_by("id")),
+            (BidListCreateSerializer, Bid.objects.select_related("auction", "bidder").order_by("id")),
+            (RatingListCreateSerializer, Rating.objects.select_related("user").order_by("id")),
+            (CommentSerializer, Comment.objects.select_related("user", "auction").order_by("id")),
+            (WalletTransactionSerializer, WalletTransaction.objects.order_by("id")),
+        ]
+
+    def assertParity(self, query):
+        request = Request(RequestFactory().get("/api/auctions/", query))
+        for serializer_class, queryset in self.cases():
+            with self.subTest(serializer=serializer_class.__name__, query=query):
+                context = {"request": request}
+                expected = serializer_class(sparse_queryset(queryset, serializer_class, request), many=True, context=context).data
+                projection = projection_for(serializer_class, request, context)
+                actual = projection.render(projection.values(queryset))
+                self.assertEqual(JSONRenderer().render(actual), JSONRenderer().render(expected))
+
+    def test_all_fields(self):
+        self.assertParity({})
+
+    def test_fields(self):
+        self.assertParity({"fields": "id,auctioneer_name,thumbnail_variants,isOpen,media_rating,price,bidder,user,amount"})
+
+    def test_omit(self):
+        self.assertParity({"omit": "thumbnail,category_name,auction_title,created_at"})
+
+    def test_thumbnail_urls_are_absolute(self):
+        request = Request(RequestFactory().get("/api/auctions/"))
+        projection = projection_for(AuctionListCreateSerializer, request, {"request": request})
+        rows = projection.render(projection.values(Auction.objects.select_related("category", "auctioneer").order_by("id")))
+        self.assertIsNone(rows[0]["thumbnail"])
+        self.assertTrue(rows[2]["thumbnail"].startswith("http://testserver/"))
+        self.assertTrue(rows[2]["thumbnail_variants"]["card"]["webp"].endswith("camara-card.webp"))
+        self.assertEqual(rows[2]["thumbnail_variants"]["card"]["jpeg"], rows[2]["thumbnail"])
+
+    def test_unknown_method_field_is_reported(self):
+        class WithoutRow(serializers.ModelSerializer):
+            extra = serializers.SerializerMethodField()
+
+            class Meta:
+                model = Bid
+                fields = ["id", "extra"]
+
+            def get_extra(self, obj):
+                return 1
+
+        with self.assertRaisesMessage(ImproperlyConfigured, "row_extra"):
+            projection_for(WithoutRow, None)
+
+
+class SparseFieldsetTests(AuctionsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        auction = make_auction(self.auctioneer, self.category)
+        for price in (20, 30):
+            auction.register_bid(Bid.objects.create(auction=auction, bidder=self.bidder, price=price))
+        # Con JWT y no force_authenticate: la vista async (ASYNC_READ_VIEWS) autentica por su cuenta
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(self.bidder).access_token}")
+
+    def test_user_bids_fields(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/bids/users/?fields=id,price")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([set(bid) for bid in response.json()], [{"id", "price"}] * 2)
+        # Sin auction_title ni bidder no hace falta el JOIN
+        self.assertNotIn("auctions_auction", queries[-1]["sql"])
+
+    def test_user_bids_omit(self):
+        response = self.client.get("/api/bids/users/?omit=auction_title,bidder")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.json()[0]), {"id", "auction", "price", "creation_date"})
+
+
+class AuctionImportTests(AuctionsTestCase):
+
+    def row(self, **fields):
+        row = {
+            "title": "Reloj", "description": "De bolsillo", "price": "25.50", "stock": "1", "brand": "Omega",
+            "category": str(self.category.pk), "closing_date": "2030-01-01T12:00:00Z",
+        }
+        row.update(fields)
+        return {name: value for name, value in row.items() if value is not None}
+
+    def upload(self, name, content, **data):
+        self.client.force_authenticate(self.auctioneer)
+        upload = SimpleUploadedFile(name, content.encode())
+        return self.client.post("/api/auctions/import/", {"file": upload, **data}, format="multipart")
+
+    def test_csv_upload(self):
+        content = (
+            "title,description,price,stock,brand,category,closing_date\n"
+            f"Reloj,De bolsillo,25.50,1,Omega,{self.category.pk},2030-01-01T12:00:00Z\n"
+            # Categoría por nombre, sin distinguir mayúsculas, y fecha sin zona
+            "Cadena,De oro,99,2,Tous,relojes,2030-01-02 10:00\n"
+            "Anillo,,abc,1,Tous,Joyas,\n"
+        )
+        response = self.upload("subastas.csv", content)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data["created"], response.data["failed"]), (2, 1))
+        self.assertEqual(response.data["errors"][0]["row"], 3)
+        self.assertEqual(response.data["errors"][0]["errors"], {
+            "description": ["La descripción es obligatoria."],
+            "price": ["A valid number is required."],
+            "category": ["La categoría no existe."],
+            "closing_date": ["La fecha de cierre es obligatoria."],
+        })
+        auctions = Auction.objects.filter(auctioneer=self.auctioneer).order_by("id")
+        self.assertEqual([(a.title, a.category_id, a.price) for a in auctions], [
+            ("Reloj", self.category.pk, Decimal("25.50")), ("Cadena", self.category.pk, Decimal("99.00")),
+        ])
+        self.assertTrue(timezone.is_aware(auctions[1].closing_date))
+
+    def test_jsonl_upload(self):
+        lines = [json.dumps(self.row()), "", "{no es json", json.dumps(self.row(stock="-1", category="relojes"))]
+        response = self.upload("subastas.jsonl", "\n".join(lines))
+        self.assertEqual((response.data["created"], response.data["failed"]), (1, 2))
+        self.assertEqual([error["row"] for error in response.data["errors"]], [2, 3])
+        self.assertTrue(response.data["errors"][0]["errors"]["non_field_errors"][0].startswith("JSON no válido"))
+        self.assertEqual(response.data["errors"][1]["errors"], {"stock": ["El stock no puede ser negativo."]})
+
+    def test_only_errors_is_a_bad_request(self):
+        response = self.upload("subastas.jsonl", json.dumps(self.row(price="0")))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.upload("subastas.xml", "<a/>", format="xml").status_code, 400)
+
+    def test_errors_match_the_api_serializer(self):
+        importer = AuctionImporter(self.auctioneer)
+        for fields in (
+            {"price": "-5"}, {"price": "abc"}, {"price": "1.234"}, {"price": "123456789"},
+            {"stock": "-1"}, {"stock": "x"}, {"closing_date": "mañana"}, {"category": "999"},
+            {"title": None, "brand": None, "price": None},
+        ):
+            row = self.row(**fields)
+            with self.subTest(row=fields):
+                serializer = AuctionListCreateSerializer(data=row)
+                self.assertFalse(serializer.is_valid())
+                expected = {name: [str(message) for message in messages] for name, messages in serializer.errors.items() if name != "thumbnail"}
+                self.assertEqual(importer.build(row)[1], expected)
+
+    def test_model_limits_are_checked(self):
+        _, errors = AuctionImporter(self.auctioneer).build(self.row(title="x" * 151))
+        self.assertEqual(list(errors), ["title"])
+
+    def test_rows_are_flushed_in_batches(self):
+        importer = AuctionImporter(self.auctioneer, batch_size=2)
+        rows = [self.row(title=f"Subasta {i}") for i in range(5)]
+        rows.insert(2, self.row(price="0"))
+        with mock.patch.object(importer, "flush", wraps=importer.flush) as flush, self.captureOnCommitCallbacks(execute=True):
+            report = importer.run(rows)
+        self.assertEqual([len(call.args[0]) for call in flush.call_args_list], [2, 2, 1])
+        self.assertEqual((report["created"], report["failed"]), (5, 1))
+        self.assertEqual(Auction.objects.filter(auctioneer=self.auctioneer).count(), 5)
+
+    def test_import_command(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".jsonl", delete=False) as stream:
+            stream.write("\n".join(json.dumps(self.row(title=f"Subasta {i}")) for i in range(3)))
+        self.addCleanup(os.remove, stream.name)
+        out = StringIO()
+        call_command("import_auctions", stream.name, "--auctioneer", self.auctioneer.username, "--batch-size", "2", stdout=out)
+        self.assertIn("3 creadas, 0 con errores", out.getvalue())
+
+
+# Rutas de lectura con vista async; cada una se sirve con la vista async o con su sync_view
+ASYNC_READ_ROUTES = [
+    ("api/auctions/", AsyncAuctionListView),
+    ("api/auctions/users/", AsyncUserAuctionListView),
+    ("api/auctions/user/comments/", AsyncUserCommentListView),
+    ("api/auctions/user/ratings/", AsyncUserRatingListView),
+    ("api/auctions/wallet/balance/", AsyncWalletBalanceView),
+    ("api/auctions/<int:pk>/", AsyncAuctionDetailView),
+    ("api/auctions/<int:auction_id>/bid/", AsyncBidListView),
+    ("api/auctions/<int:auction_id>/ratings/", AsyncRatingListView),
+    ("api/bids/users/", AsyncUserBidListView),
+]
+
+
+class SyncReadUrls:
+    urlpatterns = [path(route, view.sync_view.as_view()) for route, view in ASYNC_READ_ROUTES]
+
+
+class AsyncReadUrls:
+    urlpatterns = [path(route, view.as_view()) for route, view in ASYNC_READ_ROUTES]
+
+
+class AsyncReadViewParityTests(AuctionsTestCase):
+    """Cada vista async responde lo mismo que su sync_view: mismas rutas, una con Client y otra con AsyncClient."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        CustomUser.objects.filter(pk=cls.auctioneer.pk).update(first_name="Ana", last_name="Pérez")
+        other = Category.objects.create(name="Cámaras")
+        archived = make_auction(cls.auctioneer, cls.category, title="Archivada", closing_in=-timedelta(days=1))
+        archived.register_bid(Bid.objects.create(auction=archived, bidder=cls.bidder, price=40))
+        settle_auction(archived.pk)
+        archive_auctions([archived.pk])
+        cls.auctions = [
+            make_auction(cls.auctioneer, other if i % 3 else cls.category, title=f"Cámara {i}", price=Decimal(10 + i),
+                         thumbnail="auction_thumbnails/camara.png" if i % 2 else "",
+                         thumbnail_variants={"card": {"webp": "auction_thumbnails/variants/camara-card.webp"}} if i % 4 == 1 else {})
+            for i in range(8)
+        ]
+        for i, auction in enumerate(cls.auctions):
+            for price in range(20, 20 + i):
+                auction.register_bid(Bid.objects.create(auction=auction, bidder=cls.bidder, price=price))
+            Comment.objects.create(auction=auction, user=cls.bidder, title=f"Comentario {i}", content="Texto")
+            Rating.objects.create(auction=auction, user=cls.bidder, rating=1 + i % 5)
+        WalletTransaction.objects.create(user=cls.bidder, amount=Decimal("25.50"), is_deposit=True, card_number="4111111111111111")
+        cls.tokens = {user.pk: str(RefreshToken.for_user(user).access_token) for user in (cls.auctioneer, cls.bidder)}
+
+    def fetch(self, url, user=None):
+        """(status, JSON) de la vista DRF y de la vista async, cada una con la caché vacía."""
+        headers = {"Authorization": f"Bearer {self.tokens[user.pk]}"} if user else {}
+        responses = []
+        for urlconf, get in ((SyncReadUrls, self.client.get), (AsyncReadUrls, async_to_sync(self.async_client.get))):
+            caches["default"].clear()
+            with override_settings(ROOT_URLCONF=urlconf):
+                response = get(url, headers=headers)
+            responses.append((response.status_code, response.json()))
+        return responses
+
+    def assertParity(self, url, user=None, status=200):
+        sync_response, async_response = self.fetch(url, user)
+        self.assertEqual(sync_response[0], status)
+        self.assertEqual(async_response, sync_response)
+
+    def test_every_async_view_is_covered(self):
+        def subclasses(cls):
+            for sub in cls.__subclasses__():
+                yield sub
+                yield from subclasses(sub)
+        concrete = {cls for cls in subclasses(AsyncReadView) if cls.sync_view is not None}
+        self.assertEqual(concrete, {view for _, view in ASYNC_READ_ROUTES})
+
+    def test_auction_list(self):
+        for query in ("", "?page=2", "?page=last", "?estado=abierta", "?estado=cerrada", "?minPrice=12&maxPrice=15",
+                      f"?category={self.category.pk}", "?search=c%C3%A1mara", "?fields=id,title,thumbnail_variants",
+                      "?omit=auctioneer_name,media_rating"):
+            with self.subTest(query=query):
+                self.assertParity(f"/api/auctions/{query}")
+                self.assertParity(f"/api/auctions/{query}", user=self.bidder)
+        self.assertParity("/api/auctions/?page=9", status=404)
+
+    def test_auction_detail(self):
+        auction = self.auctions[1]
+        for query in ("", "?fields=id,thumbnail,es_mia"):
+            with self.subTest(query=query):
+                self.assertParity(f"/api/auctions/{auction.pk}/{query}")
+                self.assertParity(f"/api/auctions/{auction.pk}/{query}", user=self.auctioneer)
+        self.assertParity("/api/auctions/9999/", status=404)
+
+    def test_bids_and_ratings(self):
+        auction = self.auctions[7]
+        for url in (f"/api/auctions/{auction.pk}/bid/", f"/api/auctions/{auction.pk}/bid/?page=2",
+                    f"/api/auctions/{auction.pk}/bid/?fields=price,bidder", f"/api/auctions/{auction.pk}/ratings/",
+                    f"/api/auctions/{auction.pk}/ratings/?omit=user"):
+            with self.subTest(url=url):
+                self.assertParity(url)
+
+    def test_user_views(self):
+        for url in ("/api/auctions/users/", "/api/auctions/user/comments/", "/api/auctions/user/ratings/",
+                    "/api/auctions/wallet/balance/", "/api/bids/users/", "/api/bids/users/?fields=id,price"):
+            with self.subTest(url=url):
+                self.assertParity(url, user=self.auctioneer)
+                self.assertParity(url, user=self.bidder)
+                self.assertParity(url, status=401)
+
+    def test_user_auctions_have_absolute_thumbnails(self):
+        for _, data in self.fetch("/api/auctions/users/", user=self.auctioneer):
+            thumbnails = [auction["thumbnail"] for auction in data if auction["thumbnail"]]
+            self.assertTrue(thumbnails)
+            self.assertTrue(all(url.startswith("http://testserver/") for url in thumbnails), thumbnails)
+
+
+@override_settings(DATABASE_REPLICA_STICKY_SECONDS=10)
+class ReplicaRoutingTests(TestCase):
+    """Sin réplicas de verdad: basta con que haya un alias "replica_*" para ver a dónde se enruta."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [make_user("lector"), make_user("escritor")]
+        cls.tokens = {user.pk: str(RefreshToken.for_user(user).access_token) for user in cls.users}
+
+    def setUp(self):
+        caches["default"].clear()
+        patcher = mock.patch("auctions.db_router.replica_aliases", return_value=["replica_0"])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+
+    def outside_transaction(self):
+        # TestCase envuelve cada test en una transacción, y dentro de ella todo va a la principal
+        return mock.patch.object(connections["default"], "in_atomic_block", False)
+
+    def test_router(self):
+        with self.outside_transaction():
+            self.assertEqual(self.router.db_for_read(Auction), "default")
+            with db_router.read_from_replica():
+                self.assertEqual(self.router.db_for_read(Auction), "replica_0")
+                self.assertEqual(self.router.db_for_read(Category), "replica_0")
+                for model in (Bid, WalletAccount, CustomUser):
+                    self.assertEqual(self.router.db_for_read(model), "default")
+                with db_router.use_primary():
+                    self.assertEqual(self.router.db_for_read(Auction), "default")
+        with db_router.read_from_replica():
+            self.assertEqual(self.router.db_for_read(Auction), "default")
+        self.assertEqual(self.router.db_for_write(Auction), "default")
+        self.assertEqual(
+            [db for db in ("default", "replica_0") if self.router.allow_migrate(db, "auctions")], ["default"],
+        )
+
+    def middleware_calls(self, middleware, method, user=None):
+        request = getattr(self.factory, method)(
+            "/api/auctions/", HTTP_AUTHORIZATION=f"Bearer {self.tokens[user.pk]}" if user else "",
+        )
+        return async_to_sync(middleware)(request) if middleware.is_async else middleware(request)
+
+    def assertSticky(self, make_middleware):
+        seen = []
+        status = {"code": 200}
+        middleware = make_middleware(seen, status)
+        reader, writer = self.users
+
+        self.middleware_calls(middleware, "get", writer)
+        self.middleware_calls(middleware, "get")
+        # La escritura va entera a la principal y deja al usuario en ella
+        self.middleware_calls(middleware, "post", writer)
+        self.middleware_calls(middleware, "get", writer)
+        self.middleware_calls(middleware, "get", reader)
+        self.assertEqual(seen, [True, True, False, False, True])
+
+        # Una escritura fallida no cambia nada
+        seen.clear()
+        status["code"] = 400
+        self.middleware_calls(middleware, "post", reader)
+        self.middleware_calls(middleware, "get", reader)
+        self.assertEqual(seen, [False, True])
+
+        # Pasado el tiempo de la marca vuelve a las réplicas
+        db_router.get_cache().delete(db_router._sticky_key(writer.pk))
+        seen.clear()
+        self.middleware_calls(middleware, "get", writer)
+        self.assertEqual(seen, [True])
+
+    def test_middleware_sticks_writers_to_primary(self):
+        def make_middleware(seen, status):
+            def get_response(request):
+                seen.append(db_router.reads_from_replica())
+                return HttpResponse(status=status["code"])
+            return ReplicaRoutingMiddleware(get_response)
+        self.assertSticky(make_middleware)
+
+    def test_async_middleware_sticks_writers_to_primary(self):
+        def make_middleware(seen, status):
+            async def get_response(request):
+                seen.append(db_router.reads_from_replica())
+                return HttpResponse(status=status["code"])
+            return ReplicaRoutingMiddleware(get_response)
+        self.assertSticky(make_middleware)
+
+    def test_middleware_is_unused_without_replicas(self):
+        with mock.patch("auctions.db_router.replica_aliases", return_value=[]):
+            with self.assertRaises(MiddlewareNotUsed):
+                ReplicaRoutingMiddleware(lambda request: HttpResponse())
+
+
+class AuctionEventTests(AuctionsTestCase):
+
+    def test_broker_fans_out_per_auction(self):
+        async def scenario():
+            broker = InProcessBroker()
+            first, second, other = broker.subscribe(1), broker.subscribe(1), broker.subscribe(2)
+            self.assertEqual((broker.subscriber_count(1), broker.subscriber_count()), (2, 3))
+            # publish llega desde código síncrono (señales, on_commit) en otro hilo
+            await asyncio.to_thread(broker.publish, 1, "bid", {"price": 20})
+            await asyncio.sleep(0)
+            self.assertEqual([first[1].get_nowait(), second[1].get_nowait()], [("bid", {"price": 20})] * 2)
+            self.assertTrue(other[1].empty())
+
+            broker.unsubscribe(1, first)
+            broker.publish(1, "bid", {"price": 30})
+            await asyncio.sleep(0)
+            self.assertTrue(first[1].empty())
+            self.assertEqual(second[1].get_nowait(), ("bid", {"price": 30}))
+            broker.unsubscribe(1, second)
+            broker.unsubscribe(2, other)
+            self.assertEqual(broker.subscriber_count(), 0)
+        async_to_sync(scenario)()
+
+    def test_slow_subscriber_drops_oldest_event(self):
+        async def scenario():
+            queue = asyncio.Queue(maxsize=2)
+            for price in (10, 20, 30):
+                _offer(queue, ("bid", {"price": price}))
+            return [queue.get_nowait()[1]["price"] for _ in range(queue.qsize())]
+        self.assertEqual(async_to_sync(scenario)(), [20, 30])
+
+    def test_stream_subscribes_before_reading_the_snapshot(self):
+        auction = make_auction(self.auctioneer, self.category)
+        broker = InProcessBroker()
+        read_snapshot = QuerySet.afirst
+
+        async def snapshot_with_concurrent_bid(queryset):
+            # Una puja que se confirma justo mientras se lee la foto inicial
+            row = await read_snapshot(queryset)
+            broker.publish(auction.pk, "bid", {"price": 99})
+            return row
+
+        async def scenario():
+            stream = AuctionEventStreamView().stream(auction.pk)
+            try:
+                return [await anext(stream), await anext(stream), broker.subscriber_count(auction.pk)]
+            finally:
+                await stream.aclose()
+
+        # Con heartbeat corto, si el evento se perdiera llegaría un ping en lugar de colgarse
+        with mock.patch("auctions.views.get_broker", return_value=broker), \
+                mock.patch.object(QuerySet, "afirst", snapshot_with_concurrent_bid), \
+                mock.patch.object(AuctionEventStreamView, "heartbeat", 1):
+            snapshot, bid, subscribers = async_to_sync(scenario)()
+        self.assertTrue(snapshot.startswith("event: price\n"))
+        self.assertEqual(bid, format_event("bid", {"price": 99}))
+        self.assertEqual((subscribers, broker.subscriber_count()), (1, 0))
+
+    def test_unknown_auction_is_not_found(self):
+        response = async_to_sync(self.async_client.get)("/api/auctions/9999/events/")
+        self.assertEqual(response.status_code, 404)
+
+
+class ExportTests(AuctionsTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.staff = make_user("staff")
+        cls.staff.is_staff = True
+        cls.staff.save(update_fields=["is_staff"])
+        cls.auction = make_auction(cls.auctioneer, cls.category, title="Reloj, de bolsillo")
+        for price, user in ((20, cls.bidder), (35, cls.staff), (50, cls.bidder)):
+            cls.auction.register_bid(Bid.objects.create(auction=cls.auction, bidder=user, price=price))
+        WalletTransaction.objects.create(user=cls.bidder, amount=Decimal("25.50"), is_deposit=True, card_number="4111111111111111")
+        WalletTransaction.objects.create(user=cls.bidder, amount=Decimal("11.00"), is_deposit=False, card_number="4111111111111111")
+        WalletTransaction.objects.create(user=cls.staff, amount=Decimal("99.00"), is_deposit=True, card_number="4111111111111111")
+
+    def export(self, url, user=None):
+        self.client.force_authenticate(user or self.bidder)
+        response = self.client.get(url)
+        body = b"".join(response.streaming_content).decode() if response.streaming else None
+        return response, body
+
+    def test_wallet_csv(self):
+        response, body = self.export("/api/auctions/wallet/export.csv")
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="monedero.csv"')
+        rows = list(csv.reader(body.splitlines()))
+        self.assertEqual(rows[0], ["id", "card_number", "amount", "is_deposit", "created_at"])
+        # Solo los movimientos propios
+        self.assertEqual(sorted((row[2], row[3]) for row in rows[1:]), [("11.00", "False"), ("25.50", "True")])
+        self.assertTrue(all(datetime.fromisoformat(row[4]) for row in rows[1:]))
+
+    def test_wallet_ndjson(self):
+        response, body = self.export("/api/auctions/wallet/export.ndjson")
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(sorted((row["amount"], row["is_deposit"]) for row in rows), [("11.00", False), ("25.50", True)])
+
+    def test_user_bids_ndjson(self):
+        _, body = self.export("/api/bids/users/export.ndjson")
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(sorted(row["price"] for row in rows), [20, 50])
+        self.assertEqual({row["auction_title"] for row in rows}, {"Reloj, de bolsillo"})
+
+    def test_auction_bids_are_staff_only(self):
+        url = f"/api/auctions/{self.auction.pk}/bid/export.csv"
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.assertEqual(self.export(url)[0].status_code, 403)
+
+        response, body = self.export(url, user=self.staff)
+        self.assertEqual(response["Content-Disposition"], f'attachment; filename="subasta-{self.auction.pk}-pujas.csv"')
+        rows = list(csv.reader(body.splitlines()))
+        self.assertEqual(rows[0], ["id", "price", "creation_date", "bidder_id", "bidder"])
+        self.assertEqual(sorted((row[1], row[4]) for row in rows[1:]), [("20", "pujador"), ("35", "staff"), ("50", "pujador")])
+        self.assertEqual(self.export("/api/auctions/9999/bid/export.csv", user=self.staff)[0].status_code, 404)
+
+    def test_auction_bids_include_archived(self):
+        Auction.objects.filter(pk=self.auction.pk).update(closing_date=timezone.now() - timedelta(days=1))
+        settle_auction(self.auction.pk)
+        archive_auctions([self.auction.pk])
+        _, body = self.export(f"/api/auctions/{self.auction.pk}/bid/export.ndjson", user=self.staff)
+        self.assertEqual(sorted(json.loads(line)["price"] for line in body.splitlines()), [20, 35, 50])
+
+    def test_unknown_format_is_rejected(self):
+        for url in ("/api/auctions/wallet/export.xml", "/api/bids/users/export.xlsx",
+                    f"/api/auctions/{self.auction.pk}/bid/export.json"):
+            with self.subTest(url=url):
+                response, _ = self.export(url, user=self.staff)
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(response.data["detail"], "Formato no soportado, usa 'csv' o 'ndjson'.")
+
+
+class RatingStatsTests(AuctionsTestCase):
+    """rating_sum/rating_count de la subasta tienen que cuadrar con sus Rating."""
+
+    def setUp(self):
+        super().setUp()
+        self.auction = make_auction(self.auctioneer, self.category)
+
+    def rate(self, value, user=None, auction=None):
+        self.client.force_authenticate(user or self.bidder)
+        return self.client.post(f"/api/auctions/{(auction or self.auction).pk}/ratings/", {"rating": value}, format="json")
+
+    def assertStats(self, expected, auction=None):
+        auction = auction or self.auction
+        auction.refresh_from_db()
+        self.assertEqual((auction.rating_sum, auction.rating_count), expected)
+        ratings = Rating.objects.filter(auction=auction)
+        self.assertEqual(expected, (sum(rating.rating for rating in ratings), len(ratings)))
+
+    def test_create_and_rate_again(self):
+        self.assertEqual(self.rate(4).status_code, 201)
+        self.assertEqual(self.rate(2, user=self.auctioneer).status_code, 201)
+        self.assertStats((6, 2))
+        # Volver a valorar sustituye la valoración anterior
+        self.rate(5)
+        self.assertStats((7, 2))
+        self.assertEqual(self.client.get(f"/api/auctions/{self.auction.pk}/ratings/").data["media"], 3.5)
+
+    def test_update(self):
+        self.rate(4)
+        rating = Rating.objects.get(user=self.bidder)
+        response = self.client.patch(f"/api/auctions/{self.auction.pk}/ratings/{rating.pk}/", {"rating": 1}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertStats((1, 1))
+
+        # Mover la valoración a otra subasta ajusta las dos
+        other = make_auction(self.auctioneer, self.category)
+        rating.refresh_from_db()
+        rating.auction = other
+        rating.save()
+        self.assertStats((0, 0))
+        self.assertStats((1, 1), auction=other)
+
+    def test_delete(self):
+        self.rate(4)
+        self.rate(3, user=self.auctioneer)
+        rating = Rating.objects.get(user=self.bidder)
+        self.assertEqual(self.client.delete(f"/api/auctions/{self.auction.pk}/ratings/{rating.pk}/").status_code, 204)
+        self.assertStats((3, 1))
+
+    def test_cascade(self):
+        self.rate(4)
+        voter = make_user("votante")
+        self.rate(2, user=voter)
+        voter.delete()
+        self.assertStats((4, 1))
+        # Al borrar la subasta sus valoraciones se van con ella sin recalcular nada
+        self.auction.delete()
+        self.assertFalse(Rating.objects.exists())
+
+    def test_rebuild_rating_stats(self):
+        self.rate(4)
+        self.rate(2, user=self.auctioneer)
+        other = make_auction(self.auctioneer, self.category)
+        Auction.objects.filter(pk=self.auction.pk).update(rating_sum=1, rating_count=5)
+        Auction.objects.filter(pk=other.pk).update(rating_sum=3, rating_count=1)
+
+        out = StringIO()
+        call_command("rebuild_rating_stats", "--check", stdout=out)
+        self.assertIn(f"Subasta {self.auction.pk}: guardado=(1, 5) valoraciones=(6, 2)", out.getvalue())
+        self.assertIn(f"Subasta {other.pk}: guardado=(3, 1) valoraciones=(0, 0)", out.getvalue())
+        self.assertIn("2 subastas descuadradas.", out.getvalue())
+
+        call_command("rebuild_rating_stats", stdout=StringIO())
+        self.assertStats((6, 2))
+        self.assertStats((0, 0), auction=other)
+
+
+class BenchmarkEndpointsTests(TestCase):
+    """Humo: el comando recorre todas sus rutas contra la base de pruebas y compara con una referencia."""
+
+    def benchmark(self, *args):
+        out = StringIO()
+        call_command("benchmark_endpoints", "--auctions", "40", "--requests", "2", "--warmup", "0", *args, stdout=out)
+        return out.getvalue()
+
+    def test_runs_and_compares_with_baseline(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        baseline = os.path.join(directory, "baseline.json")
+        self.benchmark("--output", baseline)
+        with open(baseline) as f:
+            report = json.load(f)
+        self.assertEqual(report["meta"]["auctions"], 40)
+        self.assertIn("auctions?search+category+price+estado", report["routes"])
+        self.assertTrue(all(200 <= code < 300 for row in report["routes"].values() for code in row["status"]))
+        # Lo sembrado se deshace al terminar
+        self.assertFalse(CustomUser.objects.filter(username__startswith="bench-").exists())
+
+        self.assertIn("Sin regresiones", self.benchmark("--routes", "auctions/users", "--baseline", baseline, "--threshold", "100"))
+
+        report["routes"]["auctions/users"]["queries"] = 0
+        with open(baseline, "w") as f:
+            json.dump(report, f)
+        with self.assertRaisesMessage(CommandError, "1 regresiones"):
+            self.benchmark("--routes", "auctions/users", "--baseline", baseline)
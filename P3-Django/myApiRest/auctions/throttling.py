@@ -0,0 +1,195 @@
+import math
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.throttling import BaseThrottle
+
+KEY_PREFIX = "tb"
+
+
+def _refill(tokens, updated, capacity, rate, now):
+    return min(capacity, tokens + max(now - updated, 0) * rate)
+
+
+class MemoryBucketStore:
+    """
+    Cubos en memoria del proceso. Como mucho `max_keys` claves: al pasarse se
+    olvida la usada hace más tiempo (LRU), que equivale a un cubo lleno.
+    """
+
+    def __init__(self, max_keys):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate):
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (capacity, now))
+            tokens = _refill(tokens, updated, capacity, rate, now)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, 0 if allowed else (1 - tokens) / rate
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class CacheBucketStore:
+    """
+    Cubos en la caché compartida, para varios workers. Con Redis se
+    actualizan de forma atómica con un script Lua; con otra caché se hace
+    get/set y, con peticiones simultáneas de la misma clave, puede dejar
+    pasar alguna de más. Cada cubo caduca cuando ya estaría lleno.
+    """
+    script = """
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+    local capacity, rate, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+    local tokens, updated = tonumber(state[1]) or capacity, tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(now - updated, 0) * rate)
+    local allowed = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+        allowed = 1
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+    redis.call('EXPIRE', KEYS[1], tonumber(ARGV[4]))
+    return {allowed, tostring(tokens)}
+    """
+
+    def __init__(self, alias):
+        self.cache = caches[alias]
+
+    def take(self, key, capacity, rate):
+        now = time.time()
+        ttl = math.ceil(capacity / rate) + 1
+        if isinstance(self.cache, RedisCache):
+            full_key = self.cache.make_and_validate_key(f"{KEY_PREFIX}:{key}")
+            client = self.cache._cache.get_client(full_key, write=True)
+            allowed, tokens = client.eval(self.script, 1, full_key, capacity, rate, now, ttl)
+            allowed, tokens = bool(int(allowed)), float(tokens)
+        else:
+            tokens, updated = self.cache.get(f"{KEY_PREFIX}:{key}", (capacity, now))
+            tokens = _refill(tokens, updated, capacity, rate, now)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self.cache.set(f"{KEY_PREFIX}:{key}", (tokens, now), timeout=ttl)
+        return allowed, 0 if allowed else (1 - tokens) / rate
+
+
+_store = None
+_store_lock = threading.Lock()
+_counters = Counter()
+_counters_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            if getattr(settings, "TOKEN_BUCKET_BACKEND", "memory") == "cache":
+                _store = CacheBucketStore(getattr(settings, "TOKEN_BUCKET_CACHE_ALIAS", "default"))
+            else:
+                _store = MemoryBucketStore(getattr(settings, "TOKEN_BUCKET_MAX_KEYS", 10000))
+    return _store
+
+
+def get_bucket(scope, key_type):
+    """(capacidad, fichas por segundo) de TOKEN_BUCKET_THROTTLES, o None si no se limita."""
+    return getattr(settings, "TOKEN_BUCKET_THROTTLES", {}).get(scope, {}).get(key_type)
+
+
+def record(scope, key_type, allowed):
+    with _counters_lock:
+        _counters[(scope, key_type, "allowed" if allowed else "throttled")] += 1
+
+
+def stats():
+    """Contadores de este proceso por scope y tipo de clave."""
+    with _counters_lock:
+        counters = dict(_counters)
+    result = {}
+    for (scope, key_type, outcome), count in sorted(counters.items()):
+        result.setdefault(scope, {}).setdefault(key_type, {"allowed": 0, "throttled": 0})[outcome] = count
+    store = get_store()
+    return {
+        "backend": "cache" if isinstance(store, CacheBucketStore) else "memory",
+        "keys": len(store) if isinstance(store, MemoryBucketStore) else None,
+        "scopes": result,
+    }
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Limita las escrituras (los métodos seguros no cuentan) con un cubo de
+    fichas por clave: cada petición gasta una y se rellenan a ritmo
+    constante, así que se permiten ráfagas cortas de hasta `capacidad`
+    peticiones. La vista indica su `throttle_scope` y TOKEN_BUCKET_THROTTLES
+    da la capacidad y el ritmo para cada tipo de clave; si no hay, no se limita.
+    Al agotarse DRF responde 429 con Retry-After.
+    """
+    key_type = None
+
+    def get_key(self, request, view):
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        self.retry_after = None
+        if request.method in SAFE_METHODS:
+            return True
+        scope = getattr(view, "throttle_scope", None)
+        bucket = get_bucket(scope, self.key_type)
+        key = self.get_key(request, view) if bucket else None
+        if key is None:
+            return True
+        allowed, self.retry_after = get_store().take(f"{scope}:{self.key_type}:{key}", *bucket)
+        record(scope, self.key_type, allowed)
+        return allowed
+
+    def wait(self):
+        return self.retry_after
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    """
+    Por usuario autenticado; en el login, por el nombre de usuario que se
+    intenta y la IP. Solo con el nombre, cualquiera que lo conociera podría
+    dejar a ese usuario sin poder entrar gastando sus intentos.
+    """
+    key_type = "user"
+
+    def get_key(self, request, view):
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated:
+            return user.pk
+        data = getattr(request, "data", None)
+        username = data.get("username") if hasattr(data, "get") else None
+        return f"name:{str(username).lower()}:{self.get_ident(request)}" if username else None
+
+
+class IPTokenBucketThrottle(TokenBucketThrottle):
+    key_type = "ip"
+
+    def get_key(self, request, view):
+        return self.get_ident(request)
+
+
+class AuctionTokenBucketThrottle(TokenBucketThrottle):
+    """Por subasta: acota las pujas sobre una misma subasta aunque vengan de muchos usuarios."""
+    key_type = "auction"
+
+    def get_key(self, request, view):
+        return getattr(view, "kwargs", {}).get("auction_id")
+
+
+WRITE_THROTTLES = [UserTokenBucketThrottle, IPTokenBucketThrottle]
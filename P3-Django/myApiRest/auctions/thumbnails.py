@@ -0,0 +1,103 @@
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from PIL import Image, ImageOps
+
+from . import cache as response_cache
+
+logger = logging.getLogger(__name__)
+
+# Tamaño máximo (ancho, alto) de cada variante; nunca se amplía el original
+VARIANTS = {
+    'card': (320, 240),
+    'detail': (800, 600),
+    'retina': (1600, 1200),
+}
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'THUMBNAIL_WORKERS', 2),
+    thread_name_prefix='thumbnails',
+)
+
+
+def variant_name(original, variant, extension):
+    root, _ = os.path.splitext(original)
+    return f"{root}__{variant}.{extension}"
+
+
+def schedule_variants(auction):
+    """Genera las variantes fuera de la petición, una vez confirmada la transacción."""
+    if not auction.thumbnail:
+        return
+    auction_id, original = auction.pk, auction.thumbnail.name
+    transaction.on_commit(lambda: _executor.submit(_generate_in_thread, auction_id, original))
+
+
+def _generate_in_thread(auction_id, original):
+    try:
+        generate_variants(auction_id, original)
+    except Exception:
+        logger.exception("No se pudieron generar las variantes de la subasta %s", auction_id)
+    finally:
+        connection.close()
+
+
+def generate_variants(auction_id, original):
+    from .models import Auction
+
+    with default_storage.open(original, 'rb') as source:
+        image = ImageOps.exif_transpose(Image.open(source))
+        image.load()
+
+    variants = {}
+    for variant, size in VARIANTS.items():
+        resized = image.copy()
+        resized.thumbnail(size, Image.LANCZOS)
+        variants[variant] = {}
+        for extension, (pil_format, options) in FORMATS.items():
+            frame = resized if pil_format == 'WEBP' or resized.mode == 'RGB' else resized.convert('RGB')
+            buffer = io.BytesIO()
+            frame.save(buffer, pil_format, **options)
+            name = variant_name(original, variant, extension)
+            if default_storage.exists(name):
+                default_storage.delete(name)
+            variants[variant][extension] = default_storage.save(name, ContentFile(buffer.getvalue()))
+
+    # Solo se guardan si la miniatura no ha cambiado mientras tanto
+    if Auction.objects.filter(pk=auction_id, thumbnail=original).update(thumbnail_variants=variants):
+        response_cache.invalidate(f"auction:{auction_id}", "auction-list")
+    return variants
+
+
+def variant_urls(auction, build_url):
+    """
+    Mapa {variante: {formato: url}} para srcset. Mientras una variante no está
+    lista se devuelve la URL del original.
+    """
+    return variant_urls_for(auction.thumbnail.name, auction.thumbnail_variants, build_url)
+
+
+def variant_urls_for(name, variants, build_url):
+    # Lo mismo a partir de las columnas, para las lecturas con values()
+    if not name:
+        return None
+    original = build_url(default_storage.url(name))
+    ready = variants or {}
+    return {
+        variant: {
+            extension: build_url(default_storage.url(ready[variant][extension]))
+            if extension in ready.get(variant, {}) else original
+            for extension in FORMATS
+        }
+        for variant in VARIANTS
+    }
@@ -1,24 +1,32 @@
 from django.urls import path
-from .views import CategoryListCreate, CategoryRetrieveUpdateDestroy, AuctionListCreate, AuctionRetrieveUpdateDestroy, BidListCreate, BidRetrieveUpdateDestroy, UserAuctionListView, RatingListCreateView, RatingUpdateDeleteView, CommentListCreateView, CommentDetailView, UserCommentListView, UserRatingListView, WalletTransactionView, WalletBalanceView, CobrarSubastaView
+from .views import ProxyBidView, CategoryListCreate, CategoryRetrieveUpdateDestroy, BidRetrieveUpdateDestroy, RatingUpdateDeleteView, CommentListCreateView, CommentDetailView, WalletTransactionView, CobrarSubastaView, ResponseCacheStatsView, ThrottleStatsView, AuctionEventStreamView, AuctionImportView, AuctionBidExportView, WalletTransactionExportView
+from .async_views import read_view, AsyncAuctionListView, AsyncAuctionDetailView, AsyncBidListView, AsyncRatingListView, AsyncWalletBalanceView, AsyncUserAuctionListView, AsyncUserCommentListView, AsyncUserRatingListView
 
 app_name="auctions" 
 
 urlpatterns = [ 
     path('categories/', CategoryListCreate.as_view(), name='category-list-create'), 
     path('categories/<int:pk>/', CategoryRetrieveUpdateDestroy.as_view(), name='category-detail'), 
-    path('', AuctionListCreate.as_view(), name='auction-list-create'), 
-    path('<int:pk>/', AuctionRetrieveUpdateDestroy.as_view(), name='auction-detail'), 
-    path('<int:auction_id>/bid/', BidListCreate.as_view(), name='bid-list-create'), 
+    path('', read_view('auction-list-create', AsyncAuctionListView).as_view(), name='auction-list-create'), 
+    path('<int:pk>/', read_view('auction-detail', AsyncAuctionDetailView).as_view(), name='auction-detail'), 
+    path('<int:auction_id>/bid/', read_view('bid-list-create', AsyncBidListView).as_view(), name='bid-list-create'), 
+    path('<int:auction_id>/events/', AuctionEventStreamView.as_view(), name='auction-events'), 
+    path('<int:auction_id>/bid/proxy/', ProxyBidView.as_view(), name='proxy-bid'),
+    path('<int:auction_id>/bid/export.<str:fmt>', AuctionBidExportView.as_view(), name='auction-bid-export'),
     path('<int:auction_id>/bid/<int:pk>/', BidRetrieveUpdateDestroy.as_view(), name='bid-detail'), 
-    path('users/', UserAuctionListView.as_view(), name='action-from-users'), 
-    path('<int:auction_id>/ratings/', RatingListCreateView.as_view(), name='rating-list-create'),
+    path('import/', AuctionImportView.as_view(), name='auction-import'),
+    path('users/', read_view('action-from-users', AsyncUserAuctionListView).as_view(), name='action-from-users'), 
+    path('<int:auction_id>/ratings/', read_view('rating-list-create', AsyncRatingListView).as_view(), name='rating-list-create'),
     path('<int:auction_id>/ratings/<int:pk>/', RatingUpdateDeleteView.as_view(), name='rating-update-delete'),
     path('<int:auction_id>/comments/', CommentListCreateView.as_view(), name='comment-list-create'),
     path('comments/<int:pk>/', CommentDetailView.as_view(), name='comment-detail'),
-    path('user/comments/', UserCommentListView.as_view(), name='user-comments'),
-    path('user/ratings/', UserRatingListView.as_view(), name='user-ratings'),
+    path('user/comments/', read_view('user-comments', AsyncUserCommentListView).as_view(), name='user-comments'),
+    path('user/ratings/', read_view('user-ratings', AsyncUserRatingListView).as_view(), name='user-ratings'),
     path('wallet/', WalletTransactionView.as_view(), name='wallet-transactions'),
-    path('wallet/balance/', WalletBalanceView.as_view(), name='wallet-balance'),
+    path('wallet/export.<str:fmt>', WalletTransactionExportView.as_view(), name='wallet-export'),
+    path('wallet/balance/', read_view('wallet-balance', AsyncWalletBalanceView).as_view(), name='wallet-balance'),
     path('<int:auction_id>/cobrar/', CobrarSubastaView.as_view(), name='cobrar-subasta'),
+    path('cache/stats/', ResponseCacheStatsView.as_view(), name='response-cache-stats'),
+    path('throttle/stats/', ThrottleStatsView.as_view(), name='throttle-stats'),
 
     ] 
\ No newline at end of file
@@ -1,36 +1,177 @@
 from django.shortcuts import render
-from rest_framework import generics, permissions
-from .models import Category, Auction, Bid, Rating, Comment, WalletTransaction
-from .serializers import CategoryListCreateSerializer, CategoryDetailSerializer, AuctionListCreateSerializer, AuctionDetailSerializer, BidDetailSerializer, BidListCreateSerializer, UserBidSerializer, RatingListCreateSerializer, RatingUpdateRetrieveSerializer, CommentSerializer, WalletTransactionSerializer
+from rest_framework import generics, permissions, status
+from rest_framework.parsers import MultiPartParser
+from .models import Category, Auction, Bid, Rating, Comment, WalletTransaction, WalletAccount, ProxyBid
+from .serializers import CategoryListCreateSerializer, CategoryDetailSerializer, AuctionListCreateSerializer, AuctionDetailSerializer, BidDetailSerializer, BidListCreateSerializer, ProxyBidSerializer, UserBidSerializer, RatingListCreateSerializer, RatingUpdateRetrieveSerializer, CommentSerializer, WalletTransactionSerializer
 from decimal import Decimal
-from django.db.models import Q
+from django.db.models import BooleanField, F, Func, Q
+from django.db.models.lookups import GreaterThan
 from rest_framework.exceptions import NotFound
 from rest_framework.views import APIView 
 from rest_framework.permissions import IsAuthenticated 
 from rest_framework.response import Response 
 from .permissions import IsOwnerOrAdmin 
+from .search import get_search_backend
+from .cache import CachedResponseMixin, default_timeout
+from . import cache as response_cache
+from .events import get_broker, format_event
+from .settlement import settle_auction, ALREADY_SETTLED, STILL_OPEN
+from .proxy_bidding import register_proxy_bid, resolve as resolve_proxy_bids
+from .archive import auction_bids, merge_bids, user_bids
+from .fieldsets import sparse_queryset
+from .projections import FastListMixin, projection_for
+from .throttling import WRITE_THROTTLES, AuctionTokenBucketThrottle
+from . import throttling
+from .thumbnails import schedule_variants
+from .bulk_import import AuctionImporter, iter_rows
+from .export import export_response
+from .pagination import AuctionPagination, BidPagination, CommentPagination, WalletTransactionPagination
 from django.utils import timezone
 from django.db.models import Avg
+from django.db import transaction
+from django.http import Http404, StreamingHttpResponse
+from django.views import View
+import asyncio
  
+
+def auction_listing_queryset():
+    # Evita el N+1: categoría y subastador en el mismo JOIN. La media de valoraciones
+    # sale de rating_sum/rating_count, guardados en la propia subasta
+    return Auction.objects.select_related("category", "auctioneer")
+
+def next_closing_queryset():
+    return (
+        Auction.objects.filter(closing_date__gt=timezone.now())
+        .order_by("closing_date")
+        .values_list("closing_date", flat=True)
+    )
+
+def timeout_until(next_closing):
+    # isOpen y el filtro 'estado' cambian cuando cierra una subasta aunque nadie la guarde
+    if next_closing is None:
+        return default_timeout()
+    return max(1, min(default_timeout(), int((next_closing - timezone.now()).total_seconds()) + 1))
+
+def seconds_until_next_closing():
+    return timeout_until(next_closing_queryset().first())
+
+class Likely(Func):
+    """
+    likelihood(condición, probabilidad) de SQLite. Sin STAT4 el planificador no
+    estima cuántas filas deja un rango y, con el ORDER BY id del listado, recorre
+    la tabla entera en lugar de usar el índice. En otras bases de datos se deja
+    la condición tal cual.
+    """
+    output_field = BooleanField()
+
+    def __init__(self, condition, probability):
+        super().__init__(condition)
+        self.probability = float(probability)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        return compiler.compile(self.source_expressions[0])
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        # La probabilidad tiene que ser una constante en el SQL, no un parámetro
+        sql, params = compiler.compile(self.source_expressions[0])
+        return f"likelihood({sql}, {self.probability!r})", params
+
+
+def filter_auctions(queryset, params):
+    texto = params.get('search')
+    categoria = params.get('category')
+    precio_min = params.get('minPrice')
+    precio_max = params.get('maxPrice')
+    estado = params.get('estado')
+
+    # Filtrar por texto (en título o descripción), ordenado por relevancia
+    if texto:
+        queryset = get_search_backend().search(queryset, texto)
+
+    # Filtrar por categoría (por ID o nombre)
+    if categoria:
+        if categoria.isdigit():
+            queryset = queryset.filter(category__id=int(categoria))
+        else:
+            queryset = queryset.filter(category__name__icontains=categoria)
+
+    # Filtrar por rango de precio
+    if precio_min:
+        queryset = queryset.filter(price__gte=precio_min)
+    if precio_max:
+        queryset = queryset.filter(price__lte=precio_max)
+
+    if estado == "abierta":
+        # En una base real la mayoría de subastas ya han cerrado
+        queryset = queryset.filter(Likely(GreaterThan(F('closing_date'), timezone.now()), 0.05))
+    elif estado == "cerrada":
+        queryset = queryset.filter(closing_date__lte=timezone.now())
+
+    return queryset
+
+def user_comment_data(c):
+    return {
+        "id": c.id,
+        "title": c.title,
+        "content": c.content,
+        "created_at": c.created_at,
+        "updated_at": c.updated_at,
+        "auction": {
+            "id": c.auction.id,
+            "title": c.auction.title,
+            "price": c.auction.price,
+            "category": c.auction.category.name,
+            "is_open": c.auction.closing_date > timezone.now()
+        }
+    }
+
+def user_rating_data(r):
+    return {
+        "id": r.id,
+        "rating": r.rating,
+        "auction": {
+            "id": r.auction.id,
+            "title": r.auction.title,
+            "price": r.auction.price,
+            "category": r.auction.category.name,
+            "is_open": r.auction.closing_date > timezone.now(),
+        }
+    }
+
+
 # Create your views here.
-class CategoryListCreate(generics.ListCreateAPIView):
+class CategoryListCreate(CachedResponseMixin, generics.ListCreateAPIView):
     queryset = Category.objects.all()
     serializer_class = CategoryListCreateSerializer
+
+    def get_cache_namespaces(self):
+        return ["categories"]
  
  
 class CategoryRetrieveUpdateDestroy(generics.RetrieveUpdateDestroyAPIView):
     queryset = Category.objects.all()
     serializer_class = CategoryDetailSerializer
 
-class AuctionRetrieveUpdateDestroy(generics.RetrieveUpdateDestroyAPIView):
+class AuctionRetrieveUpdateDestroy(CachedResponseMixin, generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsOwnerOrAdmin]  
     queryset = Auction.objects.all()
     serializer_class = AuctionDetailSerializer
+
+    def response_cacheable(self, request):
+        # es_mia depende del usuario, así que solo se cachean las peticiones anónimas
+        return not request.user.is_authenticated
+
+    def get_cache_namespaces(self):
+        return [f"auction:{self.kwargs['pk']}", "categories"]
+
+    def get_cache_timeout(self):
+        return seconds_until_next_closing()
  
     def get_object(self):
         try:
             # Asegura que se carga el campo 'auctioneer' para usarlo en el serializer
-            auction = Auction.objects.select_related("auctioneer").get(pk=self.kwargs['pk'])
+            auctions = sparse_queryset(Auction.objects.select_related("auctioneer", "category"), self.get_serializer_class(), self.request)
+            auction = auctions.get(pk=self.kwargs['pk'])
         except Auction.DoesNotExist:
             raise NotFound(detail="La subasta solicitada no existe.")
         return auction
@@ -40,86 +181,198 @@ class AuctionRetrieveUpdateDestroy(generics.RetrieveUpdateDestroyAPIView):
         context['request'] = self.request
         return context
 
+    def perform_update(self, serializer):
+        previous = serializer.instance.thumbnail.name
+        auction = serializer.save()
+        if auction.thumbnail.name != previous:
+            # Hasta que estén las nuevas variantes se sirve el original
+            Auction.objects.filter(pk=auction.pk).update(thumbnail_variants={})
+            auction.thumbnail_variants = {}
+            schedule_variants(auction)
 
-class BidListCreate(generics.ListCreateAPIView):
+
+class BidListCreate(FastListMixin, generics.ListCreateAPIView):
     serializer_class = BidListCreateSerializer
+    pagination_class = BidPagination
+    throttle_classes = [*WRITE_THROTTLES, AuctionTokenBucketThrottle]
+    throttle_scope = 'bids'
 
     def get_queryset(self):
-        return Bid.objects.filter(auction_id=self.kwargs['auction_id'])
+        bids = auction_bids(self.kwargs['auction_id']).select_related('auction', 'bidder')
+        return sparse_queryset(bids, self.get_serializer_class(), self.request)
 
     def perform_create(self, serializer):
-        auction = Auction.objects.get(id=self.kwargs['auction_id'])
-        serializer.save(auction=auction, bidder=self.request.user)
+        with transaction.atomic():
+            # Bloquear la subasta para que dos pujas simultáneas no pasen la validación a la vez
+            auction = Auction.locked(self.kwargs['auction_id'])
+            BidListCreateSerializer.check_auction_open(auction)
+            BidListCreateSerializer.check_bid_price(auction, serializer.validated_data['price'])
+            bid = serializer.save(auction=auction, bidder=self.request.user)
+            auction.register_bid(bid)
+            # Las pujas automáticas responden en la misma transacción
+            resolve_proxy_bids(auction)
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
         context['auction'] = Auction.objects.get(id=self.kwargs['auction_id'])
         return context
  
+class ProxyBidView(APIView):
+    """
+    Puja automática del usuario en una subasta: con POST fija (o cambia) su
+    máximo y el sistema puja por él lo justo para ir ganando.
+    """
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [*WRITE_THROTTLES, AuctionTokenBucketThrottle]
+    throttle_scope = 'bids'
+
+    def get(self, request, auction_id):
+        proxy = ProxyBid.objects.filter(auction_id=auction_id, bidder=request.user).first()
+        if proxy is None:
+            raise NotFound("No tienes una puja automática en esta subasta.")
+        return Response(ProxyBidSerializer(proxy).data)
+
+    def post(self, request, auction_id):
+        serializer = ProxyBidSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            proxy, auction, placed = register_proxy_bid(auction_id, request.user, serializer.validated_data['max_price'])
+        except Auction.DoesNotExist:
+            raise NotFound("Subasta no encontrada.")
+        return Response({
+            **ProxyBidSerializer(proxy).data,
+            "current_price": auction.current_price,
+            "leading": auction.highest_bid is not None and auction.highest_bid.bidder_id == request.user.id,
+            "bids": BidListCreateSerializer(placed, many=True).data,
+        }, status=status.HTTP_201_CREATED)
+
+    def delete(self, request, auction_id):
+        # Las pujas ya hechas se mantienen; solo deja de pujar a partir de ahora
+        deleted, _ = ProxyBid.objects.filter(auction_id=auction_id, bidder=request.user).delete()
+        if not deleted:
+            raise NotFound("No tienes una puja automática en esta subasta.")
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 class BidRetrieveUpdateDestroy(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = BidDetailSerializer
    
     def get_queryset(self): #sobreescribimos este método para devovler lo que queremos
+        # Las pujas archivadas se pueden consultar pero no modificar ni borrar
+        if self.request.method in permissions.SAFE_METHODS:
+            return sparse_queryset(auction_bids(self.kwargs['auction_id']), self.get_serializer_class(), self.request)
         return Bid.objects.filter(auction_id=self.kwargs['auction_id'])
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            auction = Auction.locked(self.kwargs['auction_id'])
+            serializer.save()
+            auction.refresh_bid_cache()
+
+    def perform_destroy(self, instance):
+        # La caché de la subasta se recalcula en la señal post_delete de Bid
+        with transaction.atomic():
+            Auction.locked(self.kwargs['auction_id'])
+            instance.delete()
    
  
-class AuctionListCreate(generics.ListCreateAPIView):
+class AuctionListCreate(FastListMixin, CachedResponseMixin, generics.ListCreateAPIView):
     serializer_class = AuctionListCreateSerializer
+    pagination_class = AuctionPagination
+
+    def response_cacheable(self, request):
+        return not request.user.is_authenticated
+
+    def get_cache_namespaces(self):
+        return ["auction-list", "categories"]
+
+    def get_cache_timeout(self):
+        return seconds_until_next_closing()
  
     def get_queryset(self):
-        queryset = Auction.objects.all()
-        texto = self.request.query_params.get('search')
-        categoria = self.request.query_params.get('category')
-        precio_min = self.request.query_params.get('minPrice')
-        precio_max = self.request.query_params.get('maxPrice')
-        estado = self.request.query_params.get('estado')
- 
-        # Filtrar por texto (en título o descripción)
-        if texto:
-            queryset = queryset.filter(
-                Q(title__icontains=texto) |
-                Q(description__icontains=texto)
-            )
- 
-        # Filtrar por categoría (por ID o nombre)
-        if categoria:
-            if categoria.isdigit():
-                queryset = queryset.filter(category__id=int(categoria))
-            else:
-                queryset = queryset.filter(category__name__icontains=categoria)
- 
-        # Filtrar por rango de precio
-        if precio_min:
-            queryset = queryset.filter(price__gte=precio_min)
-        if precio_max:
-            queryset = queryset.filter(price__lte=precio_max)
-        
-        if estado == "abierta":
-            queryset = queryset.filter(closing_date__gt=timezone.now())
-        elif estado == "cerrada":
-            queryset = queryset.filter(closing_date__lte=timezone.now())
- 
-        return queryset
+        queryset = filter_auctions(auction_listing_queryset(), self.request.query_params)
+        return sparse_queryset(queryset, self.get_serializer_class(), self.request)
     
     def perform_create(self, serializer):
-        serializer.save(auctioneer=self.request.user)
+        auction = serializer.save(auctioneer=self.request.user)
+        schedule_variants(auction)
     
+class AuctionImportView(APIView):
+    """
+    Importación masiva de subastas del usuario autenticado. Recibe un fichero
+    'file' en CSV (con cabecera) o JSON Lines y devuelve un informe por fila.
+    """
+    permission_classes = [IsAuthenticated]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        upload = request.FILES.get('file')
+        if not upload:
+            return Response({"detail": "No se ha proporcionado ningún fichero."}, status=400)
+        fmt = request.data.get('format') or ('jsonl' if upload.name.lower().endswith(('.jsonl', '.ndjson')) else 'csv')
+        if fmt not in ('csv', 'jsonl'):
+            return Response({"detail": "Formato no soportado, usa 'csv' o 'jsonl'."}, status=400)
+
+        importer = AuctionImporter(request.user)
+        report = importer.run(iter_rows(upload.file, fmt))
+        code = status.HTTP_201_CREATED if report['created'] else status.HTTP_400_BAD_REQUEST
+        return Response(report, status=code)
+
+
 class UserAuctionListView(APIView): 
     permission_classes = [IsAuthenticated] 
 
     def get(self, request, *args, **kwargs): 
         # Obtener las subastas del usuario autenticado 
-        user_auctions = Auction.objects.filter(auctioneer=request.user) 
-        serializer = AuctionListCreateSerializer(user_auctions, many=True) 
+        user_auctions = auction_listing_queryset().filter(auctioneer=request.user) 
+        serializer = AuctionListCreateSerializer(user_auctions, many=True, context={"request": request})
         return Response(serializer.data) 
 
 class UserBidListView(generics.ListCreateAPIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        bids = Bid.objects.filter(bidder=request.user).select_related("auction")
-        serializer = UserBidSerializer(bids, many=True)
+        # Incluye las pujas de subastas archivadas
+        bids = merge_bids(*(
+            sparse_queryset(queryset.select_related("auction", "bidder"), UserBidSerializer, request)
+            for queryset in user_bids(request.user)
+        ))
+        serializer = UserBidSerializer(bids, many=True, context={"request": request})
         return Response(serializer.data)
+
+
+class UserBidExportView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, fmt):
+        live, archived = user_bids(request.user)
+        bids = live.order_by().union(archived.order_by(), all=True)
+        columns = {
+            'id': 'id',
+            'auction': 'auction_id',
+            'auction_title': 'auction__title',
+            'price': 'price',
+            'creation_date': 'creation_date',
+        }
+        return export_response(bids, columns, fmt, 'pujas')
+
+
+class AuctionBidExportView(APIView):
+    # Historial completo de pujas de una subasta, solo para el staff
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, auction_id, fmt):
+        if not Auction.objects.filter(pk=auction_id).exists():
+            raise NotFound("Subasta no encontrada.")
+        bids = auction_bids(auction_id)
+        columns = {
+            'id': 'id',
+            'price': 'price',
+            'creation_date': 'creation_date',
+            'bidder_id': 'bidder_id',
+            'bidder': 'bidder__username',
+        }
+        return export_response(bids, columns, fmt, f'subasta-{auction_id}-pujas')
     
 
 class RatingListCreateView(generics.ListCreateAPIView):
@@ -128,7 +381,7 @@ class RatingListCreateView(generics.ListCreateAPIView):
 
     def get_queryset(self):
         auction_id = self.kwargs.get('auction_id')
-        return Rating.objects.filter(auction_id=auction_id)
+        return sparse_queryset(Rating.objects.filter(auction_id=auction_id), self.get_serializer_class(), self.request)
 
     def perform_create(self, serializer):
         auction_id = self.kwargs.get('auction_id')
@@ -137,14 +390,19 @@ class RatingListCreateView(generics.ListCreateAPIView):
 
     def list(self, request, *args, **kwargs):
         queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-
-        # Calcular la media con Avg
-        media = queryset.aggregate(avg_rating=Avg("rating"))["avg_rating"] or 1
+        projection = projection_for(self.get_serializer_class(), request, self.get_serializer_context())
+        if projection is not None:
+            results = projection.render(projection.values(queryset))
+        else:
+            results = self.get_serializer(queryset, many=True).data
+
+        # La media sale de los agregados guardados en la subasta
+        stats = Auction.objects.filter(pk=self.kwargs.get('auction_id')).values_list('rating_sum', 'rating_count').first()
+        media = stats[0] / stats[1] if stats and stats[1] else 1
         media = round(media, 2)
 
         return Response({
-            "results": serializer.data,
+            "results": results,
             "media": media
         })
 
@@ -157,13 +415,16 @@ class RatingUpdateDeleteView(generics.RetrieveUpdateDestroyAPIView):
     def perform_update(self, serializer):
         serializer.save(updated_at=timezone.now())
 
-class CommentListCreateView(generics.ListCreateAPIView):
+class CommentListCreateView(FastListMixin, generics.ListCreateAPIView):
     serializer_class = CommentSerializer
+    pagination_class = CommentPagination
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    throttle_classes = WRITE_THROTTLES
+    throttle_scope = 'comments'
 
     def get_queryset(self):
         auction_id = self.kwargs.get('auction_id')
-        return Comment.objects.filter(auction_id=auction_id)
+        return sparse_queryset(Comment.objects.filter(auction_id=auction_id), self.get_serializer_class(), self.request)
 
     def perform_create(self, serializer):
         auction_id = self.kwargs.get('auction_id')
@@ -183,23 +444,7 @@ class UserCommentListView(APIView):
 
     def get(self, request):
         comentarios = Comment.objects.filter(user=request.user).select_related('auction', 'auction__category')
-        data = [
-            {
-                "id": c.id,
-                "title": c.title,
-                "content": c.content,
-                "created_at": c.created_at,
-                "updated_at": c.updated_at,
-                "auction": {
-                    "id": c.auction.id,
-                    "title": c.auction.title,
-                    "price": c.auction.price,
-                    "category": c.auction.category.name,
-                    "is_open": c.auction.closing_date > timezone.now()
-                }
-            }
-            for c in comentarios
-        ]
+        data = [user_comment_data(c) for c in comentarios]
         return Response(data)
     
 class UserRatingListView(APIView):
@@ -207,44 +452,45 @@ class UserRatingListView(APIView):
 
     def get(self, request):
         ratings = Rating.objects.filter(user=request.user).select_related('auction', 'auction__category')
-        data = [
-            {
-                "id": r.id,
-                "rating": r.rating,
-                "auction": {
-                    "id": r.auction.id,
-                    "title": r.auction.title,
-                    "price": r.auction.price,
-                    "category": r.auction.category.name,
-                    "is_open": r.auction.closing_date > timezone.now(),
-                }
-            }
-            for r in ratings
-        ]
+        data = [user_rating_data(r) for r in ratings]
         return Response(data)
 
-class WalletTransactionView(generics.ListCreateAPIView):
+class WalletTransactionView(FastListMixin, generics.ListCreateAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = WalletTransactionSerializer
+    pagination_class = WalletTransactionPagination
+    throttle_classes = WRITE_THROTTLES
+    throttle_scope = 'wallet'
 
     def get_queryset(self):
-        return WalletTransaction.objects.filter(user=self.request.user)
+        transactions = WalletTransaction.objects.filter(user=self.request.user)
+        return sparse_queryset(transactions, self.get_serializer_class(), self.request)
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
 
+class WalletTransactionExportView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, fmt):
+        transactions = WalletTransaction.objects.filter(user=request.user)
+        columns = {
+            'id': 'id',
+            'card_number': 'card_number',
+            'amount': 'amount',
+            'is_deposit': 'is_deposit',
+            'created_at': 'created_at',
+        }
+        return export_response(transactions, columns, fmt, 'monedero')
+
+
 class WalletBalanceView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
         try:
-            transactions = request.user.wallet_transactions.all()
-            total = Decimal("0.00")
-            for t in transactions:
-                if t.amount is not None:
-                    total += t.amount if t.is_deposit else -t.amount
-
+            total = WalletAccount.balance_for(request.user)
             return Response({'saldo_actual': str(round(total, 2))})
         except Exception as e:
             print("💥 Error interno en WalletBalanceView:", str(e))
@@ -266,37 +512,88 @@ class CobrarSubastaView(APIView):
         if request.user != auction.auctioneer and not request.user.is_staff:
             return Response({"detail": "No tienes permiso para cobrar esta subasta."}, status=403)
 
-        highest_bid = auction.bids.order_by("-price").first()
-        if not highest_bid:
+        # Mismo cobro que hace el worker run_settlement_worker, bloqueando la subasta
+        outcome, amount = settle_auction(auction.id, retry_failed=True)
+
+        if outcome == Auction.NO_BIDS:
             return Response({"detail": "La subasta no tiene pujas."}, status=400)
+        if outcome == Auction.INSUFFICIENT_FUNDS:
+            return Response({"detail": "El pujador no tiene saldo suficiente para el cobro."}, status=400)
+        if outcome == ALREADY_SETTLED:
+            return Response({"detail": "La subasta ya se ha cobrado."}, status=400)
+        if outcome == STILL_OPEN:
+            return Response({"detail": "La subasta aún está abierta."}, status=400)
 
-        bidder = highest_bid.bidder
-        auctioneer = auction.auctioneer
-        amount = highest_bid.price
+        return Response({"detail": f"Se han transferido {amount}€ al subastador correctamente."}, status=200)
 
-        # Calcular saldo del pujador
-        saldo_pujador = sum([
-            t.amount if t.is_deposit else -t.amount
-            for t in bidder.wallet_transactions.all()
-        ])
-        if saldo_pujador < amount:
-            return Response({"detail": "El pujador no tiene saldo suficiente para el cobro."}, status=400)
 
-        # Generar transferencia
-        WalletTransaction.objects.create(
-            user=bidder,
-            card_number="COBRO",
-            amount=amount,
-            is_deposit=False
-        )
-        WalletTransaction.objects.create(
-            user=auctioneer,
-            card_number="COBRO",
-            amount=amount,
-            is_deposit=True
-        )
+class AuctionEventStreamView(View):
+    """
+    Server-Sent Events con las pujas, cambios de precio y el cierre de una
+    subasta. Pensado para servirse con asgi.py: cada cliente es una corrutina
+    esperando en su cola, no un hilo ni una consulta por sondeo.
+    """
+    heartbeat = 15
+
+    async def get(self, request, auction_id):
+        if not await Auction.objects.filter(pk=auction_id).aexists():
+            raise Http404("La subasta solicitada no existe.")
+        response = StreamingHttpResponse(self.stream(auction_id), content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+    async def stream(self, auction_id):
+        broker = get_broker()
+        # Primero la suscripción y después la foto inicial: un evento publicado entre
+        # las dos llega a la cola en vez de perderse. Como mucho repite un estado que
+        # ya está en la foto, y "price" lleva el estado completo
+        subscriber = broker.subscribe(auction_id)
+        queue = subscriber[1]
+        try:
+            auction = await Auction.objects.filter(pk=auction_id).afirst()
+            if auction is None:
+                yield format_event("closed", {"auction": auction_id})
+                return
+            closing_date = auction.closing_date
+            yield format_event("price", {
+                "auction": auction.pk,
+                "current_price": auction.current_price,
+                "bid_count": auction.bid_count,
+                "closing_date": closing_date,
+            })
+            while True:
+                remaining = (closing_date - timezone.now()).total_seconds()
+                if remaining <= 0:
+                    yield format_event("closed", {"auction": auction.pk})
+                    return
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), timeout=min(self.heartbeat, remaining))
+                except asyncio.TimeoutError:
+                    if timezone.now() < closing_date:
+                        yield ": ping\n\n"
+                    continue
+                if event == "price":
+                    closing_date = data["closing_date"]
+                yield format_event(event, data)
+                if event == "closed":
+                    return
+        finally:
+            broker.unsubscribe(auction_id, subscriber)
+
+
+class ResponseCacheStatsView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(response_cache.stats())
+
 
-        return Response({"detail": f"Se han transferido {amount}€ al subastador correctamente."}, status=200)
+class ThrottleStatsView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(throttling.stats())
 
 """
 Texto: http://127.0.0.1:8000/api/auctions/?texto=iphone
@@ -308,4 +605,4 @@ Categorias:
 Precios: http://127.0.0.1:8000/api/auctions/?precioMin=100&precioMax=300
  
 Combi: http://127.0.0.1:8000/api/auctions/?texto=pendiente&categoria=pendientes&precioMin=100
-"""
\ No newline at end of file
+"""
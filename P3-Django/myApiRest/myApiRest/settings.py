@@ -14,6 +14,7 @@ from pathlib import Path
 from datetime import timedelta 
 # PARA RENDER
 import os
+import tempfile
 import dj_database_url
 from dotenv import load_dotenv
 
@@ -52,6 +53,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'auctions.middleware.QueryInstrumentationMiddleware',
+    'auctions.middleware.ReplicaRoutingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.security.SecurityMiddleware',
@@ -97,6 +100,26 @@ load_dotenv()
 DATABASES = {
     'default': dj_database_url.config(default=os.getenv("DATABASE_URL"))
 }
+# Los tests con varios hilos (pujas simultáneas) necesitan la base de pruebas en un
+# fichero: la SQLite en memoria compartida falla al momento en lugar de esperar al bloqueo
+if DATABASES['default'].get('ENGINE') == 'django.db.backends.sqlite3':
+    DATABASES['default']['TEST'] = {'NAME': os.path.join(tempfile.gettempdir(), 'test_myapirest.sqlite3')}
+
+# Réplicas de lectura (auctions/db_router.py): una o varias URLs separadas por
+# comas en DATABASE_REPLICA_URLS. En local sirven copias SQLite de la principal,
+# p. ej. DATABASE_REPLICA_URLS=sqlite:////tmp/replica1.sqlite3,sqlite:////tmp/replica2.sqlite3
+# y `python manage.py sync_sqlite_replicas --interval 2` para irlas actualizando.
+for index, url in enumerate(url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()):
+    DATABASES[f'replica_{index}'] = {**dj_database_url.parse(url), 'TEST': {'MIRROR': 'default'}}
+
+DATABASE_ROUTERS = ['auctions.db_router.ReplicaRouter']
+# Solo estas lecturas van a las réplicas; pujas, monedero y usuarios siempre a la principal
+DATABASE_REPLICA_MODELS = [
+    'auctions.auction', 'auctions.category', 'auctions.comment', 'auctions.rating',
+    'auctions.archivedbid', 'auctions.auctionarchive',
+]
+# Tras escribir, el usuario lee de la principal durante este tiempo
+DATABASE_REPLICA_STICKY_SECONDS = 10
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -144,7 +167,7 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 6,
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'DEFAULT_AUTHENTICATION_CLASSES': ( 
-        'rest_framework_simplejwt.authentication.JWTAuthentication', 
+        'users.authentication.CachedJWTAuthentication', 
         ), 
 }
 
@@ -163,8 +186,103 @@ SIMPLE_JWT = {
     "REFRESH_TOKEN_LIFETIME": timedelta(days=7), 
     "ROTATE_REFRESH_TOKENS": True, 
     "BLACKLIST_AFTER_ROTATION": True,  
+    "TOKEN_REFRESH_SERIALIZER": "users.serializers.CustomTokenRefreshSerializer",
     } 
 
+# Login, registro y cambio de contraseña async (users/views.py): el hash de la
+# contraseña se hace en un pool de hilos acotado. Pensado para servir con asgi.py.
+ASYNC_AUTH_VIEWS = os.getenv("ASYNC_AUTH_VIEWS") == "1"
+PASSWORD_HASHING_WORKERS = 2
+PASSWORD_HASHING_MAX_QUEUE = 100
+
+# Lecturas async (auctions/async_views.py), por nombre de ruta separados por
+# comas o "all": p. ej. ASYNC_READ_VIEWS=auction-list-create,auction-detail
+ASYNC_READ_VIEWS = [name.strip() for name in os.getenv("ASYNC_READ_VIEWS", "").split(",") if name.strip()]
+
+# Filtro en memoria de la lista negra de refresh tokens (users/blacklist.py).
+# Necesita una caché compartida entre procesos, así que solo se activa con Redis.
+TOKEN_BLACKLIST_FILTER = bool(os.getenv("REDIS_URL"))
+TOKEN_BLACKLIST_FILTER_REBUILD = 300
+TOKEN_BLACKLIST_FILTER_ERROR_RATE = 0.001
+
+# Listados servidos con values() y una función por fila en lugar de instanciar el
+# serializer (auctions/projections.py). FAST_READ_SERIALIZATION=0 para volver a DRF.
+FAST_READ_SERIALIZATION = os.getenv("FAST_READ_SERIALIZATION", "1") != "0"
+
+# Archivo de subastas (auctions/archive.py, manage.py archive_auctions): las cobradas
+# hace más de estos días pasan sus pujas a ArchivedBid
+AUCTION_ARCHIVE_HORIZON_DAYS = 180
+
+# Pujas automáticas (auctions/proxy_bidding.py): cuánto sube cada puja por encima de la rival
+PROXY_BID_INCREMENT = 1
+
+# Límite de peticiones de escritura por cubo de fichas (auctions/throttling.py).
+# Por scope y tipo de clave: (capacidad de la ráfaga, fichas que se recuperan por
+# segundo). Un tipo de clave que no aparece no se limita. En memoria, con como
+# mucho TOKEN_BUCKET_MAX_KEYS cubos por proceso; con REDIS_URL se comparte entre workers.
+TOKEN_BUCKET_THROTTLES = {
+    'bids': {'user': (10, 1), 'ip': (30, 3), 'auction': (60, 10)},
+    'wallet': {'user': (5, 0.2), 'ip': (20, 1)},
+    'comments': {'user': (5, 0.1), 'ip': (20, 1)},
+    # En el login la clave de usuario es el nombre que se intenta más la IP: 5 intentos y luego uno por minuto
+    'login': {'user': (5, 1 / 60), 'ip': (20, 0.5)},
+}
+TOKEN_BUCKET_BACKEND = 'cache' if os.getenv("REDIS_URL") else 'memory'
+TOKEN_BUCKET_CACHE_ALIAS = 'default'
+TOKEN_BUCKET_MAX_KEYS = 10000
+
+# Caché de respuestas del catálogo (auctions/cache.py). En memoria por defecto;
+# con REDIS_URL se comparte entre workers.
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv("REDIS_URL"),
+        },
+        'auth': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv("REDIS_URL"),
+            'KEY_PREFIX': 'auth',
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+        'auth': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'auth-users',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        },
+    }
+
+RESPONSE_CACHE_ALIAS = 'default'
+RESPONSE_CACHE_TIMEOUT = 60
+
+# Usuarios autenticados por JWT (users/authentication.py): caché corta y acotada.
+# Sin REDIS_URL es de proceso: desactivar o cambiar la contraseña de un usuario
+# solo invalida la caché del worker que lo hace y los demás lo siguen aceptando
+# hasta AUTH_USER_CACHE_TIMEOUT segundos. Con varios workers, REDIS_URL o 0.
+AUTH_USER_CACHE_ALIAS = 'auth'
+AUTH_USER_CACHE_TIMEOUT = 60
+
+# Instrumentación de consultas por petición (auctions/middleware.py). Desactivada
+# por defecto; QUERY_INSTRUMENTATION=1 en el entorno para activarla.
+QUERY_INSTRUMENTATION = os.getenv("QUERY_INSTRUMENTATION") == "1"
+QUERY_INSTRUMENTATION_DUPLICATE_THRESHOLD = 5
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'auctions.queries': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
 AUTH_USER_MODEL = 'users.CustomUser' 
 
 MEDIA_URL = '/media/'
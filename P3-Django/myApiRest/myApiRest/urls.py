@@ -18,17 +18,19 @@ from django.contrib import admin
 from django.urls import include, path 
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView 
 from rest_framework_simplejwt.views import (TokenObtainPairView, TokenRefreshView) 
-from users.views import CustomTokenObtainPairView
-from auctions.views import UserBidListView
+from users.views import CustomTokenObtainPairView, AsyncTokenObtainPairView
+from auctions.views import UserBidExportView
+from auctions.async_views import read_view, AsyncUserBidListView
 from django.conf import settings
 from django.conf.urls.static import static
 
 urlpatterns = [ 
     path("api/auctions/", include("auctions.urls")), 
-    path("api/bids/users/", UserBidListView.as_view(), name="user-bids"),
+    path("api/bids/users/", read_view("user-bids", AsyncUserBidListView).as_view(), name="user-bids"),
+    path("api/bids/users/export.<str:fmt>", UserBidExportView.as_view(), name="user-bids-export"),
     path("api/users/", include("users.urls")), 
     #path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'), 
-    path('api/token/', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('api/token/', (AsyncTokenObtainPairView if settings.ASYNC_AUTH_VIEWS else CustomTokenObtainPairView).as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'), 
     path("admin/", admin.site.urls), 
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'), 
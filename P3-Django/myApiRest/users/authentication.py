@@ -0,0 +1,155 @@
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import router, transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+KEY_PREFIX = "auth"
+# En la entrada de caché, en lugar del hash de la contraseña
+PASSWORD_MD5 = "password_md5"
+
+
+def get_cache():
+    return caches[getattr(settings, "AUTH_USER_CACHE_ALIAS", "default")]
+
+
+def default_timeout():
+    return getattr(settings, "AUTH_USER_CACHE_TIMEOUT", 60)
+
+
+def _version_key(user_id):
+    return f"{KEY_PREFIX}:version:{user_id}"
+
+
+def _user_key(user_id, version):
+    return f"{KEY_PREFIX}:user:{user_id}:{version}"
+
+
+def get_cached_user(user_id):
+    """Devuelve (versión, usuario o None). La versión se lee antes de ir a la base de datos."""
+    version = get_cache().get(_version_key(user_id), 0)
+    return version, get_cache().get(_user_key(user_id, version))
+
+
+async def aget_cached_user(user_id):
+    version = await get_cache().aget(_version_key(user_id), 0)
+    return version, await get_cache().aget(_user_key(user_id, version))
+
+
+def user_snapshot(user):
+    """
+    Lo que se guarda en caché: los campos del usuario sin el hash de la
+    contraseña. Para CHECK_REVOKE_TOKEN basta su md5, que ya va en el token.
+    """
+    data = {
+        field.attname: getattr(user, field.attname)
+        for field in user._meta.concrete_fields
+        if field.attname != "password"
+    }
+    data[PASSWORD_MD5] = get_md5_hash_password(user.password)
+    return data
+
+
+def restore_user(model, data):
+    """
+    Devuelve (usuario, md5 de la contraseña). La contraseña queda diferida,
+    como con .defer("password"): si algo la lee (check_password) se carga de
+    la base de datos, y save() no la sobrescribe.
+    """
+    data = dict(data)
+    password_md5 = data.pop(PASSWORD_MD5)
+    user = model.from_db(router.db_for_read(model), list(data), list(data.values()))
+    return user, password_md5
+
+
+def cache_user(user, version):
+    get_cache().set(_user_key(user.pk, version), user_snapshot(user), timeout=default_timeout())
+
+
+async def acache_user(user, version):
+    await get_cache().aset(_user_key(user.pk, version), user_snapshot(user), timeout=default_timeout())
+
+
+def invalidate_user(user_id):
+    def bump():
+        # La versión dura al menos lo mismo que las entradas: al caducar, ya
+        # no queda ninguna entrada de una versión anterior
+        get_cache().set(_version_key(user_id), time.time_ns(), timeout=default_timeout() * 2)
+    # Tras el commit, para que ninguna petición vuelva a cachear el usuario antiguo
+    transaction.on_commit(bump)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication que evita la consulta del usuario en cada petición:
+    lo guarda en caché un tiempo corto (AUTH_USER_CACHE_TIMEOUT) con una
+    clave por id de usuario y versión. Guardar o borrar el usuario, cambiar
+    la contraseña o cerrar sesión cambia la versión, así que las
+    comprobaciones de usuario activo y de contraseña cambiada se siguen
+    haciendo sobre datos actuales.
+
+    La invalidación solo llega a quien comparte la caché: con la caché en
+    memoria (sin REDIS_URL) cada proceso tiene la suya, y otro worker puede
+    seguir aceptando a un usuario desactivado o con la contraseña cambiada
+    hasta AUTH_USER_CACHE_TIMEOUT segundos. Con varios workers hace falta una
+    caché compartida o AUTH_USER_CACHE_TIMEOUT = 0.
+    """
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            return super().get_user(validated_token)
+
+        version, cached = get_cached_user(user_id)
+        if cached is None:
+            user = super().get_user(validated_token)
+            cache_user(user, version)
+            return user
+        user, password_md5 = restore_user(self.user_model, cached)
+        self.check_user(user, validated_token, password_md5)
+        return user
+
+    async def aauthenticate(self, request):
+        """Igual que authenticate(), para las vistas async: sin hilos salvo al ir a la base de datos."""
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        version, cached = await aget_cached_user(user_id)
+        if cached is None:
+            try:
+                user = await self.user_model.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            self.check_user(user, validated_token)
+            await acache_user(user, version)
+        else:
+            user, password_md5 = restore_user(self.user_model, cached)
+            self.check_user(user, validated_token, password_md5)
+        return user
+
+    def check_user(self, user, validated_token, password_md5=None):
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if password_md5 is None:
+            password_md5 = get_md5_hash_password(user.password)
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != password_md5:
+            raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
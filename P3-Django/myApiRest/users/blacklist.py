@@ -0,0 +1,146 @@
+import hashlib
+import math
+import random
+import threading
+import time
+from collections import deque
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+VERSION_KEY = "auth:blacklist:version"
+
+
+class BloomFilter:
+    """Filtro de Bloom sobre un bytearray: puede dar falsos positivos, nunca falsos negativos."""
+
+    def __init__(self, capacity, error_rate=0.001):
+        self.capacity = max(capacity, 1)
+        self.size = max(int(-self.capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hashes = max(int(round(self.size / self.capacity * math.log(2))), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+def get_cache():
+    return caches[getattr(settings, "AUTH_USER_CACHE_ALIAS", "default")]
+
+
+def bump_version():
+    # Cualquier cambio de valor basta para que los demás procesos se sincronicen
+    cache = get_cache()
+    try:
+        return cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, random.getrandbits(62), timeout=None)
+        return None
+
+
+class BlacklistFilter:
+    """
+    Filtro en memoria de los refresh tokens en la lista negra (sin caducar).
+    Si dice que un jti no está, no lo está y se evita la consulta; si dice que
+    puede estar, se consulta la base de datos como siempre.
+
+    Cada alta en la lista negra cambia un contador en la caché compartida.
+    Cuando un proceso ve un valor distinto carga solo las filas nuevas por id
+    (repasando las del último minuto por si alguna transacción lenta confirmó
+    tarde), como mucho una vez por segundo; entre medias se consulta la base
+    de datos. Cada TOKEN_BLACKLIST_FILTER_REBUILD segundos se reconstruye entero
+    para olvidar los tokens caducados. Sin el contador en la caché no se
+    confía en el filtro.
+    """
+    overlap = 60
+    min_load_interval = 1.0
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._bloom = None
+        self._built_at = 0.0
+        self._version = None
+        self._loaded_at = 0.0
+        self._marks = deque()
+
+    @property
+    def rebuild_interval(self):
+        return getattr(settings, "TOKEN_BLACKLIST_FILTER_REBUILD", 300)
+
+    @property
+    def error_rate(self):
+        return getattr(settings, "TOKEN_BLACKLIST_FILTER_ERROR_RATE", 0.001)
+
+    def might_contain(self, jti):
+        version = get_cache().get(VERSION_KEY)
+        if version is None:
+            bump_version()
+            return True
+        with self._lock:
+            if self._bloom is None or time.monotonic() - self._built_at > self.rebuild_interval \
+                    or self._bloom.count > self._bloom.capacity:
+                self._rebuild(version)
+            elif version != self._version:
+                if time.monotonic() - self._loaded_at < self.min_load_interval:
+                    return True
+                self._load_recent(version)
+            return jti in self._bloom
+
+    def add(self, jti, version=None):
+        """Alta local; si `version` es justo la siguiente, nadie más ha cambiado la lista."""
+        with self._lock:
+            if self._bloom is None:
+                return
+            self._bloom.add(jti)
+            if version is not None and self._version is not None and version == self._version + 1:
+                self._version = version
+
+    def _rebuild(self, version):
+        now = timezone.now()
+        live = BlacklistedToken.objects.filter(token__expires_at__gt=now)
+        bloom = BloomFilter(max(live.count() * 2, 10_000), self.error_rate)
+        # Las filas del último `overlap` se vuelven a leer en la próxima carga:
+        # una transacción lenta puede confirmar después un id más bajo
+        settled = now - timedelta(seconds=self.overlap)
+        settled_id = 0
+        for token_id, jti, blacklisted_at in live.values_list("id", "token__jti", "blacklisted_at").iterator(chunk_size=5000):
+            bloom.add(jti)
+            if blacklisted_at <= settled:
+                settled_id = max(settled_id, token_id)
+        self._bloom, self._version, self._built_at = bloom, version, time.monotonic()
+        self._marks.clear()
+        self._mark(settled_id)
+
+    def _load_recent(self, version):
+        since = self._marks[0][1]
+        last_id = since
+        for token_id, jti in BlacklistedToken.objects.filter(id__gt=since).values_list("id", "token__jti"):
+            self._bloom.add(jti)
+            last_id = max(last_id, token_id)
+        self._version, self._loaded_at = version, time.monotonic()
+        self._mark(max(last_id, self._marks[-1][1]))
+
+    def _mark(self, last_id):
+        # Se guarda (momento, último id) y se conserva la marca más reciente
+        # que tenga al menos `overlap` segundos: desde ella se vuelve a leer
+        now = time.monotonic()
+        self._marks.append((now, last_id))
+        while len(self._marks) > 1 and self._marks[1][0] <= now - self.overlap:
+            self._marks.popleft()
+
+
+blacklist_filter = BlacklistFilter()
@@ -0,0 +1,91 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+
+class PoolOverloaded(Exception):
+    pass
+
+
+class HashingPool:
+    """
+    Pool de hilos acotado para el trabajo caro de autenticación (PBKDF2 al
+    hacer login, registrarse o cambiar la contraseña). Las vistas async
+    esperan el resultado sin bloquear el bucle de eventos, así que una
+    avalancha de logins no frena al resto de peticiones del worker. Si hay
+    más de `max_queue` tareas esperando, se rechaza la nueva (503).
+    """
+
+    def __init__(self, workers, max_queue):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="auth-hashing")
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._run_total = 0.0
+
+    async def run(self, func, *args):
+        with self._lock:
+            if self._waiting >= self.max_queue:
+                self._rejected += 1
+                raise PoolOverloaded
+            self._waiting += 1
+        queued_at = time.perf_counter()
+
+        def task():
+            started = time.perf_counter()
+            with self._lock:
+                self._waiting -= 1
+                self._running += 1
+                self._wait_total += started - queued_at
+                self._wait_max = max(self._wait_max, started - queued_at)
+            close_old_connections()
+            try:
+                return func(*args)
+            finally:
+                close_old_connections()
+                with self._lock:
+                    self._running -= 1
+                    self._completed += 1
+                    self._run_total += time.perf_counter() - started
+
+        return await asyncio.wrap_future(self._executor.submit(task))
+
+    def stats(self):
+        with self._lock:
+            done = self._completed
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "waiting": self._waiting,
+                "running": self._running,
+                "completed": done,
+                "rejected": self._rejected,
+                "avg_wait_ms": round(self._wait_total / done * 1000, 2) if done else None,
+                "max_wait_ms": round(self._wait_max * 1000, 2),
+                "avg_run_ms": round(self._run_total / done * 1000, 2) if done else None,
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_hashing_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = HashingPool(
+                workers=getattr(settings, "PASSWORD_HASHING_WORKERS", 2),
+                max_queue=getattr(settings, "PASSWORD_HASHING_MAX_QUEUE", 100),
+            )
+    return _pool
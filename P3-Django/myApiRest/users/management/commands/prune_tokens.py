@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+from rest_framework_simplejwt.utils import aware_utcnow
+
+
+class Command(BaseCommand):
+    help = (
+        "Borra los refresh tokens caducados (y su entrada en la lista negra) por "
+        "lotes pequeños, cada uno en su propia transacción, para no bloquear las "
+        "tablas. Pensado para ejecutarse periódicamente (cron) o con --interval."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--pause", type=float, default=0.1, help="Segundos de espera entre lotes.")
+        parser.add_argument("--interval", type=float, help="Repetir cada N segundos en lugar de terminar.")
+
+    def handle(self, *args, **options):
+        while True:
+            deleted = self._prune(options["batch_size"], options["pause"])
+            self.stdout.write(f"{deleted} tokens caducados borrados.")
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
+
+    @staticmethod
+    def _prune(batch_size, pause):
+        deleted = 0
+        cutoff = aware_utcnow()
+        while True:
+            ids = list(
+                OutstandingToken.objects.filter(expires_at__lte=cutoff)
+                .order_by("expires_at")
+                .values_list("id", flat=True)[:batch_size]
+            )
+            if not ids:
+                return deleted
+            with transaction.atomic():
+                # El borrado en cascada también quita las filas de BlacklistedToken
+                OutstandingToken.objects.filter(id__in=ids).delete()
+            deleted += len(ids)
+            if pause:
+                time.sleep(pause)
@@ -0,0 +1,19 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # Índice sobre la tabla de simplejwt para que prune_tokens no recorra la
+    # tabla entera buscando tokens caducados
+
+    dependencies = [
+        ('users', '0003_alter_customuser_first_name_and_more'),
+        ('token_blacklist', '0012_alter_outstandingtoken_user'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            "CREATE INDEX IF NOT EXISTS outstandingtoken_expires_idx "
+            "ON token_blacklist_outstandingtoken (expires_at)",
+            "DROP INDEX IF EXISTS outstandingtoken_expires_idx",
+        ),
+    ]
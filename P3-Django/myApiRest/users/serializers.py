@@ -1,6 +1,7 @@
 from rest_framework import serializers 
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
 from .models import CustomUser 
+from .tokens import FilteredRefreshToken
 
 class UserSerializer(serializers.ModelSerializer): 
     class Meta: 
@@ -29,4 +30,8 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     def validate(self, attrs):
         data = super().validate(attrs)
         data['username'] = self.user.username  
-        return data
\ No newline at end of file
+        return data
+
+
+class CustomTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = FilteredRefreshToken
@@ -1,3 +1,216 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .authentication import CachedJWTAuthentication, get_cached_user
+from .blacklist import VERSION_KEY, BlacklistFilter, BloomFilter, bump_version
+from .models import CustomUser
+
+
+@override_settings(TOKEN_BUCKET_THROTTLES={"login": {"user": (2, 1 / 60)}})
+class LoginThrottleTests(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username="victima", password="clave-segura-123")
+        self.client = APIClient()
+
+    def login(self, password, ip):
+        return self.client.post(
+            "/api/token/", {"username": "victima", "password": password}, format="json", REMOTE_ADDR=ip,
+        )
+
+    def test_failed_attempts_only_limit_their_own_ip(self):
+        self.assertEqual(self.login("mala", "10.0.0.1").status_code, 401)
+        self.assertEqual(self.login("mala", "10.0.0.1").status_code, 401)
+        response = self.login("clave-segura-123", "10.0.0.1")
+        self.assertEqual(response.status_code, 429)
+        self.assertIn("Retry-After", response)
+
+        # Quien conoce el nombre no deja al usuario sin entrar desde otra IP
+        self.assertEqual(self.login("clave-segura-123", "10.0.0.2").status_code, 200)
+
+
+@override_settings(AUTH_USER_CACHE_TIMEOUT=60)
+class CachedJWTAuthenticationTests(TestCase):
+
+    def setUp(self):
+        # override_settings(SIMPLE_JWT=...) no llega: los módulos de simplejwt guardan su api_settings
+        self.enterContext(mock.patch.object(api_settings, "CHECK_REVOKE_TOKEN", True))
+        caches["auth"].clear()
+        self.user = CustomUser.objects.create_user(username="cliente", password="clave-segura-123")
+        self.refresh = RefreshToken.for_user(self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.refresh.access_token}")
+
+    def profile(self):
+        return self.client.get("/api/users/profile/")
+
+    def test_cache_entry_has_no_password_hash(self):
+        self.assertEqual(self.profile().status_code, 200)
+        _, cached = get_cached_user(self.user.pk)
+        self.assertEqual(cached["username"], "cliente")
+        self.assertNotIn("password", cached)
+        self.assertNotIn(self.user.password, cached.values())
+        # La segunda petición no consulta el usuario
+        with self.assertNumQueries(0):
+            self.assertEqual(self.profile().status_code, 200)
+
+    def test_cached_user_does_not_overwrite_password(self):
+        self.profile()
+        response = self.client.patch("/api/users/profile/", {"locality": "Madrid"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.locality, "Madrid")
+        self.assertTrue(self.user.check_password("clave-segura-123"))
+
+    def test_deactivation_is_honoured(self):
+        self.assertEqual(self.profile().status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assertEqual(self.profile().status_code, 401)
+
+    def test_password_change_is_honoured(self):
+        self.assertEqual(self.profile().status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                "/api/users/change-password/",
+                {"old_password": "clave-segura-123", "new_password": "otra-clave-segura-456"},
+                format="json",
+            )
+        self.assertEqual(response.status_code, 200)
+        response = self.profile()
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.data["code"], "password_changed")
+
+    def test_logout_is_honoured(self):
+        self.assertEqual(self.profile().status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/api/users/log-out/", {"refresh": str(self.refresh)}, format="json")
+        self.assertEqual(response.status_code, 205)
+        self.assertIsNone(get_cached_user(self.user.pk)[1])
+        response = self.client.post("/api/token/refresh/", {"refresh": str(self.refresh)}, format="json")
+        self.assertEqual(response.status_code, 401)
+
+    def test_async_lookup_reads_the_same_entry(self):
+        self.assertEqual(self.profile().status_code, 200)
+        authenticator = CachedJWTAuthentication()
+        token = authenticator.get_validated_token(str(self.refresh.access_token))
+        with self.assertNumQueries(0):
+            user = async_to_sync(authenticator.aget_user)(token)
+        self.assertEqual((user.pk, user.username), (self.user.pk, "cliente"))
+        self.assertEqual(user.get_deferred_fields(), {"password"})
+
+
+def blacklist(user, jti, expires_in=timedelta(days=1), blacklisted_ago=None, **fields):
+    # Fila creada como la crearía otro proceso: sin el alta local de la señal (on_commit)
+    token = OutstandingToken.objects.create(
+        user=user, jti=jti, token=f"token-{jti}", expires_at=timezone.now() + expires_in,
+    )
+    entry = BlacklistedToken.objects.create(token=token, **fields)
+    if blacklisted_ago is not None:
+        BlacklistedToken.objects.filter(pk=entry.pk).update(blacklisted_at=timezone.now() - blacklisted_ago)
+    return entry
+
+
+@override_settings(TOKEN_BLACKLIST_FILTER=True)
+class BlacklistFilterTests(TestCase):
+
+    def setUp(self):
+        caches["auth"].clear()
+        self.user = CustomUser.objects.create_user(username="cliente", password="clave-segura-123")
+        self.filter = BlacklistFilter()
+        self.filter.min_load_interval = 0
+
+    def test_bloom_filter_has_no_false_negatives(self):
+        bloom = BloomFilter(1000)
+        items = [f"jti-{i}" for i in range(1000)]
+        for item in items:
+            bloom.add(item)
+        self.assertTrue(all(item in bloom for item in items))
+        false_positives = sum(f"otro-{i}" in bloom for i in range(10000))
+        self.assertLess(false_positives, 50)
+
+    def test_without_version_the_filter_is_not_trusted(self):
+        self.assertTrue(self.filter.might_contain("cualquiera"))
+        self.assertIsNotNone(caches["auth"].get(VERSION_KEY))
+
+    def test_rows_from_other_processes_are_seen_after_version_bump(self):
+        bump_version()
+        self.assertFalse(self.filter.might_contain("revocado"))
+        blacklist(self.user, "revocado")
+        # Sin cambio de versión el filtro no lo sabe; el otro proceso siempre la cambia
+        self.assertFalse(self.filter.might_contain("revocado"))
+        bump_version()
+        self.assertTrue(self.filter.might_contain("revocado"))
+
+    def test_late_commit_with_lower_id_is_loaded(self):
+        bump_version()
+        blacklist(self.user, "antiguo", blacklisted_ago=timedelta(minutes=5))
+        blacklist(self.user, "reciente", id=1000)
+        self.filter.might_contain("x")
+        # Una transacción lenta confirma ahora un id menor que el último leído
+        blacklist(self.user, "tardio", id=500)
+        bump_version()
+        self.assertTrue(self.filter.might_contain("tardio"))
+        self.assertTrue(self.filter.might_contain("antiguo"))
+
+    def test_marks_keep_only_the_overlap_window(self):
+        bump_version()
+        self.filter.overlap = 0
+        self.filter.might_contain("x")
+        entry = blacklist(self.user, "nuevo")
+        bump_version()
+        self.assertTrue(self.filter.might_contain("nuevo"))
+        self.assertEqual([last_id for _, last_id in self.filter._marks], [entry.pk])
+
+    def test_add_with_next_version_skips_reload(self):
+        bump_version()
+        self.filter.might_contain("x")
+        self.filter.add("local", bump_version())
+        with self.assertNumQueries(0):
+            self.assertTrue(self.filter.might_contain("local"))
+
+        # Si otro proceso también cambió la versión, se vuelve a leer
+        bump_version()
+        self.filter.add("otro-local", bump_version())
+        with self.assertNumQueries(1):
+            self.filter.might_contain("otro-local")
+
+    def test_rebuild_forgets_expired_tokens(self):
+        bump_version()
+        blacklist(self.user, "caducado", expires_in=timedelta(seconds=-1))
+        blacklist(self.user, "vigente")
+        self.filter.might_contain("x")
+        self.assertNotIn("caducado", self.filter._bloom)
+        self.assertIn("vigente", self.filter._bloom)
+
+        stale = self.filter._bloom
+        with override_settings(TOKEN_BLACKLIST_FILTER_REBUILD=0):
+            self.filter.might_contain("x")
+        self.assertIsNot(self.filter._bloom, stale)
+        self.assertIn("vigente", self.filter._bloom)
+
+    def test_refresh_after_logout_is_rejected(self):
+        with mock.patch("users.tokens.blacklist_filter", self.filter):
+            refresh = RefreshToken.for_user(self.user)
+            client = APIClient()
+            # El primer refresh construye el filtro
+            response = client.post("/api/token/refresh/", {"refresh": str(refresh)}, format="json")
+            self.assertEqual(response.status_code, 200)
+            refresh = response.data["refresh"]
+
+            client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(client.post("/api/users/log-out/", {"refresh": refresh}, format="json").status_code, 205)
+            client.credentials()
+            response = client.post("/api/token/refresh/", {"refresh": refresh}, format="json")
+            self.assertEqual(response.status_code, 401)
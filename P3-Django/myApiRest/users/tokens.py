@@ -0,0 +1,15 @@
+from django.conf import settings
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .blacklist import blacklist_filter
+
+
+class FilteredRefreshToken(RefreshToken):
+    """RefreshToken que consulta la lista negra solo si el filtro en memoria no la descarta."""
+
+    def check_blacklist(self):
+        if getattr(settings, "TOKEN_BLACKLIST_FILTER", False) and \
+                not blacklist_filter.might_contain(self.payload[api_settings.JTI_CLAIM]):
+            return
+        super().check_blacklist()
@@ -1,12 +1,18 @@
+from django.conf import settings
 from django.urls import path 
-from .views import UserRegisterView, UserListView, UserRetrieveUpdateDestroyView, UserProfileView, ChangePasswordView, LogoutView 
+from .views import UserRegisterView, UserListView, UserRetrieveUpdateDestroyView, UserProfileView, ChangePasswordView, LogoutView, AsyncUserRegisterView, AsyncChangePasswordView, AuthPoolStatsView
+
+# Con ASYNC_AUTH_VIEWS el hash de contraseñas va al pool acotado (users/hashing.py)
+RegisterView = AsyncUserRegisterView if settings.ASYNC_AUTH_VIEWS else UserRegisterView
+PasswordView = AsyncChangePasswordView if settings.ASYNC_AUTH_VIEWS else ChangePasswordView
  
 app_name="users" 
 urlpatterns = [ 
-    path('register/', UserRegisterView.as_view(), name='user-register'), 
+    path('register/', RegisterView.as_view(), name='user-register'), 
     path('', UserListView.as_view(), name='user-list'), 
     path('<int:pk>/', UserRetrieveUpdateDestroyView.as_view(), name='user-detail'), 
     path('profile/', UserProfileView.as_view(), name='user-profile'), 
-    path('change-password/', ChangePasswordView.as_view(), name='change-password'), 
+    path('change-password/', PasswordView.as_view(), name='change-password'), 
     path('log-out/', LogoutView.as_view(), name='log-out'), 
+    path('auth-pool/stats/', AuthPoolStatsView.as_view(), name='auth-pool-stats'),
 ] 
\ No newline at end of file
@@ -9,7 +9,21 @@ from .serializers import UserSerializer, ChangePasswordSerializer
 from rest_framework.exceptions import ValidationError 
 from django.contrib.auth.password_validation import validate_password 
 from rest_framework_simplejwt.views import TokenObtainPairView
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from .serializers import CustomTokenObtainPairSerializer
+from .authentication import CachedJWTAuthentication, invalidate_user
+from .tokens import FilteredRefreshToken
+from .hashing import PoolOverloaded, get_hashing_pool
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.http import HttpResponse
+from django.views import View
+from rest_framework.exceptions import APIException, AuthenticationFailed, NotAuthenticated, ParseError, Throttled
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from auctions.throttling import UserTokenBucketThrottle, IPTokenBucketThrottle
+from rest_framework.renderers import JSONRenderer
+from rest_framework.views import exception_handler
+import json
  
 class UserRegisterView(generics.CreateAPIView): 
     permission_classes = [AllowAny]
@@ -83,6 +97,7 @@ status=status.HTTP_400_BAD_REQUEST)
  
             user.set_password(serializer.validated_data['new_password']) 
             user.save() 
+            invalidate_user(user.pk)
             return Response({"detail": "La contraseña se ha actualizado correctamente."}) 
  
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -102,8 +117,9 @@ class LogoutView(APIView):
 status=status.HTTP_400_BAD_REQUEST) 
  
             # Revocar el RefreshToken 
-            token = RefreshToken(refresh_token) 
+            token = FilteredRefreshToken(refresh_token) 
             token.blacklist()   
+            invalidate_user(request.user.pk)
             return Response({"detail": "Cerrado sesión con éxito"}, 
 status=status.HTTP_205_RESET_CONTENT) 
  
@@ -113,4 +129,132 @@ status=status.HTTP_205_RESET_CONTENT)
 
 
 class CustomTokenObtainPairView(TokenObtainPairView):
-    serializer_class = CustomTokenObtainPairSerializer
\ No newline at end of file
+    serializer_class = CustomTokenObtainPairSerializer
+    throttle_classes = [UserTokenBucketThrottle, IPTokenBucketThrottle]
+    throttle_scope = 'login'
+
+
+class AsyncAuthView(View):
+    """
+    Base de las variantes async de login, registro y cambio de contraseña.
+    Todo el trabajo síncrono (ORM y hash de la contraseña) se ejecuta en el
+    pool acotado de users/hashing.py y la vista solo espera el resultado,
+    así que el bucle de eventos sigue atendiendo otras peticiones. Las
+    respuestas son las mismas que las de las vistas de DRF equivalentes.
+    Los límites de peticiones se comprueban antes de entrar en el pool.
+    """
+    throttle_classes = []
+    throttle_scope = None
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        # Igual que APIView: se autentica con JWT, no con la cookie de sesión
+        view.csrf_exempt = True
+        return view
+
+    async def post(self, request, *args, **kwargs):
+        try:
+            if self.throttle_classes:
+                await sync_to_async(self.check_throttles)(request)
+            data, code = await get_hashing_pool().run(self.handle, request)
+        except PoolOverloaded:
+            response = self.render(
+                {"detail": "Demasiadas peticiones de autenticación, inténtalo de nuevo en unos segundos."},
+                status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+            response["Retry-After"] = "1"
+            return response
+        except APIException as exc:
+            if isinstance(exc, (NotAuthenticated, AuthenticationFailed)):
+                exc.auth_header = CachedJWTAuthentication().authenticate_header(request)
+            error = exception_handler(exc, {})
+            response = self.render(error.data, error.status_code)
+            for header in ("WWW-Authenticate", "Retry-After"):
+                if header in error:
+                    response[header] = error[header]
+            return response
+        return self.render(data, code)
+
+    def check_throttles(self, request):
+        # Los throttles de DRF leen la clave de usuario de request.data
+        request.data = self.parse(request)
+        request.user = AnonymousUser()
+        waits = [throttle.wait() for throttle in (cls() for cls in self.throttle_classes)
+                 if not throttle.allow_request(request, self)]
+        if waits:
+            raise Throttled(max(waits))
+
+    def handle(self, request):
+        raise NotImplementedError
+
+    @staticmethod
+    def parse(request):
+        if request.content_type == "application/json":
+            try:
+                return json.loads(request.body or b"{}")
+            except ValueError as exc:
+                raise ParseError(f"JSON parse error - {exc}")
+        return request.POST.dict()
+
+    @staticmethod
+    def render(data, code):
+        return HttpResponse(JSONRenderer().render(data), status=code, content_type="application/json")
+
+
+class AsyncTokenObtainPairView(AsyncAuthView):
+    throttle_classes = CustomTokenObtainPairView.throttle_classes
+    throttle_scope = CustomTokenObtainPairView.throttle_scope
+
+    def handle(self, request):
+        serializer = CustomTokenObtainPairSerializer(data=self.parse(request), context={"request": request})
+        try:
+            serializer.is_valid(raise_exception=True)
+        except TokenError as e:
+            raise InvalidToken(e.args[0])
+        return serializer.validated_data, status.HTTP_200_OK
+
+
+class AsyncUserRegisterView(AsyncAuthView):
+    def handle(self, request):
+        serializer = UserSerializer(data=self.parse(request))
+        if not serializer.is_valid():
+            return serializer.errors, status.HTTP_400_BAD_REQUEST
+        user = serializer.save()
+        refresh = RefreshToken.for_user(user)
+        return {
+            'user': serializer.data,
+            'access': str(refresh.access_token),
+            'refresh': str(refresh),
+        }, status.HTTP_201_CREATED
+
+
+class AsyncChangePasswordView(AsyncAuthView):
+    def handle(self, request):
+        authenticated = CachedJWTAuthentication().authenticate(request)
+        if authenticated is None:
+            raise NotAuthenticated()
+        user = authenticated[0]
+
+        serializer = ChangePasswordSerializer(data=self.parse(request))
+        if not serializer.is_valid():
+            return serializer.errors, status.HTTP_400_BAD_REQUEST
+        if not user.check_password(serializer.validated_data['old_password']):
+            return {"old_password": "Contraseña antigua incorrecta."}, status.HTTP_400_BAD_REQUEST
+        try:
+            validate_password(serializer.validated_data['new_password'], user)
+        except DjangoValidationError as e:
+            return {"new_password": e.messages}, status.HTTP_400_BAD_REQUEST
+
+        user.set_password(serializer.validated_data['new_password'])
+        user.save()
+        invalidate_user(user.pk)
+        return {"detail": "La contraseña se ha actualizado correctamente."}, status.HTTP_200_OK
+
+
+class AuthPoolStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(get_hashing_pool().stats())
+